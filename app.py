@@ -1,9 +1,18 @@
 from flask import Flask
 
+import instrumentation
+import templating
+import assets
+
 from controllers.home_controller import home_blueprint
 from data.db import init_db
+from data.cache import restore_cache_snapshot
+from data import query_tracer
+from services import catalog_refresh
 from controllers.movie_controller import movie_bp  #routes in movie_controller are active
 from controllers.auth_controller import auth
+from controllers.trends_controller import trends_bp
+from controllers.health_controller import health_bp
 
 
 def create_app():
@@ -15,11 +24,25 @@ def create_app():
 
     app.secret_key = "csai203-secret"
     # Ensure database tables exist before the app starts handling requests
+    # (a no-op when the file is already at the current schema version)
     init_db()
+    # Start with whatever the previous run had cached instead of cold misses
+    restore_cache_snapshot()
+
+    # Compiled template cache, and precompiling everything before the fork
+    templating.init_app(app)
+    # Fingerprinted static files and the asset_url() template helper
+    assets.init_app(app)
+    instrumentation.init_app(app)
+    query_tracer.init_app(app)
+    # Periodic background refresh of stale Movie rows
+    catalog_refresh.init_app(app)
 
     app.register_blueprint(home_blueprint)
     app.register_blueprint(movie_bp)  # routes in movie_controller are active
     app.register_blueprint(auth)
+    app.register_blueprint(trends_bp)
+    app.register_blueprint(health_bp)
 
     return app
 
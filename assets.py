@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Fingerprinted static assets. At startup (and at image build time, via
+# `python assets.py`) every file under static/ is copied to ASSET_BUILD_DIR
+# under a name containing a hash of its content, with gzip and brotli
+# variants next to it. Templates link to those names through asset_url(), so
+# they can be cached for a year without revalidation: a changed file gets a
+# new name, and pages point at it from then on.
+
+MANIFEST = "manifest.json"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".map")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write(path, data):
+    # temp file + rename, so a worker never serves a half-written asset
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".asset-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def build(static_dir, out_dir):
+    """Write hashed copies (and compressed variants) of every file under
+    static_dir into out_dir. Returns the manifest {name: hashed name}."""
+    out_abs = os.path.abspath(out_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_abs]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(relative)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(out_dir, hashed)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if ext in COMPRESSIBLE:
+                    _write(target + ".gz", gzip.compress(data, 9, mtime=0))
+                    if brotli is not None:
+                        _write(target + ".br", brotli.compress(data))
+                # the plain file last: its presence means the variants exist
+                _write(target, data)
+            manifest[relative] = hashed
+    os.makedirs(out_dir, exist_ok=True)
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(filename):
+    """url_for('static', ...) for templates, pointing at the fingerprinted
+    copy when there is one."""
+    hashed = current_app.extensions["assets"].get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("assets_bp.asset", filename=hashed)
+
+
+assets_bp = Blueprint("assets_bp", __name__)
+
+
+@assets_bp.route("/assets/<path:filename>")
+def asset(filename):
+    if filename not in current_app.extensions["assets_served"]:
+        abort(404)
+    out_dir = os.path.abspath(Config.ASSET_BUILD_DIR)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    served, encoding = filename, None
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.isfile(os.path.join(out_dir, filename + suffix)):
+            served, encoding = filename + suffix, name
+            break
+    response = send_from_directory(out_dir, served, mimetype=mimetype, conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def init_app(app):
+    manifest = {}
+    if Config.ASSET_BUILD_DIR:
+        try:
+            manifest = build(app.static_folder, Config.ASSET_BUILD_DIR)
+        except OSError as e:
+            # read-only deploy: use whatever the image build produced
+            print("Could not build static assets:", e)
+            manifest = _load_manifest(Config.ASSET_BUILD_DIR)
+    app.extensions["assets"] = manifest
+    app.extensions["assets_served"] = frozenset(manifest.values())
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.register_blueprint(assets_bp)
+
+
+if __name__ == "__main__":
+    built = build("static", Config.ASSET_BUILD_DIR)
+    print(f"Built {len(built)} assets into {Config.ASSET_BUILD_DIR}")
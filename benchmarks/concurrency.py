@@ -0,0 +1,115 @@
+"""Show how many requests gunicorn serves at once while TMDb is slow.
+
+Starts the TMDb stub with a fixed latency, then for each worker mode launches
+gunicorn (via gunicorn.conf.py) against a seeded database and fires a burst of
+concurrent requests at one route. Reports throughput, latency and the peak
+number of TMDb calls in flight, which is the number of requests the server was
+actually working on at the same time.
+
+    python benchmarks/concurrency.py --latency-ms 200 --clients 48 --requests 240
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from benchmarks.tmdb_stub import StubConfig, start_stub
+from benchmarks.seed_db import seed_database
+from benchmarks.run_bench import percentile
+
+MODES = {
+    "sync": {"GUNICORN_WORKER_CLASS": "sync", "GUNICORN_THREADS": "1"},
+    "gthread": {"GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "8"},
+}
+
+
+def _wait_until_up(url, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            requests.get(url + "/metrics", timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start")
+
+
+def run_mode(name, stub_url, stub_config, workdir, args, port):
+    env = dict(os.environ)
+    env.update(MODES[name])
+    env.update({
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "TMDB_BASE_URL": stub_url,
+        "TMDB_API_KEY": "bench",
+        "DATABASE_PATH": os.path.join(workdir, "bench.db"),
+        "TREND_STORE_DIR": os.path.join(workdir, "trends"),
+        # measure the upstream-bound path, not cache hits
+        "CACHE_ENABLED": "0",
+        "TMDB_RATE_PER_SECOND": "1000",
+    })
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(url, proc)
+        stub_config.max_in_flight = 0
+
+        def one(_):
+            began = time.perf_counter()
+            ok = requests.get(url + args.route, timeout=60).status_code < 500
+            return time.perf_counter() - began, ok
+
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            began = time.perf_counter()
+            samples = list(pool.map(one, range(args.requests)))
+            wall = time.perf_counter() - began
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    latencies = sorted(s for s, _ in samples)
+    return {
+        "mode": name,
+        "rps": round(len(samples) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "peak_upstream_in_flight": stub_config.max_in_flight,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", default="/")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=48)
+    parser.add_argument("--requests", type=int, default=240)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--modes", default="sync,gthread")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(latency_ms=args.latency_ms, seed=1)
+    _, stub_url = start_stub(stub_config)
+    workdir = tempfile.mkdtemp(prefix="movietrends-conc-")
+    seed_database(os.path.join(workdir, "bench.db"))
+
+    print(f"route {args.route}, {args.workers} workers, TMDb latency {args.latency_ms:.0f} ms, {args.clients} clients")
+    print(f"{'mode':<10}{'rps':>8}{'p50':>9}{'p95':>9}{'err':>5}{'in-flight':>11}")
+    for name in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        r = run_mode(name, stub_url, stub_config, workdir, args, args.port)
+        print(f"{r['mode']:<10}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['errors']:>5}{r['peak_upstream_in_flight']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Route-level latency/throughput benchmark against an offline TMDb stub.
+
+Starts the TMDb stub, seeds a throwaway database, serves the app on a local
+threaded server and hammers each route. Results are printed as a table and can
+be written to JSON and compared with an earlier run:
+
+    python benchmarks/run_bench.py --requests 200 --concurrency 8 --latency-ms 50 --output bench.json
+    python benchmarks/run_bench.py --compare bench.json
+
+Pass --url to benchmark an already running server (e.g. gunicorn) instead;
+that server must itself point TMDB_BASE_URL at a stub started with
+benchmarks/tmdb_stub.py.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.tmdb_stub import StubConfig, start_stub
+from benchmarks.seed_db import seed_database
+
+ROUTES = {
+    "home": "/",
+    "movies": "/movies?category=&page=1",
+    "movie_details": "/movie/550",
+    "watchlist": "/watchlist",
+    "api_search": "/api/search?q=star&page=1",
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def bench_settings(stub_url, workdir):
+    return {
+        "TMDB_BASE_URL": stub_url,
+        "TMDB_API_KEY": "bench",
+        "DATABASE_PATH": os.path.join(workdir, "bench.db"),
+        "TREND_STORE_DIR": os.path.join(workdir, "trends"),
+        "CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        # the stub has no rate limit
+        "TMDB_RATE_PER_SECOND": os.environ.get("TMDB_RATE_PER_SECOND", "1000"),
+    }
+
+
+def start_app(stub_url, workdir):
+    """Serve the app in-process with a threaded werkzeug server, on the
+    database seeded at <workdir>/bench.db."""
+    settings = bench_settings(stub_url, workdir)
+    os.environ.update(settings)
+    # config, data.db and tmdb_client read these at import time, and
+    # seed_database() (or a test) may have imported them already
+    import data.db
+    from config import Config
+    from repositories import movie_repository, tmdb_client
+    data.db.DB_PATH = settings["DATABASE_PATH"]
+    tmdb_client.BASE_URL = movie_repository.BASE_URL = stub_url
+    for name in ("TMDB_BASE_URL", "TMDB_API_KEY", "TREND_STORE_DIR", "CACHE_PATH"):
+        setattr(Config, name, settings[name])
+    Config.TMDB_RATE_PER_SECOND = float(settings["TMDB_RATE_PER_SECOND"])
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def bench_route(base_url, path, total, concurrency, warmup):
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        began = time.perf_counter()
+        try:
+            ok = session.get(base_url + path, timeout=30).status_code < 500
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - began, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup)))
+        began = time.perf_counter()
+        samples = list(pool.map(one, range(total)))
+        wall = time.perf_counter() - began
+
+    latencies = sorted(s for s, _ in samples)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "throughput_rps": round(total / wall, 1) if wall else None,
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def print_table(report, baseline=None):
+    print(f"{'route':<15}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'err':>6}")
+    for name, r in report["routes"].items():
+        line = f"{name:<15}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['throughput_rps']:>9}{r['errors']:>6}"
+        old = (baseline or {}).get("routes", {}).get(name)
+        if old and old.get("p95_ms"):
+            change = (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            line += f"   p95 {change:+.1f}% vs {baseline.get('git_rev') or 'baseline'}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma separated subset of: " + ", ".join(ROUTES))
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated TMDb latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of TMDb calls answered with 500")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--ratings", type=int, default=20, help="ratings per user")
+    parser.add_argument("--watchlist", type=int, default=20, help="watchlist rows per user")
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--url", help="benchmark this running server instead of an in-process one")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, seed=1)
+    workdir = tempfile.mkdtemp(prefix="movietrends-bench-")
+    if args.url:
+        base_url = args.url.rstrip("/")
+        seeded = None
+    else:
+        stub, stub_url = start_stub(stub_config)
+        seeded = seed_database(os.path.join(workdir, "bench.db"), args.users, args.ratings, args.watchlist, args.movies)
+        _, base_url = start_app(stub_url, workdir)
+
+    report = {
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "dataset": seeded,
+        "routes": {},
+    }
+    for name in [r.strip() for r in args.routes.split(",") if r.strip()]:
+        report["routes"][name] = bench_route(base_url, ROUTES[name], args.requests, args.concurrency, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Create a benchmark database of configurable size.
+
+    python benchmarks/seed_db.py /tmp/bench.db --users 1000 --ratings 50 --watchlist 40
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def seed_database(path, users=100, ratings_per_user=20, watchlist_per_user=20, movies=2000, seed=7):
+    """Build a fresh schema at `path` and fill it. User 1 (the guest user every
+    anonymous request falls back to) gets a full watchlist too."""
+    import data.db as db
+
+    if os.path.exists(path):
+        os.remove(path)
+    previous = db.DB_PATH
+    db.DB_PATH = path
+    try:
+        db.init_db()
+    finally:
+        db.DB_PATH = previous
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("INSERT OR IGNORE INTO Category(Name) VALUES ('movie'), ('tv')")
+    categories = dict(cur.execute("SELECT Name, CategoryID FROM Category").fetchall())
+    movie_rows = []
+    for i in range(movies):
+        tmdb_id = 10000 + i
+        is_tv = i % 4 == 0
+        movie_rows.append((
+            tmdb_id, f"Seeded title {tmdb_id}", "Seeded overview.", round(rnd.uniform(4, 9), 1),
+            None if is_tv else f"20{rnd.randint(0, 25):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            categories['tv' if is_tv else 'movie'], f"/seed{tmdb_id}.jpg", None,
+        ))
+    cur.executemany("INSERT INTO Movie(MovieID, Title, Overview, Rating, ReleaseDate, Category, PosterPath, TrailerURL) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", movie_rows)
+
+    cur.executemany(
+        "INSERT OR IGNORE INTO users(UserID, Username, Email, PasswordHash) VALUES (?, ?, ?, ?)",
+        [(uid, f"bench{uid}", f"bench{uid}@example.com", None) for uid in range(2, users + 1)],
+    )
+    movie_ids = [row[0] for row in movie_rows]
+    watch_rows, rating_rows = [], []
+    for uid in range(1, users + 1):
+        for tmdb_id in rnd.sample(movie_ids, min(watchlist_per_user, len(movie_ids))):
+            watch_rows.append((uid, tmdb_id))
+        for tmdb_id in rnd.sample(movie_ids, min(ratings_per_user, len(movie_ids))):
+            rating_rows.append((uid, tmdb_id, 'movie', float(rnd.randint(1, 10))))
+    cur.executemany("INSERT OR IGNORE INTO WatchlistItem(UserID, MovieID) VALUES (?, ?)", watch_rows)
+    cur.executemany("INSERT OR IGNORE INTO ratings(user_id, tmdb_id, media_type, rating_value) VALUES (?, ?, ?, ?)", rating_rows)
+    conn.commit()
+    conn.close()
+    return {'users': users, 'movies': movies, 'watchlist_rows': len(watch_rows), 'rating_rows': len(rating_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--ratings", type=int, default=20, help="ratings per user")
+    parser.add_argument("--watchlist", type=int, default=20, help="watchlist rows per user")
+    parser.add_argument("--movies", type=int, default=2000)
+    args = parser.parse_args()
+    print(seed_database(args.path, args.users, args.ratings, args.watchlist, args.movies))
+
+
+if __name__ == "__main__":
+    main()
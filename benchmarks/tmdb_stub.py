@@ -0,0 +1,172 @@
+"""Offline TMDb stand-in for benchmarks.
+
+Replays JSON fixtures from benchmarks/fixtures with configurable latency and
+error injection. Paths map to fixture names by replacing numeric segments with
+`id` and slashes with underscores, e.g. /movie/550/videos -> movie_id_videos.json.
+
+    python benchmarks/tmdb_stub.py --port 8765 --latency-ms 80 --error-rate 0.01
+
+With --record UPSTREAM_URL the stub proxies misses to real TMDb (the api_key
+query parameter is forwarded) and saves the responses as new fixtures.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture_name(path):
+    parts = [p for p in path.strip("/").split("/") if p]
+    if parts and parts[0] == "3":
+        parts = parts[1:]
+    parts = ["id" if re.fullmatch(r"\d+", p) else p for p in parts]
+    return "_".join(parts) + ".json"
+
+
+class StubConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0,
+                 fixture_dir=FIXTURE_DIR, record_upstream=None, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.fixture_dir = fixture_dir
+        self.record_upstream = record_upstream
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._fixtures = {}
+
+    def load(self, name):
+        if name not in self._fixtures:
+            path = os.path.join(self.fixture_dir, name)
+            try:
+                with open(path) as f:
+                    self._fixtures[name] = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return self._fixtures[name]
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            roll = self.random.random()
+            self.requests_served += 1
+        return max(0.0, self.latency_ms + jitter) / 1000.0, roll
+
+
+def _personalize(payload, path, query):
+    """Make a fixture look like the response for the requested id/page/query."""
+    payload = json.loads(json.dumps(payload))
+    ids = re.findall(r"/(\d+)(?=/|$)", path)
+    if ids and isinstance(payload, dict) and "id" in payload:
+        payload["id"] = int(ids[0])
+    if "page" in query and isinstance(payload, dict) and "results" in payload:
+        page = int(query["page"][0] or 1)
+        payload["page"] = page
+        # shift ids so every page holds distinct titles
+        for r in payload["results"]:
+            if isinstance(r.get("id"), int):
+                r["id"] += (page - 1) * 100000
+    return payload
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            with config.lock:
+                config.in_flight += 1
+                config.max_in_flight = max(config.max_in_flight, config.in_flight)
+            try:
+                self._handle()
+            finally:
+                with config.lock:
+                    config.in_flight -= 1
+
+        def _handle(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            wait, roll = config.delay()
+            if wait:
+                time.sleep(wait)
+            if roll < config.throttle_rate:
+                return self._send(429, {"status_code": 25, "status_message": "throttled"}, {"Retry-After": "1"})
+            if roll < config.throttle_rate + config.error_rate:
+                return self._send(500, {"status_code": 11, "status_message": "injected error"})
+            name = fixture_name(url.path)
+            payload = config.load(name)
+            if payload is None and config.record_upstream:
+                payload = self._record(url, name)
+            if payload is None:
+                return self._send(404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+            self._send(200, _personalize(payload, url.path, query))
+
+        def _record(self, url, name):
+            import requests
+            path = url.path[2:] if url.path.startswith("/3/") else url.path
+            resp = requests.get(config.record_upstream.rstrip("/") + path + ("?" + url.query if url.query else ""), timeout=10)
+            if resp.status_code != 200:
+                return None
+            payload = resp.json()
+            os.makedirs(config.fixture_dir, exist_ok=True)
+            with open(os.path.join(config.fixture_dir, name), "w") as f:
+                json.dump(payload, f, indent=1)
+            config._fixtures[name] = payload
+            return payload
+
+    return Handler
+
+
+def start_stub(config, host="127.0.0.1", port=0):
+    """Start the stub on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--record", metavar="UPSTREAM_URL", help="proxy misses to this TMDb base URL and save them")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+                        args.fixtures, args.record, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"TMDb stub listening on http://{args.host}:{args.port} (set TMDB_BASE_URL to this)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,114 @@ class Config:
     TMDB_API_KEY = os.getenv('TMDB_API_KEY', '')
     
     # API endpoints
-    TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+    TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
     
     # DO NOT add access token here unless you're doing OAuth
+
+    # Trending history snapshots (append-only columnar files)
+    TREND_STORE_DIR = os.getenv('TREND_STORE_DIR', 'data/trends')
+    TREND_SNAPSHOT_INTERVAL = int(os.getenv('TREND_SNAPSHOT_INTERVAL', '3600'))
+
+    # Client-side TMDb rate limiting. The rate is per worker process, so the
+    # default splits TMDb's ~40 req/s ceiling across WEB_CONCURRENCY workers.
+    # TMDB_API_KEYS (comma separated) enables rotating across several keys.
+    TMDB_API_KEYS = [k.strip() for k in os.getenv('TMDB_API_KEYS', '').split(',') if k.strip()]
+    TMDB_RATE_PER_SECOND = float(os.getenv('TMDB_RATE_PER_SECOND', str(40 / max(1, int(os.getenv('WEB_CONCURRENCY', '3'))))))
+    TMDB_INTERACTIVE_WAIT = float(os.getenv('TMDB_INTERACTIVE_WAIT', '5'))
+    TMDB_BACKGROUND_WAIT = float(os.getenv('TMDB_BACKGROUND_WAIT', '60'))
+    TMDB_MAX_RETRY_AFTER = float(os.getenv('TMDB_MAX_RETRY_AFTER', '2'))
+    # Upper bound for a single TMDb HTTP call (a request budget can lower it)
+    TMDB_TIMEOUT = float(os.getenv('TMDB_TIMEOUT', '10'))
+    # Consecutive failed TMDb calls that open the circuit, and how long it
+    # stays open before a trial call
+    TMDB_BREAKER_FAILURES = int(os.getenv('TMDB_BREAKER_FAILURES', '5'))
+    TMDB_BREAKER_RESET_SECONDS = float(os.getenv('TMDB_BREAKER_RESET_SECONDS', '30'))
+    # /readyz: how often the database/cache checks rerun, and the longest
+    # the database check may wait on a lock
+    READY_CHECK_INTERVAL = float(os.getenv('READY_CHECK_INTERVAL', '5'))
+    READY_DB_TIMEOUT = float(os.getenv('READY_DB_TIMEOUT', '0.25'))
+    # Time budget for detail and watchlist pages: TMDb/SQLite calls get at
+    # most what is left of it, optional sections are dropped once it is spent
+    PAGE_BUDGET_SECONDS = float(os.getenv('PAGE_BUDGET_SECONDS', '3'))
+
+    # Shared TMDb response cache (one SQLite file per host, RAM-backed when /dev/shm exists)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', '1') == '1'
+    CACHE_PATH = os.getenv('CACHE_PATH', '/dev/shm/movietrends-cache.sqlite3' if os.path.isdir('/dev/shm') else 'data/cache.sqlite3')
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', '600'))
+    # Written on graceful shutdown, reloaded on boot (empty = disabled)
+    CACHE_SNAPSHOT_PATH = os.getenv('CACHE_SNAPSHOT_PATH', 'data/cache-snapshot.sqlite3')
+
+    # Background work (prefetch, enrichment, refresh jobs), per worker process
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '4'))
+    BACKGROUND_MAX_PENDING = int(os.getenv('BACKGROUND_MAX_PENDING', '64'))
+
+    # Infinite-scroll prefetch: after serving page n, fetch n+1 into the cache
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '1') == '1'
+    PREFETCH_MAX_DEPTH = int(os.getenv('PREFETCH_MAX_DEPTH', '10'))
+    PREFETCH_PER_CATEGORY = int(os.getenv('PREFETCH_PER_CATEGORY', '2'))
+
+    # Multi-page search: pages fetched at once for /api/search?stream=1
+    SEARCH_FANOUT_PAGES = int(os.getenv('SEARCH_FANOUT_PAGES', '3'))
+    SEARCH_MAX_PAGES = int(os.getenv('SEARCH_MAX_PAGES', '5'))
+
+    # Single SQLite writer per worker: ops queued within DB_WRITER_MAX_DELAY
+    # seconds (up to DB_WRITER_MAX_BATCH) share one transaction
+    DB_WRITER_MAX_BATCH = int(os.getenv('DB_WRITER_MAX_BATCH', '64'))
+    DB_WRITER_MAX_DELAY = float(os.getenv('DB_WRITER_MAX_DELAY', '0.002'))
+    DB_WRITER_WAIT = float(os.getenv('DB_WRITER_WAIT', '10'))
+
+    # Titles from every fetched listing page are written to Movie in batches
+    CATALOG_WRITE_THROUGH = os.getenv('CATALOG_WRITE_THROUGH', '1') == '1'
+    CATALOG_FLUSH_SECONDS = float(os.getenv('CATALOG_FLUSH_SECONDS', '0.5'))
+    CATALOG_MAX_BATCH = int(os.getenv('CATALOG_MAX_BATCH', '500'))
+    # Stale-metadata refresh: Movie rows not fetched from TMDb for
+    # CATALOG_STALE_SECONDS are re-fetched, CATALOG_REFRESH_BATCH per
+    # CATALOG_REFRESH_INTERVAL across all workers, watchlisted/trending first
+    CATALOG_REFRESH_ENABLED = os.getenv('CATALOG_REFRESH_ENABLED', '1') == '1'
+    CATALOG_STALE_SECONDS = float(os.getenv('CATALOG_STALE_SECONDS', str(3 * 86400)))
+    CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', '300'))
+    CATALOG_REFRESH_BATCH = int(os.getenv('CATALOG_REFRESH_BATCH', '50'))
+    # How long a TMDb 404 for /movie/{id} or /tv/{id} is remembered
+    MEDIA_TYPE_MISS_TTL = float(os.getenv('MEDIA_TYPE_MISS_TTL', '86400'))
+    # Titles added to a watchlist from local metadata get their TMDb details
+    # in the background: up to WATCHLIST_ENRICH_RETRIES retries, the first
+    # after WATCHLIST_ENRICH_BACKOFF seconds and doubling from there
+    WATCHLIST_ENRICH_RETRIES = int(os.getenv('WATCHLIST_ENRICH_RETRIES', '3'))
+    WATCHLIST_ENRICH_BACKOFF = float(os.getenv('WATCHLIST_ENRICH_BACKOFF', '5'))
+    # Most changes one /api/watchlist/changes response carries
+    WATCHLIST_CHANGES_MAX = int(os.getenv('WATCHLIST_CHANGES_MAX', '500'))
+
+    # Threads per worker for fanning one request out into parallel TMDb calls
+    FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '8'))
+
+    # /api/titles batch details
+    TITLES_MAX_BATCH = int(os.getenv('TITLES_MAX_BATCH', '100'))
+
+    # Compiled Jinja templates, shared by all workers and kept across restarts
+    # (empty disables); template chunks per flush for streamed pages
+    TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR', 'data/jinja-cache')
+    TEMPLATE_STREAM_BUFFER = int(os.getenv('TEMPLATE_STREAM_BUFFER', '20'))
+
+    # Content-hashed copies of static/ (plus .gz/.br variants) served with
+    # year-long immutable caching; empty disables
+    ASSET_BUILD_DIR = os.getenv('ASSET_BUILD_DIR', 'static/dist')
+
+    # Community leaderboard: Bayesian prior weight (in votes) and refresh period
+    LEADERBOARD_MIN_VOTES = int(os.getenv('LEADERBOARD_MIN_VOTES', '5'))
+    LEADERBOARD_REFRESH_SECONDS = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', '60'))
+
+    # Password hashing runs in a per-worker process pool (0 = hash inline)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    HASH_POOL_SIZE = int(os.getenv('HASH_POOL_SIZE', '2'))
+    HASH_MAX_PENDING = int(os.getenv('HASH_MAX_PENDING', '16'))
+    HASH_QUEUE_WAIT = float(os.getenv('HASH_QUEUE_WAIT', '2'))
+
+    # SQL tracing (off by default): warn when a request exceeds these budgets
+    SQL_TRACE = os.getenv('SQL_TRACE', '0') == '1'
+    SQL_TRACE_MAX_STATEMENTS = int(os.getenv('SQL_TRACE_MAX_STATEMENTS', '25'))
+    SQL_TRACE_MAX_REPEATS = int(os.getenv('SQL_TRACE_MAX_REPEATS', '5'))
+    SQL_TRACE_MAX_SECONDS = float(os.getenv('SQL_TRACE_MAX_SECONDS', '0.1'))
     
     # Validate API key exists
     @classmethod
@@ -1,29 +1,26 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session
-from data.db import get_connection
 import services.auth_service
+from services.password_hasher import HasherBusy
 
 # Fix: store numeric `session['user_id']` on login to scope watchlist/ratings per user
 auth = Blueprint("auth", __name__)
 authService = services.auth_service.AuthService()
 
+BUSY_MESSAGE = "The server is busy, please try again in a moment"
+
 @auth.route("/login", methods=["GET", "POST"])
 def login():
     error = None
     if request.method == "POST":
-        if authService.authenticate(request.form["email"], request.form["password"]):
-            email = request.form["email"]
-            session["user"] = email
-            # lookup numeric user id from centralized DB and store in session
-            try:
-                conn = get_connection()
-                cur = conn.cursor()
-                cur.execute("SELECT UserID FROM users WHERE Email = ?", (email,))
-                row = cur.fetchone()
-                if row:
-                    session['user_id'] = int(row['UserID'])
-                conn.close()
-            except Exception:
-                pass
+        try:
+            user = authService.authenticate(request.form["email"], request.form["password"])
+        except HasherBusy:
+            return render_template("Log_in.html", error=BUSY_MESSAGE), 503
+        if user:
+            session["user"] = user.email
+            # the lookup already returned the numeric id; scope data to it
+            if user.id is not None:
+                session['user_id'] = int(user.id)
             return redirect(url_for("home.home"))
         else:
             error = "Invalid email or password"
@@ -33,7 +30,11 @@ def login():
 def register():
     error = None
     if request.method == "POST":
-        if authService.register(request.form["email"], request.form["password"]):
+        try:
+            registered = authService.register(request.form["email"], request.form["password"])
+        except HasherBusy:
+            return render_template("Sign_up.html", error=BUSY_MESSAGE), 503
+        if registered:
             return redirect(url_for("auth.login"))
         else:
             error = "Email already registered"
@@ -0,0 +1,17 @@
+from flask import Blueprint, Response, jsonify
+
+from services.health_service import get_readiness
+
+health_bp = Blueprint("health_bp", __name__)
+
+
+@health_bp.route("/healthz")
+def healthz():
+    # liveness: the process answers requests; no database or TMDb calls
+    return Response("ok\n", mimetype="text/plain")
+
+
+@health_bp.route("/readyz")
+def readyz():
+    report = get_readiness()
+    return jsonify(report), 200 if report["ready"] else 503
@@ -1,15 +1,28 @@
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
 from services.movie_service import get_movie_details, get_movie_trailer, get_tv_show_trailer, get_tv_show_details
 from repositories.movie_repository import (
     MovieRepository,
     get_trending_movies,
     search_movies,
+    search_page,
     get_movie_category,
     get_user_by_id,
 )
 from datetime import datetime
 from repositories.rating_repository import get_user_rating, upsert_rating, get_rating_summary
+from services.user_context import get_user_context, load_user_context
+from services.prefetch import record_lookup, schedule_next_page
+from services.search_service import search_events
+from services.title_service import get_titles, parse_title_refs
+from repositories.browse_repository import browse_titles, get_facet_counts
+from services.leaderboard_service import MAX_ENTRIES, WINDOWS, get_leaderboard
+from services.fanout import imap_concurrent
+from services import watchlist_enrichment
+from templating import stream_page
+from deadline import budget, optional
+from config import Config
+import json
 
 
 movie_bp = Blueprint("movie_bp", __name__)
@@ -41,6 +54,9 @@ def movies():
         total_pages = int(total_pages) if total_pages is not None else 1
     except (TypeError, ValueError):
         total_pages = 1
+    if results:
+        # infinite scroll will ask for the next page next
+        schedule_next_page(category, page, total_pages)
 
     # Apply optional sorting server-side for flexibility and compatibility
     def _get_field(item, keys):
@@ -80,23 +96,8 @@ def movies():
                 pass
 
     # include current user (if any) so templates can access `user.id`
-    user = None
-    try:
-        user_id = session.get('user_id', 1)
-        user = get_user_by_id(user_id)
-    except Exception:
-        user = None
-    # build a set of watchlist ids for quick lookup
-    watchlist_ids = set()
-    if user and isinstance(user.get('watchlist'), list):
-        for item in user.get('watchlist'):
-            try:
-                if isinstance(item, dict):
-                    watchlist_ids.add(int(item.get('id')))
-                else:
-                    watchlist_ids.add(int(item))
-            except Exception:
-                continue
+    user = get_user_context()
+    watchlist_ids = user.watchlist_ids if user else frozenset()
 
     # annotate results with in_watchlist flag so templates render correct button state
     if results:
@@ -120,7 +121,7 @@ def movies():
                 except Exception:
                     pass
 
-    return render_template(
+    return stream_page(
         "movies.html",
         movies=results,
         category=category or '',
@@ -132,29 +133,16 @@ def movies():
     )
 
 @movie_bp.route("/movie/<int:movie_id>")
+@budget(Config.PAGE_BUDGET_SECONDS)
 def movie_details(movie_id):
     movie = get_movie_details(movie_id)
-    trailer_key = get_movie_trailer(movie_id)
+    # the rest is optional: left off the page once the budget is spent
+    trailer_key = optional(get_movie_trailer, movie_id)
     user_id = session.get("user_id", 1)
-    my_rating = get_user_rating(user_id, movie_id, "movie")
-    avg_rating, ratings_count = get_rating_summary(movie_id, "movie")
-    user = get_user_by_id(user_id)
-    # determine if this movie is in the user's watchlist
-    in_watchlist = False
-    try:
-        if user and isinstance(user.get('watchlist'), list):
-            for item in user.get('watchlist'):
-                if isinstance(item, dict) and item.get('id') == movie_id:
-                    in_watchlist = True
-                    break
-                try:
-                    if int(item) == movie_id:
-                        in_watchlist = True
-                        break
-                except Exception:
-                    continue
-    except Exception:
-        in_watchlist = False
+    my_rating = optional(get_user_rating, user_id, movie_id, "movie")
+    avg_rating, ratings_count = optional(get_rating_summary, movie_id, "movie", default=(0.0, 0))
+    user = optional(get_user_context)
+    in_watchlist = user.in_watchlist(movie_id) if user else False
 
     return render_template(
         "movie_details.html",
@@ -168,29 +156,16 @@ def movie_details(movie_id):
     )
 
 @movie_bp.route("/tv/<int:tv_show_id>")
+@budget(Config.PAGE_BUDGET_SECONDS)
 def tv_show_details(tv_show_id):
     tv_show = get_tv_show_details(tv_show_id)
-    trailer_key = get_tv_show_trailer(tv_show_id)
+    # the rest is optional: left off the page once the budget is spent
+    trailer_key = optional(get_tv_show_trailer, tv_show_id)
     user_id = session.get('user_id', 1)
-    my_rating = get_user_rating(user_id, tv_show_id, "tv")
-    avg_rating, ratings_count = get_rating_summary(tv_show_id, "tv")
-    user = get_user_by_id(user_id)
-    # check watchlist membership for tv show
-    in_watchlist = False
-    try:
-        if user and isinstance(user.get('watchlist'), list):
-            for item in user.get('watchlist'):
-                if isinstance(item, dict) and item.get('id') == tv_show_id:
-                    in_watchlist = True
-                    break
-                try:
-                    if int(item) == tv_show_id:
-                        in_watchlist = True
-                        break
-                except Exception:
-                    continue
-    except Exception:
-        in_watchlist = False
+    my_rating = optional(get_user_rating, user_id, tv_show_id, "tv")
+    avg_rating, ratings_count = optional(get_rating_summary, tv_show_id, "tv", default=(0.0, 0))
+    user = optional(get_user_context)
+    in_watchlist = user.in_watchlist(tv_show_id) if user else False
 
     return render_template(
         "movie_details.html",
@@ -243,7 +218,11 @@ def api_movies():
         page = int(request.args.get('page', 1))
     except (TypeError, ValueError):
         page = 1
+    record_lookup(category, page)
     results, total_pages = get_movie_category(category, page)
+    if results:
+        # warm the next scroll while the user reads this page
+        schedule_next_page(category, page, total_pages)
     return jsonify({
         'movies': results,
         'page': page,
@@ -258,14 +237,100 @@ def api_search():
         page = int(request.args.get('page', 1))
     except (TypeError, ValueError):
         page = 1
+    if request.args.get('stream') == '1':
+        # NDJSON: one line per page as it arrives, then a summary line
+        events = search_events(q, request.args.get('pages'))
+        lines = (json.dumps(event, separators=(',', ':')) + '\n' for event in events)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
     if not q:
-        return jsonify({'movies': [], 'page': page, 'has_more': False})
-    results = search_movies(q, page)
+        return jsonify({'movies': [], 'page': page, 'total_pages': 0, 'has_more': False})
+    data = search_page(q, page) or {}
+    results = data.get('results') or []
     for r in results:
         if 'media_type' not in r:
             r['media_type'] = 'tv' if r.get('first_air_date') else 'movie'
-    # search endpoint does not currently expose total_pages from repository; return has_more False
-    return jsonify({'movies': results, 'page': page, 'has_more': False})
+    total_pages = data.get('total_pages') or 0
+    return jsonify({'movies': results, 'page': page, 'total_pages': total_pages, 'has_more': page < total_pages})
+
+@movie_bp.route('/api/titles')
+def api_titles():
+    try:
+        refs = parse_title_refs(request.args.get('ids'), request.args.get('types'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    if len(refs) > Config.TITLES_MAX_BATCH:
+        return jsonify({'error': f'At most {Config.TITLES_MAX_BATCH} titles per request'}), 400
+    records, missing = get_titles(refs)
+    return jsonify({'titles': records, 'missing': missing})
+
+@movie_bp.route('/api/browse')
+def api_browse():
+    # local catalogue browse: no TMDb call, filters map onto indexed columns
+    def _number(name, cast):
+        raw = request.args.get(name, '').strip()
+        if not raw:
+            return None
+        try:
+            return cast(raw)
+        except ValueError:
+            raise ValueError(f'Invalid {name}: {raw}')
+
+    try:
+        year_from = _number('year_from', int)
+        year_to = _number('year_to', int)
+        rating_min = _number('rating_min', float)
+        rating_max = _number('rating_max', float)
+        page = max(1, _number('page', int) or 1)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    media_type = request.args.get('media_type', '').strip() or None
+    sort = request.args.get('sort', 'release_date')
+    order = request.args.get('order', 'desc')
+    page_size = 20
+    titles, total = browse_titles(media_type, year_from, year_to, rating_min, rating_max, sort, order, page, page_size)
+    total_pages = (total + page_size - 1) // page_size
+    return jsonify({
+        'titles': titles,
+        'page': page,
+        'total_pages': total_pages,
+        'total_results': total,
+        'has_more': page < total_pages,
+        'facets': get_facet_counts(media_type),
+    })
+
+@movie_bp.route('/api/leaderboard')
+def api_leaderboard():
+    media_type = request.args.get('media_type', 'movie')
+    window = request.args.get('window', 'all')
+    if media_type not in ('movie', 'tv'):
+        return jsonify({'error': 'media_type must be movie or tv'}), 400
+    if window not in WINDOWS:
+        return jsonify({'error': f"window must be one of {', '.join(WINDOWS)}"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', MAX_ENTRIES)), MAX_ENTRIES))
+    except (TypeError, ValueError):
+        limit = MAX_ENTRIES
+    entries = get_leaderboard(media_type, window, limit)
+    return jsonify({'media_type': media_type, 'window': window, 'entries': entries})
+
+@movie_bp.route('/api/watchlist/changes')
+def api_watchlist_changes():
+    """Delta sync for the session user's watchlist: additions and removals
+    since `since` (the `cursor` of the previous response, 0 for everything)."""
+    try:
+        since = max(0, int(request.args.get('since', 0)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'since must be a cursor from a previous response'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', Config.WATCHLIST_CHANGES_MAX)), Config.WATCHLIST_CHANGES_MAX))
+    except (TypeError, ValueError):
+        limit = Config.WATCHLIST_CHANGES_MAX
+    user_id = session.get('user_id', 1)
+    changes = MovieRepository.get_watchlist_changes(user_id, since, limit)
+    if changes is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(dict(changes, user_id=user_id, since=since))
 
 @movie_bp.route('/add_to_watchlist', methods=['POST'])
 def add_to_watchlist_route():
@@ -285,7 +350,7 @@ def add_to_watchlist_route():
     except (TypeError, ValueError):
         movie_id = movie_id_raw
 
-    user = get_user_by_id(user_id)
+    user = _watchlist_context(user_id)
     # Build metadata from the submitted form (prefer form values to avoid TMDb mismatches)
     title = request.form.get('title') or request.form.get('name')
     poster = request.form.get('poster_path')
@@ -302,68 +367,53 @@ def add_to_watchlist_route():
             'media_type': (media_type_raw or request.form.get('media_type') or '').lower() or None
         }
 
-    # fetch movie data via repository using explicit media_type when present
-    movie_data = None
+    # Only local data on this path: our Movie row, else the submitted
+    # metadata. TMDb details are fetched afterwards in the background
+    # (services/watchlist_enrichment), so adding costs one local write.
     media_type = (media_type_raw or '').lower() if media_type_raw else (provided_meta.get('media_type') if provided_meta else None)
-    if media_type == 'tv':
-        movie_data = MovieRepository.fetch_tv_by_id(movie_id)
-    elif media_type == 'movie':
-        movie_data = MovieRepository.fetch_movie_by_id(movie_id)
-    else:
-        # try local DB first (fast) then TMDb movie then tv
-        movie_data = MovieRepository.get_movie_by_tmdb_id(movie_id)
-        if not movie_data:
-            movie_data = MovieRepository.fetch_movie_by_id(movie_id)
-        if not movie_data:
-            movie_data = MovieRepository.fetch_tv_by_id(movie_id)
-
-    # If still not found, prefer provided metadata
-    if not movie_data and provided_meta:
+    movie_data = MovieRepository.get_movie_by_tmdb_id(movie_id)
+    if movie_data and (not movie_data.get('title') or (media_type and movie_data.get('media_type') not in (None, media_type))):
+        movie_data = None
+    from_tmdb = bool(movie_data and movie_data.get('fetched_at') is not None)
+    if not movie_data and provided_meta and provided_meta.get('title'):
         movie_data = provided_meta
 
     if not user:
         return jsonify({"error": "User not found"}), 400
+    if not movie_data:
+        # nothing known locally: this add has to wait for TMDb
+        movie_data, found_type = MovieRepository.fetch_title_by_id(movie_id, media_type)
+        if movie_data:
+            movie_data = dict(movie_data, media_type=movie_data.get('media_type') or found_type)
+            from_tmdb = True
+        else:
+            movie_data = provided_meta
     if not movie_data:
         return jsonify({"error": "Movie data not found and no metadata provided"}), 400
 
-    # Ensure watchlist exists and is a list
-    if 'watchlist' not in user or not isinstance(user.get('watchlist'), list):
-        user['watchlist'] = []
-
-    # Avoid duplicates (compare by id) - coerce to int where possible
-    def _coerce_id(x):
-        try:
-            return int(x)
-        except Exception:
-            return x
-
-    movie_id_val = movie_data.get('id') if isinstance(movie_data, dict) else movie_id
-    movie_id_val = _coerce_id(movie_id_val)
-    exists = False
-    for item in user.get('watchlist', []):
-        candidate = None
-        if isinstance(item, dict):
-            candidate = _coerce_id(item.get('id'))
-        else:
-            candidate = _coerce_id(item)
-        if candidate == movie_id_val:
-            exists = True
-            break
-    if not exists:
-        # keep a lightweight entry in watchlist (id + title + media_type)
-        entry = {
-            'id': movie_id_val,
-            'title': movie_data.get('title') or movie_data.get('name'),
-            'poster_path': movie_data.get('poster_path'),
-            'vote_average': movie_data.get('vote_average'),
-            'release_date': movie_data.get('release_date') or movie_data.get('first_air_date'),
-            'media_type': (movie_data.get('media_type') or ('tv' if movie_data.get('first_air_date') else 'movie')) if isinstance(movie_data, dict) else (media_type or 'movie')
-        }
-        user['watchlist'].append(entry)
-        # persist
-        ok = MovieRepository.save_user_watchlist(user)
+    try:
+        movie_id_val = int(movie_data.get('id') or movie_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid movie_id"}), 400
+    # keep a lightweight entry in watchlist (id + title + media_type)
+    entry = {
+        'id': movie_id_val,
+        'title': movie_data.get('title') or movie_data.get('name'),
+        'poster_path': movie_data.get('poster_path'),
+        'vote_average': movie_data.get('vote_average') if movie_data.get('vote_average') is not None else movie_data.get('rating'),
+        'release_date': movie_data.get('release_date') or movie_data.get('first_air_date'),
+        'media_type': movie_data.get('media_type') or media_type or ('tv' if movie_data.get('first_air_date') else 'movie')
+    }
+    # duplicates are answered from the cached watchlist ids
+    if not user.in_watchlist(movie_id_val):
+        record = dict(movie_data, id=movie_id_val, media_type=entry['media_type'])
+        if not from_tmdb:
+            record['fetched_at'] = None
+        ok = MovieRepository.add_watchlist_item({'id': user.id}, record)
         if not ok:
             return jsonify({'error': 'Failed to save watchlist'}), 500
+        if not from_tmdb:
+            watchlist_enrichment.enqueue(movie_id_val, entry['media_type'])
 
     # Return the actual added item for client confirmation
     return jsonify({'success': True, 'message': 'Added to watchlist', 'item': entry})
@@ -385,56 +435,66 @@ def remove_from_watchlist():
     except (TypeError, ValueError):
         movie_id = movie_id_raw
 
-    user = get_user_by_id(user_id)
-    if not user or 'watchlist' not in user:
+    user = _watchlist_context(user_id)
+    if not user:
         return jsonify({'error': 'User or watchlist not found'}), 400
 
-    original_len = len(user.get('watchlist') or [])
-    user['watchlist'] = [item for item in user.get('watchlist', []) if not ((isinstance(item, dict) and item.get('id') == movie_id) or (item == movie_id))]
-    if len(user['watchlist']) != original_len:
-        ok = MovieRepository.save_user_watchlist(user)
+    if user.in_watchlist(movie_id):
+        ok = MovieRepository.remove_watchlist_item(user.id, movie_id)
         if not ok:
             return jsonify({'error': 'Failed to save watchlist'}), 500
 
     return jsonify({'success': True, 'message': 'Removed from watchlist'})
 
 
+def _watchlist_context(user_id):
+    # the session user's context is usually built for this request already
+    user = get_user_context()
+    if user is not None and user.id == user_id:
+        return user
+    return load_user_context(user_id)
+
+
+def _enrich_watchlist_item(item):
+    # fill in poster and other metadata missing from a stored watchlist item
+    try:
+        mid = item.get('id') if isinstance(item, dict) else item
+        if isinstance(item, dict):
+            # Prefer media_type stored on the watchlist item; if absent, try the local Movie table
+            media_type = item.get('media_type')
+            if not media_type:
+                local = MovieRepository.get_movie_by_tmdb_id(mid)
+                media_type = local.get('media_type') if local else None
+
+            if not item.get('poster_path'):
+                # fetch from TMDb using the stored media_type, or the id ->
+                # media type index when there is none
+                data, found_type = MovieRepository.fetch_title_by_id(mid, media_type)
+
+                if data:
+                    item.setdefault('poster_path', data.get('poster_path'))
+                    item.setdefault('vote_average', data.get('vote_average'))
+                    item.setdefault('release_date', data.get('release_date') or data.get('first_air_date'))
+                    if not item.get('media_type'):
+                        item['media_type'] = data.get('media_type') or found_type
+                    item.setdefault('title', data.get('title') or data.get('name'))
+    except Exception:
+        pass
+    return item
+
+def _enrich_within_budget(item):
+    # once the budget is spent, cards show what the watchlist stored
+    return optional(_enrich_watchlist_item, item, default=item)
+
 @movie_bp.route('/watchlist')
+@budget(Config.PAGE_BUDGET_SECONDS)
 def watchlist():
     user_id = session.get('user_id', 1)
     user = get_user_by_id(user_id)
     watchlist = []
     if user and isinstance(user.get('watchlist'), list):
         watchlist = user.get('watchlist')
-    # enrich watchlist items with poster and other metadata when missing
-    for item in watchlist:
-        try:
-            mid = item.get('id') if isinstance(item, dict) else item
-            if isinstance(item, dict):
-                # Prefer media_type stored on the watchlist item; if absent, try the local Movie table
-                media_type = item.get('media_type')
-                if not media_type:
-                    local = MovieRepository.get_movie_by_tmdb_id(mid)
-                    media_type = local.get('media_type') if local else None
-
-                if not item.get('poster_path'):
-                    # fetch from TMDb using correct endpoint based on media_type when possible
-                    data = None
-                    if media_type == 'tv':
-                        data = MovieRepository.fetch_tv_by_id(mid)
-                    else:
-                        data = MovieRepository.fetch_movie_by_id(mid)
-                        # fallback to tv
-                        if not data:
-                            data = MovieRepository.fetch_tv_by_id(mid)
-
-                    if data:
-                        item.setdefault('poster_path', data.get('poster_path'))
-                        item.setdefault('vote_average', data.get('vote_average'))
-                        item.setdefault('release_date', data.get('release_date') or data.get('first_air_date'))
-                        item.setdefault('media_type', data.get('media_type') or ('tv' if data.get('first_air_date') else 'movie'))
-                        item.setdefault('title', data.get('title') or data.get('name'))
-        except Exception:
-            continue
-
-    return render_template('Watchlist.html', watchlist=watchlist, user=user)
+    # items are enriched in parallel while the page streams, so the first
+    # cards go out without waiting for lookups further down the list
+    return stream_page('Watchlist.html', watchlist=watchlist,
+                       watchlist_items=imap_concurrent(_enrich_within_budget, watchlist), user=user)
@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify
+from services.trend_service import climbing_fastest, days_in_top, rank_velocity, title_days_in_top
+
+trends_bp = Blueprint("trends_bp", __name__)
+
+
+def _int_arg(name, default, lo, hi):
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(lo, min(value, hi))
+
+
+@trends_bp.route('/api/trends/climbing')
+def api_climbing():
+    list_name = request.args.get('list', 'all_day')
+    hours = _int_arg('hours', 24, 1, 24 * 366)
+    limit = _int_arg('limit', 20, 1, 100)
+    try:
+        results = climbing_fastest(list_name, hours, limit)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({'list': list_name, 'hours': hours, 'results': results})
+
+
+@trends_bp.route('/api/trends/top-days')
+def api_top_days():
+    list_name = request.args.get('list', 'all_day')
+    top = _int_arg('top', 20, 1, 20)
+    days = _int_arg('days', 365, 1, 3660)
+    limit = _int_arg('limit', 20, 1, 100)
+    try:
+        results = days_in_top(list_name, top, days, limit)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({'list': list_name, 'top': top, 'days': days, 'results': results})
+
+
+@trends_bp.route('/api/trends/<media_type>/<int:tmdb_id>')
+def api_title_trend(media_type, tmdb_id):
+    if media_type not in ('movie', 'tv'):
+        return jsonify({'error': 'media_type must be movie or tv'}), 400
+    list_name = request.args.get('list', 'all_day')
+    hours = _int_arg('hours', 24 * 7, 1, 24 * 366)
+    try:
+        velocity, history = rank_velocity(tmdb_id, media_type, list_name, hours)
+        top_days = title_days_in_top(tmdb_id, media_type, list_name)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({
+        'id': tmdb_id,
+        'media_type': media_type,
+        'list': list_name,
+        'hours': hours,
+        'velocity': velocity['velocity'] if velocity else None,
+        'days_in_top_20': top_days,
+        'history': history,
+    })
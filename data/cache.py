@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import deadline as request_deadline
+
+# Host-wide response cache shared by every gunicorn worker. Entries live in a
+# small SQLite file (on /dev/shm when available, so it is RAM-backed) which
+# gives atomic writes and cross-process visibility for free. Entries carry a
+# TTL, the file is kept under a byte budget by evicting the entries closest to
+# expiry, and get_or_set() lets one worker fetch while the others wait for it.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires_at);
+CREATE TABLE IF NOT EXISTS cache_meta (id INTEGER PRIMARY KEY CHECK (id = 1), total_bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO cache_meta(id, total_bytes) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS cache_size_ins AFTER INSERT ON cache BEGIN
+    UPDATE cache_meta SET total_bytes = total_bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_del AFTER DELETE ON cache BEGIN
+    UPDATE cache_meta SET total_bytes = total_bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_size_upd AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_meta SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+CREATE TABLE IF NOT EXISTS cache_lease (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+"""
+
+_MISSING = object()
+
+
+class SharedCache:
+    def __init__(self, path, max_bytes=32 * 1024 * 1024, default_ttl=600, lease_seconds=5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._key_locks = {}
+        self._key_locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self):
+        # one connection per thread, reopened after fork so workers never
+        # share a SQLite handle inherited from the master process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _lookup(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return _MISSING if row is None else json.loads(row[0])
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO cache(key, value, size, expires_at, stored_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, stored_at = excluded.stored_at",
+                (key, payload, len(payload) + len(key), now + (self.default_ttl if ttl is None else ttl), now),
+            )
+            total = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 1").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, total, now):
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 1").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if total <= target:
+            return
+        # drop entries that would expire soonest until back under budget
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY expires_at"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= target:
+                break
+        conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def stats(self):
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        total = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 1").fetchone()[0]
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def save_snapshot(self, path):
+        """Copy the live entries to `path` (on persistent disk) so the next
+        boot can start warm. Returns the number of entries saved."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = self._conn()
+        conn.execute("ATTACH DATABASE ? AS snap", (tmp,))
+        try:
+            conn.execute("CREATE TABLE snap.cache AS SELECT key, value, size, expires_at, stored_at FROM cache WHERE expires_at > ?", (time.time(),))
+            saved = conn.execute("SELECT COUNT(*) FROM snap.cache").fetchone()[0]
+        finally:
+            conn.execute("DETACH DATABASE snap")
+        os.replace(tmp, path)
+        return saved
+
+    def restore_snapshot(self, path):
+        """Load entries from a snapshot that are still within their TTL.
+        Only a cold (empty) cache is restored, so when every worker calls this
+        on boot the first one does the work and the rest are no-ops."""
+        if not os.path.exists(path):
+            return 0
+        conn = self._conn()
+        conn.execute("ATTACH DATABASE ? AS snap", (path,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM cache LIMIT 1").fetchone():
+                    conn.execute("ROLLBACK")
+                    return 0
+                now = time.time()
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO cache(key, value, size, expires_at, stored_at) "
+                    "SELECT key, value, size, expires_at, stored_at FROM snap.cache WHERE expires_at > ?",
+                    (now,),
+                )
+                restored = cur.rowcount
+                total = conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 1").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, total, now)
+                conn.execute("COMMIT")
+                return restored
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.DatabaseError as error:
+            print(f"Ignoring unreadable cache snapshot {path}: {error}")
+            return 0
+        finally:
+            conn.execute("DETACH DATABASE snap")
+
+    def _key_lock(self, key):
+        with self._key_locks_guard:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                if len(self._key_locks) > 1024:
+                    self._key_locks.clear()
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _try_lease(self, key):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_lease WHERE key = ? AND expires_at <= ?", (key, now))
+        cur = conn.execute("INSERT OR IGNORE INTO cache_lease(key, expires_at) VALUES (?, ?)", (key, now + self.lease_seconds))
+        return cur.rowcount == 1
+
+    def _lease_held(self, key):
+        row = self._conn().execute(
+            "SELECT 1 FROM cache_lease WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def get_or_set(self, key, producer, ttl=None):
+        """Return the cached value for `key`, or call `producer()` once across
+        all threads and workers and cache its result. None results are not cached."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._key_lock(key):
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            leased = self._try_lease(key)
+            if not leased:
+                # another worker is fetching: wait for its result briefly
+                # (no longer than the current request has left)
+                deadline = time.time() + request_deadline.timeout(self.lease_seconds)
+                while time.time() < deadline:
+                    time.sleep(0.02)
+                    value = self._lookup(key)
+                    if value is not _MISSING:
+                        return value
+                    if not self._lease_held(key):
+                        break  # the other fetch failed; try ourselves
+            try:
+                value = producer()
+                if value is not None:
+                    self.set(key, value, ttl)
+                return value
+            finally:
+                if leased:
+                    self._conn().execute("DELETE FROM cache_lease WHERE key = ?", (key,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from config import Config
+                _cache = SharedCache(Config.CACHE_PATH, Config.CACHE_MAX_BYTES, Config.CACHE_DEFAULT_TTL)
+    return _cache
+
+
+def restore_cache_snapshot():
+    """Warm the shared cache from the snapshot written at the last shutdown."""
+    from config import Config
+    if not (Config.CACHE_ENABLED and Config.CACHE_SNAPSHOT_PATH):
+        return 0
+    try:
+        return get_cache().restore_snapshot(Config.CACHE_SNAPSHOT_PATH)
+    except Exception as error:
+        print(f"Cache snapshot restore failed: {error}")
+        return 0
+
+
+def save_cache_snapshot():
+    from config import Config
+    if not (Config.CACHE_ENABLED and Config.CACHE_SNAPSHOT_PATH):
+        return 0
+    try:
+        return get_cache().save_snapshot(Config.CACHE_SNAPSHOT_PATH)
+    except Exception as error:
+        print(f"Cache snapshot save failed: {error}")
+        return 0
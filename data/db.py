@@ -1,17 +1,169 @@
+import os
 import sqlite3
+import time
+
+import deadline
+from instrumentation import add_timing
+from data import query_tracer
 
 # Fix: switched DB to centralized data/database.db and create normalized tables
-DB_PATH = "data/database.db"
+DB_PATH = os.getenv("DATABASE_PATH", "data/database.db")
+
+# Bump whenever init_db() gains new DDL. The number is stored in the database
+# file (PRAGMA user_version) so a boot against an up-to-date file skips the
+# schema work entirely.
+SCHEMA_VERSION = 7
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that charges statement time to the current request's db timing."""
+
+    def execute(self, *args):
+        began = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+    def executemany(self, *args):
+        began = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+    def fetchall(self):
+        began = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+    def fetchone(self):
+        began = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+    def fetchmany(self, *args):
+        began = time.perf_counter()
+        try:
+            return super().fetchmany(*args)
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+    def __next__(self):
+        # iterating a cursor steps the statement one row at a time
+        began = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
 
-def get_connection():
-    connection = sqlite3.connect(DB_PATH)
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        began = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            add_timing("db", time.perf_counter() - began)
+
+
+def get_connection(db_path=None):
+    # how long to wait on a locked database: sqlite's 5s, or less if the
+    # current request's budget is nearly spent
+    began = time.perf_counter()
+    try:
+        connection = sqlite3.connect(db_path or DB_PATH, factory=TimedConnection, timeout=deadline.timeout(5.0))
+    finally:
+        add_timing("db", time.perf_counter() - began)
+    query_tracer.install(connection)
     connection.row_factory = sqlite3.Row
     return connection
 
-def init_db():
-    connection = get_connection()
+# ReleaseDate 'YYYY-MM-DD...' as a sortable integer YYYYMMDD (NULL otherwise)
+def _release_day_sql(column):
+    return (f"CASE WHEN {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+            f"THEN CAST(substr({column}, 1, 4) || substr({column}, 6, 2) || substr({column}, 9, 2) AS INTEGER) END")
+
+
+def _facet_sql(row, delta):
+    """Statements adding `delta` to the facet counts of Movie row `row`."""
+    category = f"COALESCE({row}.Category, 0)"
+    year = f"({_release_day_sql(row + '.ReleaseDate')}) / 10000"
+    rating = f"CAST({row}.Rating AS INTEGER)"
+    if delta > 0:
+        return "".join(
+            f"INSERT INTO MovieFacet(Category, Facet, Value, Count) SELECT {category}, '{facet}', {value}, 1 "
+            f"WHERE {value} IS NOT NULL ON CONFLICT(Category, Facet, Value) DO UPDATE SET Count = Count + 1;\n"
+            for facet, value in (("all", "0"), ("year", year), ("rating", rating))
+        )
+    return "".join(
+        f"UPDATE MovieFacet SET Count = Count - 1 WHERE Category = {category} AND Facet = '{facet}' AND Value = {value};\n"
+        for facet, value in (("all", "0"), ("year", year), ("rating", rating))
+    )
+
+
+def _rating_day_sql(row):
+    return f"CAST(strftime('%s', COALESCE({row}.updated_at, {row}.created_at, 'now')) / 86400 AS INTEGER)"
+
+
+def _rating_sql(row, delta):
+    """Statements adding (delta > 0) or removing rating row `row` from the
+    leaderboard aggregates."""
+    sign = "+" if delta > 0 else "-"
+    return "".join(
+        f"INSERT INTO {table}({key_columns}Count, Total) VALUES ({key_values}{delta}, {delta} * {row}.rating_value) "
+        f"ON CONFLICT DO UPDATE SET Count = Count {sign} 1, Total = Total {sign} {row}.rating_value;\n"
+        for table, key_columns, key_values in (
+            ("RatingAggregate", "tmdb_id, media_type, ", f"{row}.tmdb_id, {row}.media_type, "),
+            ("RatingDaily", "Day, tmdb_id, media_type, ", f"{_rating_day_sql(row)}, {row}.tmdb_id, {row}.media_type, "),
+        )
+    )
+
+
+def schema_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def ping(timeout=0.25, db_path=None):
+    """Open the database with a short busy timeout and return its schema
+    version (raises sqlite3.Error when it cannot be read)."""
+    connection = sqlite3.connect(db_path or DB_PATH, timeout=timeout)
+    try:
+        return schema_version(connection)
+    finally:
+        connection.close()
+
+
+def init_db(db_path=None):
+    connection = get_connection(db_path)
+    try:
+        if schema_version(connection) >= SCHEMA_VERSION:
+            return False
+        _create_schema(connection)
+        return True
+    finally:
+        connection.close()
+
+
+def _create_schema(connection):
     cursor = connection.cursor()
 
+    # WAL lets request threads keep reading while another thread writes
+    # (the mode is persistent, so it only needs setting with the schema)
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS ratings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -72,11 +224,198 @@ def init_db():
     );
     """)
 
+    # Per-user watchlist version, bumped by triggers on every WatchlistItem
+    # change so caches of a user's watchlist can be validated cheaply
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS WatchlistVersion (
+        UserID INTEGER PRIMARY KEY,
+        Version INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+    # Delta sync: the latest change per (user, title) stamped with the
+    # version it produced. Removals stay behind as tombstones (Removed = 1),
+    # so "what changed since version N" is one range scan on the primary key.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS WatchlistChange (
+        UserID INTEGER NOT NULL,
+        Seq INTEGER NOT NULL,
+        MovieID INTEGER NOT NULL,
+        Removed INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (UserID, Seq)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_watchlist_change_movie ON WatchlistChange(UserID, MovieID)")
+    for event in ("INSERT", "DELETE"):
+        row = "NEW" if event == "INSERT" else "OLD"
+        # recreated rather than IF NOT EXISTS: older files have the
+        # version-only trigger under the same name
+        cursor.execute(f"DROP TRIGGER IF EXISTS watchlist_version_{event.lower()}")
+        cursor.execute(f"""
+        CREATE TRIGGER watchlist_version_{event.lower()} AFTER {event} ON WatchlistItem
+        BEGIN
+            INSERT INTO WatchlistVersion(UserID, Version) VALUES ({row}.UserID, 1)
+            ON CONFLICT(UserID) DO UPDATE SET Version = Version + 1;
+            DELETE FROM WatchlistChange WHERE UserID = {row}.UserID AND MovieID = {row}.MovieID;
+            INSERT OR REPLACE INTO WatchlistChange(UserID, Seq, MovieID, Removed)
+            SELECT {row}.UserID, Version, {row}.MovieID, {int(event == "DELETE")}
+            FROM WatchlistVersion WHERE UserID = {row}.UserID;
+        END;
+        """)
+    # items that predate the log are logged as added, one version each on
+    # top of the user's current one
+    cursor.execute("""
+    INSERT OR IGNORE INTO WatchlistChange(UserID, Seq, MovieID, Removed)
+    SELECT w.UserID, COALESCE(v.Version, 0) + ROW_NUMBER() OVER (PARTITION BY w.UserID ORDER BY w.WatchlistItemID), w.MovieID, 0
+    FROM WatchlistItem w LEFT JOIN WatchlistVersion v ON v.UserID = w.UserID
+    WHERE NOT EXISTS (SELECT 1 FROM WatchlistChange c WHERE c.UserID = w.UserID AND c.MovieID = w.MovieID)
+    """)
+    cursor.execute("""
+    INSERT INTO WatchlistVersion(UserID, Version)
+    SELECT UserID, MAX(Seq) FROM WatchlistChange WHERE 1 GROUP BY UserID
+    ON CONFLICT(UserID) DO UPDATE SET Version = MAX(Version, excluded.Version)
+    """)
+
+    # Local browsing: ReleaseDay is ReleaseDate as a sortable integer, kept in
+    # sync by triggers; MovieFacet holds per-media-type counts by release year
+    # and whole-star rating so filter sidebars never scan Movie.
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(Movie)").fetchall()}
+    if "ReleaseDay" not in columns:
+        cursor.execute("ALTER TABLE Movie ADD COLUMN ReleaseDay INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_category_day ON Movie(Category, ReleaseDay)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_category_rating ON Movie(Category, Rating)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_day ON Movie(ReleaseDay)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_rating ON Movie(Rating)")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS MovieFacet (
+        Category INTEGER NOT NULL,
+        Facet TEXT NOT NULL,
+        Value INTEGER NOT NULL,
+        Count INTEGER NOT NULL,
+        PRIMARY KEY (Category, Facet, Value)
+    );
+    """)
+    for event, when in (("insert", "INSERT"), ("update", "UPDATE OF ReleaseDate")):
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS movie_release_day_{event} AFTER {when} ON Movie
+        BEGIN
+            UPDATE Movie SET ReleaseDay = {_release_day_sql('NEW.ReleaseDate')} WHERE MovieID = NEW.MovieID;
+        END;
+        """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS movie_facets_insert AFTER INSERT ON Movie
+    BEGIN
+        {_facet_sql('NEW', 1)}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS movie_facets_delete AFTER DELETE ON Movie
+    BEGIN
+        {_facet_sql('OLD', -1)}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS movie_facets_update AFTER UPDATE OF Category, ReleaseDate, Rating ON Movie
+    BEGIN
+        {_facet_sql('OLD', -1)}
+        {_facet_sql('NEW', 1)}
+    END;
+    """)
+    # backfill rows written before the triggers existed
+    cursor.execute(f"UPDATE Movie SET ReleaseDay = {_release_day_sql('ReleaseDate')}")
+    cursor.execute("DELETE FROM MovieFacet")
+    for facet, value in (("all", "0"), ("year", "ReleaseDay / 10000"), ("rating", "CAST(Rating AS INTEGER)")):
+        cursor.execute(f"""
+        INSERT INTO MovieFacet(Category, Facet, Value, Count)
+        SELECT COALESCE(Category, 0), '{facet}', {value}, COUNT(*) FROM Movie
+        WHERE {value} IS NOT NULL GROUP BY 1, 3
+        """)
+
+    # Community leaderboard: per-title rating count/sum overall and per day
+    # (epoch day of the rating's last update), kept current by triggers so
+    # rankings read one row per title instead of aggregating every rating.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS RatingAggregate (
+        tmdb_id INTEGER NOT NULL,
+        media_type TEXT NOT NULL,
+        Count INTEGER NOT NULL,
+        Total REAL NOT NULL,
+        PRIMARY KEY (tmdb_id, media_type)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS RatingDaily (
+        Day INTEGER NOT NULL,
+        tmdb_id INTEGER NOT NULL,
+        media_type TEXT NOT NULL,
+        Count INTEGER NOT NULL,
+        Total REAL NOT NULL,
+        PRIMARY KEY (Day, tmdb_id, media_type)
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rating_aggregate_media ON RatingAggregate(media_type)")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS ratings_aggregate_insert AFTER INSERT ON ratings
+    BEGIN
+        {_rating_sql('NEW', 1)}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS ratings_aggregate_delete AFTER DELETE ON ratings
+    BEGIN
+        {_rating_sql('OLD', -1)}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS ratings_aggregate_update AFTER UPDATE OF rating_value, updated_at, tmdb_id, media_type ON ratings
+    BEGIN
+        {_rating_sql('OLD', -1)}
+        {_rating_sql('NEW', 1)}
+    END;
+    """)
+    # backfill ratings stored before the triggers existed
+    cursor.execute("DELETE FROM RatingAggregate")
+    cursor.execute("DELETE FROM RatingDaily")
+    cursor.execute("""
+    INSERT INTO RatingAggregate(tmdb_id, media_type, Count, Total)
+    SELECT tmdb_id, media_type, COUNT(*), SUM(rating_value) FROM ratings GROUP BY tmdb_id, media_type
+    """)
+    cursor.execute(f"""
+    INSERT INTO RatingDaily(Day, tmdb_id, media_type, Count, Total)
+    SELECT {_rating_day_sql('ratings')}, tmdb_id, media_type, COUNT(*), SUM(rating_value) FROM ratings GROUP BY 1, 2, 3
+    """)
+
+    # Freshness tracking: FetchedAt is when the row's data last came from TMDb
+    # (NULL for user-supplied fallback metadata), ContentHash a digest of the
+    # stored fields so upserts can skip rows whose content did not change.
+    # Existing rows start out unhashed and unfetched, i.e. due for a refresh.
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(Movie)").fetchall()}
+    if "FetchedAt" not in columns:
+        cursor.execute("ALTER TABLE Movie ADD COLUMN FetchedAt REAL")
+    if "ContentHash" not in columns:
+        cursor.execute("ALTER TABLE Movie ADD COLUMN ContentHash TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_fetched ON Movie(FetchedAt)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_movie ON WatchlistItem(MovieID)")
+
+    # Which media types each TMDb id is known to exist under (ids are only
+    # unique per type), so lookups by bare id go to the right endpoint
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS TitleMediaType (
+        tmdb_id INTEGER NOT NULL,
+        media_type TEXT NOT NULL,
+        PRIMARY KEY (tmdb_id, media_type)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("""
+    INSERT OR IGNORE INTO TitleMediaType(tmdb_id, media_type)
+    SELECT m.MovieID, c.Name FROM Movie m JOIN Category c ON m.Category = c.CategoryID
+    WHERE c.Name IN ('movie', 'tv')
+    """)
+
     # Ensure there is a default guest user with UserID=1
     try:
         cursor.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (1, 'guest', 'guest@example.com')")
     except Exception:
         pass
 
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     connection.commit()
-    connection.close()
@@ -0,0 +1,201 @@
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future, TimeoutError
+
+import deadline
+from instrumentation import Counter, Histogram, register
+
+# Single writer per process. Request threads hand write operations to one
+# writer thread instead of each opening a connection and committing on its
+# own; the writer applies whatever has queued up (up to max_batch, or what
+# arrives within max_delay of the first op) in a single BEGIN IMMEDIATE
+# transaction, so N concurrent writes cost one lock acquisition and one
+# commit. Every op runs in its own savepoint: a failing op is rolled back
+# and reported to its caller without affecting the rest of the batch.
+#
+# An op is a callable op(cursor, *args). Callers either wait for the commit
+# (the result is returned once it is durable) or take the Future and move on.
+# A caller that stops waiting cancels its op if it has not started yet, so a
+# timeout is never reported for a write that goes on to commit.
+# Ops that cache what they wrote (e.g. new row ids) do it through on_commit(),
+# so a rolled-back op or batch never leaves a stale entry behind.
+
+BATCH_SIZE = register(Histogram("movietrends_db_write_batch_size", "Write operations committed per transaction.", (),
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)))
+WRITES = register(Counter("movietrends_db_writes_total", "Queued write operations, by outcome.", ("result",)))
+
+
+_op_state = threading.local()
+
+
+def on_commit(callback):
+    """Run callback() after the current write op's transaction commits. It is
+    dropped when the op or its batch is rolled back, and outside a write op
+    (where nothing says the caller's transaction will commit) it never runs."""
+    callbacks = getattr(_op_state, "callbacks", None)
+    if callbacks is not None:
+        callbacks.append(callback)
+
+
+class DbWriter:
+    def __init__(self, db_path=None, max_batch=64, max_delay=0.002):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # the queue and thread of a parent process are useless after fork
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name="db-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            return self._queue
+
+    def submit(self, op, *args):
+        """Queue op(cursor, *args); returns a Future resolved after commit."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("write ops must not queue further writes and wait for them")
+        future = Future()
+        self._ensure_thread().put((future, op, args))
+        return future
+
+    def run(self, op, *args, wait=True, timeout=None):
+        """Queue op and, by default, block until it is committed and return
+        its result (raising its exception). With wait=False the write is
+        fire-and-forget: failures are logged, the Future is returned.
+
+        On timeout a still-queued op is cancelled and TimeoutError raised;
+        one that has started holds the write transaction already and is
+        waited for."""
+        future = self.submit(op, *args)
+        if wait:
+            try:
+                return future.result(timeout)
+            except TimeoutError:
+                if future.cancel():
+                    WRITES.inc("cancelled")
+                    raise
+                return future.result()
+        future.add_done_callback(_log_failure)
+        return future
+
+    def drain(self, timeout=5.0):
+        """Wait until everything queued so far is committed (ops are applied
+        in order, so a no-op finishing means all earlier ones have)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self.submit(_noop).result(timeout)
+
+    def _run(self, ops):
+        connection = None
+        while True:
+            batch = [ops.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(ops.get(timeout=remaining) if remaining > 0 else ops.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if connection is None:
+                    connection = self._connect()
+                self._apply(connection, batch)
+            except Exception as error:
+                # connection-level failure: fail the whole batch, reconnect next time
+                for future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                WRITES.inc("failed", amount=len(batch))
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+
+    def _connect(self):
+        from data.db import get_connection
+        connection = get_connection(self.db_path)
+        # explicit BEGIN IMMEDIATE/COMMIT below instead of implicit transactions
+        connection.isolation_level = None
+        return connection
+
+    def _apply(self, connection, batch):
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        outcomes = []
+        committed = []
+        try:
+            for future, op, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT write_op")
+                _op_state.callbacks = []
+                try:
+                    result = op(cursor, *args)
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO write_op")
+                    outcomes.append((future, None, error))
+                else:
+                    outcomes.append((future, result, None))
+                    committed.extend(_op_state.callbacks)
+                finally:
+                    _op_state.callbacks = None
+                    cursor.execute("RELEASE write_op")
+            cursor.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        for callback in committed:
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+        BATCH_SIZE.observe(len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+                WRITES.inc("committed")
+            else:
+                future.set_exception(error)
+                WRITES.inc("failed")
+
+
+def _noop(cursor):
+    return None
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        error = future.exception()
+        print("Background write failed:", error)
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_db_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from config import Config
+                _writer = DbWriter(None, Config.DB_WRITER_MAX_BATCH, Config.DB_WRITER_MAX_DELAY)
+    return _writer
+
+
+def write(op, *args, wait=True):
+    """Run op(cursor, *args) through the process's writer (see DbWriter.run)."""
+    from config import Config
+    return get_db_writer().run(op, *args, wait=wait, timeout=deadline.timeout(Config.DB_WRITER_WAIT) if wait else None)
@@ -0,0 +1,106 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context
+
+from config import Config
+
+# Opt-in SQL statement tracer built on sqlite3's trace callback. When enabled
+# (SQL_TRACE=1, or inside query_budget()) every connection from get_connection
+# reports each statement it runs; statements are grouped by "shape" (literals
+# replaced with ?) so N+1 loops show up as one shape with a high count.
+
+_capture = ContextVar("sql_capture", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.shapes = Counter()
+
+    def record(self, sql):
+        self.count += 1
+        self.shapes[statement_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+def statement_shape(sql):
+    shape = _STRING.sub("?", sql)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def enabled():
+    return Config.SQL_TRACE or _capture.get() is not None
+
+
+def on_statement(sql):
+    stats = _capture.get()
+    if stats is None:
+        if not has_request_context():
+            return
+        stats = g.get("_sql_stats")
+        if stats is None:
+            stats = g._sql_stats = QueryStats()
+    stats.record(sql)
+
+
+def install(connection):
+    """Attach the tracer to `connection` if tracing is on."""
+    if enabled():
+        connection.set_trace_callback(on_statement)
+    return connection
+
+
+def report_request(response):
+    """after_request hook: warn when a request crossed the configured budget."""
+    stats = g.get("_sql_stats")
+    if stats is None:
+        return response
+    total, _ = g.get("_timings", {}).get("db", (0.0, 0))
+    repeated = stats.repeated(Config.SQL_TRACE_MAX_REPEATS)
+    if stats.count > Config.SQL_TRACE_MAX_STATEMENTS or total > Config.SQL_TRACE_MAX_SECONDS or repeated:
+        from flask import request
+        current_app.logger.warning(
+            "SQL budget exceeded on %s %s: %d statements, %.1f ms; repeated shapes: %s",
+            request.method, request.path, stats.count, total * 1000,
+            "; ".join(f"{n}x {shape}" for shape, n in repeated) or "none",
+        )
+    return response
+
+
+@contextmanager
+def query_budget(max_statements, max_repeats=None):
+    """Test helper: fail if the block runs more than `max_statements` SQL
+    statements, or any single statement shape more than `max_repeats` times.
+
+        with query_budget(5):
+            client.get('/watchlist')
+    """
+    stats = QueryStats()
+    token = _capture.set(stats)
+    try:
+        yield stats
+    finally:
+        _capture.reset(token)
+    problems = []
+    if stats.count > max_statements:
+        problems.append(f"{stats.count} statements (budget {max_statements})")
+    if max_repeats is not None:
+        problems.extend(f"{n}x {shape}" for shape, n in stats.repeated(max_repeats))
+    if problems:
+        raise AssertionError("Query budget exceeded: " + "; ".join(problems))
+
+
+def init_app(app):
+    app.after_request(report_request)
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to in-process locking only
+    fcntl = None
+
+# Append-only columnar store for trending snapshots. Every column is a flat
+# binary file of fixed-width values so a whole column loads with one read
+# into an array and analytics can slice it by row range.
+
+COLUMNS = (
+    ("ts", "q"),            # snapshot time (unix seconds)
+    ("list", "b"),          # which trending list the row came from (LISTS)
+    ("tmdb_id", "q"),
+    ("media", "b"),         # MEDIA_TYPES code
+    ("rank", "H"),          # 1-based position in the list (page offset applied)
+    ("popularity", "f"),
+    ("vote_average", "f"),
+)
+
+LISTS = {"all_week": 0, "all_day": 1, "movie_day": 2, "tv_day": 3}
+MEDIA_TYPES = {"movie": 0, "tv": 1}
+MEDIA_NAMES = {code: name for name, code in MEDIA_TYPES.items()}
+PAGE_SIZE = 20
+
+TrendColumns = namedtuple("TrendColumns", [name for name, _ in COLUMNS])
+
+
+class TrendStore:
+    def __init__(self, directory, min_interval=3600):
+        self.directory = directory
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._cached = None
+        self._cached_size = -1
+        self._recent = {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".col")
+
+    def _index_path(self):
+        return os.path.join(self.directory, "last_snapshot.json")
+
+    def snapshot(self, list_name, page, results, ts=None):
+        """Append one trending page unless the same list/page was stored less than
+        `min_interval` seconds ago. Returns True when rows were written."""
+        if list_name not in LISTS or not results:
+            return False
+        ts = int(ts if ts is not None else time.time())
+        key = f"{list_name}:{page}"
+        # cheap in-process check first; the file index below is authoritative
+        if ts - self._recent.get(key, ts - self.min_interval) < self.min_interval:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                last = self._read_index()
+                if key in last and ts - last[key] < self.min_interval:
+                    self._recent[key] = last[key]
+                    return False
+                # keep the ts column sorted so readers can bisect it
+                ts = max([ts] + list(last.values()))
+                self._trim_ragged_tails()
+                columns = {name: array(code) for name, code in COLUMNS}
+                offset = (max(int(page or 1), 1) - 1) * PAGE_SIZE
+                for position, item in enumerate(results):
+                    tmdb_id = item.get("id")
+                    if tmdb_id is None:
+                        continue
+                    media_type = item.get("media_type") or ("tv" if item.get("first_air_date") else "movie")
+                    columns["ts"].append(ts)
+                    columns["list"].append(LISTS[list_name])
+                    columns["tmdb_id"].append(int(tmdb_id))
+                    columns["media"].append(MEDIA_TYPES.get(media_type, 0))
+                    columns["rank"].append(offset + position + 1)
+                    columns["popularity"].append(float(item.get("popularity") or 0))
+                    columns["vote_average"].append(float(item.get("vote_average") or 0))
+                for name, _ in COLUMNS:
+                    with open(self._path(name), "ab") as f:
+                        columns[name].tofile(f)
+                last[key] = ts
+                self._recent[key] = ts
+                tmp_path = self._index_path() + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(last, f)
+                os.replace(tmp_path, self._index_path())
+                return True
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _trim_ragged_tails(self):
+        # A crash between column writes leaves columns of different lengths;
+        # cut them back to the shortest one before appending more rows.
+        sizes = {}
+        for name, code in COLUMNS:
+            try:
+                sizes[name] = os.path.getsize(self._path(name)) // array(code).itemsize
+            except OSError:
+                sizes[name] = 0
+        rows = min(sizes.values())
+        for name, code in COLUMNS:
+            if sizes[name] > rows:
+                with open(self._path(name), "r+b") as f:
+                    f.truncate(rows * array(code).itemsize)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self):
+        """Return all columns as arrays. Reloads only when the files grew."""
+        try:
+            size = os.path.getsize(self._path("ts"))
+        except OSError:
+            size = 0
+        with self._lock:
+            if self._cached is not None and size == self._cached_size:
+                return self._cached
+            columns = {}
+            for name, code in COLUMNS:
+                arr = array(code)
+                try:
+                    with open(self._path(name), "rb") as f:
+                        data = f.read()
+                    arr.frombytes(data[:len(data) - len(data) % arr.itemsize])
+                except OSError:
+                    pass
+                columns[name] = arr
+            # a writer may be mid-append; only expose complete rows
+            rows = min(len(arr) for arr in columns.values())
+            for name in columns:
+                if len(columns[name]) > rows:
+                    del columns[name][rows:]
+            self._cached = TrendColumns(**columns)
+            self._cached_size = size
+            return self._cached
+
+    def rows_since(self, since_ts):
+        """Column arrays plus the first row index whose ts >= since_ts."""
+        cols = self.load()
+        return cols, bisect_left(cols.ts, since_ts)
+
+
+_store = None
+
+
+def get_trend_store():
+    global _store
+    if _store is None:
+        from config import Config
+        _store = TrendStore(Config.TREND_STORE_DIR, Config.TREND_SNAPSHOT_INTERVAL)
+    return _store
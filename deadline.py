@@ -0,0 +1,60 @@
+import functools
+import time
+
+from flask import g, has_app_context
+
+from instrumentation import Counter, register
+
+# Per-request time budgets. A route decorated with @budget(seconds) gets a
+# deadline; TMDb calls, SQLite connections and queued writes made while
+# serving it use the time left as their timeout instead of their own
+# (longer) defaults, so the request cannot outlive its budget by much.
+# Page sections the route can do without are wrapped in optional(): once
+# the budget is spent they are skipped and the page renders without them.
+#
+# The deadline lives on flask.g, so it ends with the request (including a
+# streamed body) and reaches fan-out threads that run in a copy of the
+# request's context. Code outside a request has no deadline.
+
+DROPPED = register(Counter("movietrends_sections_dropped_total", "Optional page sections skipped because the request budget ran out.", ("section",)))
+
+
+def budget(seconds):
+    """Route decorator giving each request `seconds` in total."""
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g._deadline = time.monotonic() + seconds
+            return view(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def remaining():
+    """Seconds left in the current request's budget, or None without one."""
+    if not has_app_context():
+        return None
+    deadline = g.get("_deadline")
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def timeout(default):
+    """`default`, capped at the time left in the budget."""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def optional(fn, *args, default=None, **kwargs):
+    """Run an optional section: fn(*args, **kwargs), or `default` when the
+    budget is already spent."""
+    if expired():
+        DROPPED.inc(getattr(fn, "__name__", "section"))
+        return default
+    return fn(*args, **kwargs)
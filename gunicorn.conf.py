@@ -0,0 +1,41 @@
+import os
+
+# Gunicorn settings, overridable from the environment.
+#
+# The default worker class is gthread: each worker process runs several
+# request threads, so a request waiting on TMDb only ties up one thread
+# instead of a whole worker. Concurrency per container is workers * threads.
+# Set GUNICORN_WORKER_CLASS=sync to get the old one-request-per-worker mode.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '3'))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+
+# Build the app once in the master and fork workers from it, so schema checks
+# and the cache restore run once per deploy instead of once per worker.
+# Per-process resources (SQLite handles, the hashing pool) are opened lazily
+# and check the pid, so nothing unsafe is shared across the fork.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def worker_exit(server, worker):
+    # drop queued prefetch/refresh work and pending password hashes instead
+    # of holding up the shutdown, but write out buffered catalog titles and
+    # queued fire-and-forget writes
+    from services import background, password_hasher
+    from repositories.catalog_writer import get_catalog_writer
+    from data.db_writer import get_db_writer
+    background.shutdown()
+    password_hasher.shutdown()
+    get_catalog_writer().flush()
+    get_db_writer().drain()
+
+
+def on_exit(server):
+    # runs in the master after all workers stopped on a graceful shutdown
+    from data.cache import save_cache_snapshot
+    saved = save_cache_snapshot()
+    server.log.info("Saved %d cache entries for the next boot", saved)
@@ -0,0 +1,169 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, g, has_request_context, request, template_rendered, before_render_template
+
+# Lightweight request instrumentation: per-request time spent in TMDb, SQLite
+# and Jinja is reported in a Server-Timing header, and process-wide histograms
+# are exposed on /metrics in Prometheus text format. Everything here is a few
+# perf_counter() calls and dict updates, cheap enough to leave on.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ("tmdb", "db", "render")
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, label_values))
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("movietrends_request_seconds", "Time to produce a response, by route.", ("route", "method", "status"))
+PHASE_SECONDS = Histogram("movietrends_request_phase_seconds", "Per-request time spent in each phase, by route.", ("route", "phase"))
+UPSTREAM_SECONDS = Histogram("movietrends_tmdb_request_seconds", "TMDb call latency, by endpoint.", ("endpoint", "status"))
+METRICS = [REQUEST_SECONDS, PHASE_SECONDS, UPSTREAM_SECONDS]
+
+
+def register(metric):
+    """Add another Histogram/Counter to the /metrics output."""
+    METRICS.append(metric)
+    return metric
+
+
+def add_timing(phase, seconds):
+    """Charge `seconds` to `phase` for the current request (no-op outside one)."""
+    if not has_request_context():
+        return
+    timings = g.setdefault("_timings", {})
+    total, count = timings.get(phase, (0.0, 0))
+    timings[phase] = (total + seconds, count + 1)
+
+
+@contextmanager
+def timed(phase):
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(phase, time.perf_counter() - began)
+
+
+def observe_upstream(endpoint, status, seconds):
+    UPSTREAM_SECONDS.observe(seconds, endpoint, str(status))
+    add_timing("tmdb", seconds)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_request():
+    g._request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.get("_request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = _route_label()
+    timings = g.get("_timings", {})
+    parts = []
+    for phase in PHASES:
+        total, count = timings.get(phase, (0.0, 0))
+        PHASE_SECONDS.observe(total, route, phase)
+        if count:
+            parts.append(f'{phase};dur={total * 1000:.1f};desc="{count} calls"')
+    parts.append(f"total;dur={elapsed * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(parts)
+    REQUEST_SECONDS.observe(elapsed, route, request.method, str(response.status_code))
+    return response
+
+
+def _before_render(sender, template, context, **extra):
+    g._render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    started = g.pop("_render_started", None)
+    if started is not None:
+        add_timing("render", time.perf_counter() - started)
+
+
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    body = "\n".join(m.render() for m in METRICS) + "\n"
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.register_blueprint(metrics_bp)
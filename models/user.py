@@ -1,4 +1,5 @@
 class User:
-    def __init__(self, email, passwordHash):
+    def __init__(self, email, passwordHash, user_id=None):
         self.email = email
-        self.passwordHash = passwordHash
\ No newline at end of file
+        self.passwordHash = passwordHash
+        self.id = user_id
@@ -0,0 +1,138 @@
+from data.db import get_connection
+
+# Local browsing over the Movie table: filter by media type, release year
+# and rating, sort, paginate. Facet counts come from MovieFacet, which the
+# schema triggers keep up to date on every Movie write.
+
+SORT_COLUMNS = {
+    "release_date": "m.ReleaseDay",
+    "rating": "m.Rating",
+    "title": "m.Title COLLATE NOCASE",
+}
+
+CATEGORY_ID = "(SELECT CategoryID FROM Category WHERE Name = ?)"
+
+
+def _category_ids(cursor):
+    cursor.execute("SELECT CategoryID, Name FROM Category")
+    return {row["Name"]: row["CategoryID"] for row in cursor.fetchall()}
+
+
+def _and(clause, condition):
+    return f"{clause} AND {condition}" if clause else f"WHERE {condition}"
+
+
+def _page(cursor, clause, condition, params, order_by, limit, offset):
+    cursor.execute(f"""
+        SELECT m.MovieID, m.Title, m.Rating, m.ReleaseDate, m.PosterPath, c.Name AS MediaType
+        FROM Movie m LEFT JOIN Category c ON m.Category = c.CategoryID
+        {_and(clause, condition)}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+    return cursor.fetchall()
+
+
+def _facet_total(cursor, media_type, year_from, year_to, rating_min, rating_max):
+    """Result count from MovieFacet when the filters line up with its buckets
+    (no filter, a year range, or a whole-star minimum rating); None when only
+    a COUNT over Movie can answer."""
+    if year_from is None and year_to is None and rating_min is None and rating_max is None:
+        facet, condition, bounds = "all", "", []
+    elif rating_min is None and rating_max is None:
+        facet, condition = "year", " AND Value BETWEEN ? AND ?"
+        bounds = [-1 if year_from is None else year_from, 10 ** 6 if year_to is None else year_to]
+    elif year_from is None and year_to is None and rating_max is None and rating_min == int(rating_min) >= 0:
+        facet, condition, bounds = "rating", " AND Value >= ?", [int(rating_min)]
+    else:
+        return None
+    category = f" AND Category = {CATEGORY_ID}" if media_type else ""
+    cursor.execute(
+        f"SELECT COALESCE(SUM(Count), 0) FROM MovieFacet WHERE Facet = ?{category}{condition}",
+        [facet] + ([media_type] if media_type else []) + bounds,
+    )
+    return cursor.fetchone()[0]
+
+
+def browse_titles(media_type=None, year_from=None, year_to=None, rating_min=None, rating_max=None,
+                  sort="release_date", order="desc", page=1, page_size=20):
+    """Return (titles, total_results) for one page of locally stored titles."""
+    connection = get_connection()
+    cursor = connection.cursor()
+    where = []
+    params = []
+    if media_type:
+        # an unknown media type matches nothing
+        where.append(f"m.Category = {CATEGORY_ID}")
+        params.append(media_type)
+    if year_from is not None:
+        where.append("m.ReleaseDay >= ?")
+        params.append(year_from * 10000)
+    if year_to is not None:
+        where.append("m.ReleaseDay <= ?")
+        params.append(year_to * 10000 + 9999)
+    if rating_min is not None:
+        where.append("m.Rating >= ?")
+        params.append(rating_min)
+    if rating_max is not None:
+        where.append("m.Rating <= ?")
+        params.append(rating_max)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+    total = _facet_total(cursor, media_type, year_from, year_to, rating_min, rating_max)
+    if total is None:
+        cursor.execute(f"SELECT COUNT(*) FROM Movie m {clause}", params)
+        total = cursor.fetchone()[0]
+
+    # NULL dates/ratings go last in both directions. Sorting on "col IS NULL"
+    # would stop SQLite from walking the (Category, col) indexes, so titles
+    # with a value are paged first and the undated/unrated tail after them.
+    # MovieID keeps pages stable.
+    direction = "ASC" if order == "asc" else "DESC"
+    column = SORT_COLUMNS.get(sort, SORT_COLUMNS["release_date"])
+    key = column.split()[0]
+    offset = (page - 1) * page_size
+    rows = _page(cursor, clause, f"{key} IS NOT NULL", params, f"{column} {direction}, m.MovieID {direction}",
+                 page_size, offset)
+    if len(rows) < page_size:
+        if rows:
+            valued = offset + len(rows)
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM Movie m {_and(clause, f'{key} IS NOT NULL')}", params)
+            valued = cursor.fetchone()[0]
+        rows += _page(cursor, clause, f"{key} IS NULL", params, f"m.MovieID {direction}",
+                      page_size - len(rows), max(0, offset - valued))
+    connection.close()
+    titles = [
+        {
+            "id": row["MovieID"],
+            "title": row["Title"],
+            "rating": row["Rating"],
+            "release_date": row["ReleaseDate"],
+            "poster_path": row["PosterPath"],
+            "media_type": row["MediaType"],
+        }
+        for row in rows
+    ]
+    return titles, total
+
+
+def get_facet_counts(media_type=None):
+    """Counts for the filter sidebar: titles per media type, and per release
+    year and whole-star rating (within `media_type` when given)."""
+    connection = get_connection()
+    cursor = connection.cursor()
+    names = {category_id: name for name, category_id in _category_ids(cursor).items()}
+    cursor.execute("SELECT Category, Facet, Value, Count FROM MovieFacet WHERE Count > 0")
+    rows = cursor.fetchall()
+    connection.close()
+
+    facets = {"media_type": {}, "year": {}, "rating": {}}
+    for row in rows:
+        name = names.get(row["Category"], "unknown")
+        if row["Facet"] == "all":
+            facets["media_type"][name] = facets["media_type"].get(name, 0) + row["Count"]
+        elif media_type is None or name == media_type:
+            bucket = facets[row["Facet"]]
+            bucket[row["Value"]] = bucket.get(row["Value"], 0) + row["Count"]
+    return facets
@@ -0,0 +1,77 @@
+import os
+import threading
+import traceback
+
+# Write-behind buffer for title records seen in TMDb listing pages. Request
+# threads only drop records into a dict (newer data for the same id wins);
+# one writer thread per process flushes them into Movie as a single batched
+# upsert every few hundred milliseconds, or sooner once a batch is full.
+
+
+class CatalogWriter:
+    def __init__(self, flush_seconds=0.5, max_batch=500):
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+
+    def add(self, records):
+        with self._cond:
+            for record in records:
+                self._pending[(record['id'], record['media_type'])] = record
+            self._ensure_thread()
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def _ensure_thread(self):
+        # a thread started before a fork does not exist in the child
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="catalog-writer", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _take(self):
+        with self._cond:
+            batch = list(self._pending.values())[:self.max_batch]
+            for record in batch:
+                del self._pending[(record['id'], record['media_type'])]
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Write everything pending now (also used by tests and shutdown)."""
+        from repositories.movie_repository import MovieRepository
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            try:
+                self.written += MovieRepository.save_movie_records(batch)
+            except Exception:
+                traceback.print_exc()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_catalog_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from config import Config
+                _writer = CatalogWriter(Config.CATALOG_FLUSH_SECONDS, Config.CATALOG_MAX_BATCH)
+    return _writer
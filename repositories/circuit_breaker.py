@@ -0,0 +1,92 @@
+import threading
+import time
+
+import requests
+
+from instrumentation import Counter, register
+
+# Circuit breaker for TMDb. After `failure_threshold` consecutive failed
+# calls (transport errors, timeouts, 5xx) the circuit opens and calls fail
+# immediately for `reset_seconds` instead of each waiting out a timeout.
+# Then a single trial call is let through: success closes the circuit,
+# failure opens it for another period; a trial that ends without reaching
+# TMDb hands the turn to the next caller. State is per process.
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+OPENED = register(Counter("movietrends_tmdb_circuit_opened_total", "Times the TMDb circuit breaker opened.", ()))
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """TMDb calls are being short-circuited after repeated failures."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None  # when the half-open trial call was let through
+
+    def allow(self):
+        """Whether a call may go out now. In half-open state only one caller
+        (the trial) gets True until it reports back, or until another period
+        has passed in case it never does."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            if self._trial is not None and now - self._trial < self.reset_seconds:
+                return False
+            self._trial = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def release_trial(self):
+        """The call allow() let through ended without a verdict on TMDb (it
+        never went out, or the request budget cut it short): let the next
+        caller make the half-open trial instead of waiting another period."""
+        with self._lock:
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    OPENED.inc()
+                self._opened_at = time.monotonic()
+            self._trial = None
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return CLOSED
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return OPEN
+            return HALF_OPEN
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                from config import Config
+                _breaker = CircuitBreaker(Config.TMDB_BREAKER_FAILURES, Config.TMDB_BREAKER_RESET_SECONDS)
+    return _breaker
@@ -0,0 +1,81 @@
+import threading
+
+from config import Config
+from data.cache import get_cache
+from data.db import get_connection
+from data.db_writer import write
+
+# TMDb ids are only unique per media type, and a bare id (from an old
+# watchlist entry, a form post) does not say which one it is. Instead of
+# probing /movie/{id} and then /tv/{id}, callers ask this index which types
+# an id is known to have. It is filled from every movie/tv payload we see
+# (listing pages, detail fetches) and stored in TitleMediaType. Ids TMDb
+# answered 404 for are remembered in the shared cache for
+# MEDIA_TYPE_MISS_TTL, so unknown ids are not retried on every request.
+
+MEDIA_TYPES = ("movie", "tv")
+_MEMO_MAX = 50000
+
+_lock = threading.Lock()
+_memo = {}  # tmdb_id -> set of media types known to be stored
+
+
+def _miss_key(tmdb_id, media_type):
+    return f"tmdb-miss:{media_type}:{tmdb_id}"
+
+
+def _insert_pairs(cur, pairs):
+    cur.executemany("INSERT OR IGNORE INTO TitleMediaType(tmdb_id, media_type) VALUES (?, ?)", pairs)
+
+
+def record(pairs):
+    """Remember (tmdb_id, media_type) pairs seen in TMDb payloads. Pairs
+    this process already stored are skipped; the rest are written without
+    waiting for the commit."""
+    new = []
+    with _lock:
+        if len(_memo) > _MEMO_MAX:
+            _memo.clear()
+        for tmdb_id, media_type in pairs:
+            if media_type not in MEDIA_TYPES or not tmdb_id:
+                continue
+            known = _memo.setdefault(int(tmdb_id), set())
+            if media_type not in known:
+                known.add(media_type)
+                new.append((int(tmdb_id), media_type))
+    if new:
+        write(_insert_pairs, new, wait=False)
+
+
+def known_types(tmdb_id):
+    """Media types `tmdb_id` is known to exist under, movie first."""
+    with _lock:
+        known = _memo.get(int(tmdb_id))
+    if not known:
+        conn = get_connection()
+        try:
+            rows = conn.execute("SELECT media_type FROM TitleMediaType WHERE tmdb_id = ?", (int(tmdb_id),)).fetchall()
+        finally:
+            conn.close()
+        known = {row["media_type"] for row in rows}
+        if known:
+            with _lock:
+                _memo.setdefault(int(tmdb_id), set()).update(known)
+    return [media_type for media_type in MEDIA_TYPES if media_type in known]
+
+
+def record_miss(tmdb_id, media_type):
+    get_cache().set(_miss_key(tmdb_id, media_type), True, ttl=Config.MEDIA_TYPE_MISS_TTL)
+
+
+def is_miss(tmdb_id, media_type):
+    return get_cache().get(_miss_key(tmdb_id, media_type)) is not None
+
+
+def candidate_types(tmdb_id):
+    """Endpoints worth trying for an id of unknown type, in order: the known
+    types, or else movie then tv minus those that recently answered 404."""
+    known = known_types(tmdb_id)
+    if known:
+        return known
+    return [media_type for media_type in MEDIA_TYPES if not is_miss(tmdb_id, media_type)]
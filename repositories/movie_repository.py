@@ -1,16 +1,77 @@
+import hashlib
 import os
+import time
 import requests
+from repositories import tmdb_client
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.movie import Movie
 import json
 from data.db import get_connection
+from data.db_writer import on_commit, write
+from data.trend_store import get_trend_store
+from config import Config
+from repositories.catalog_writer import get_catalog_writer
+from repositories import media_type_index
 import traceback
 
 # Fix: migrate watchlist/user persistence to centralized SQLite; add
 # save_user_watchlist/save_movie_record with fallback metadata and
 # DB-lock-safe upserts. Also added logging for debugging.
 
-BASE_URL = "https://api.themoviedb.org/3"
+BASE_URL = tmdb_client.BASE_URL
+
+# trending endpoints whose pages are recorded in the trend history store
+TRENDING_LISTS = {
+    "/trending/all/week": "all_week",
+    "/trending/all/day": "all_day",
+    "/trending/movie/day": "movie_day",
+    "/trending/tv/day": "tv_day",
+}
+
+# Movie writes. Unlike INSERT OR REPLACE the upsert updates the row in place,
+# so the facet-count triggers see an UPDATE instead of a silent delete, and it
+# leaves the row alone entirely when the content hash says nothing changed
+# (a newly known trailer URL still counts as a change; a missing one never
+# erases a stored one). MOVIE_TOUCH then only moves FetchedAt forward on the
+# rows that were skipped, which no index but idx_movie_fetched and no trigger
+# cares about.
+MOVIE_INSERT = (
+    "INSERT INTO Movie(MovieID, Title, Overview, Rating, ReleaseDate, Category, PosterPath, TrailerURL, ContentHash, FetchedAt) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+)
+MOVIE_UPSERT = (
+    "ON CONFLICT(MovieID) DO UPDATE SET Title = excluded.Title, Overview = excluded.Overview, "
+    "Rating = excluded.Rating, ReleaseDate = excluded.ReleaseDate, Category = excluded.Category, "
+    "PosterPath = excluded.PosterPath, TrailerURL = COALESCE(excluded.TrailerURL, Movie.TrailerURL), "
+    "ContentHash = excluded.ContentHash, FetchedAt = COALESCE(excluded.FetchedAt, Movie.FetchedAt) "
+    "WHERE (Movie.ContentHash IS NOT excluded.ContentHash "
+    "OR (excluded.TrailerURL IS NOT NULL AND Movie.TrailerURL IS NOT excluded.TrailerURL))"
+)
+MOVIE_TOUCH = (
+    "UPDATE Movie SET FetchedAt = ?1 WHERE MovieID = ?2 AND ContentHash = ?3 AND (FetchedAt IS NULL OR FetchedAt < ?1)"
+)
+
+_category_ids = {}
+
+
+def title_record(data, media_type):
+    """Compact title record as stored in Movie and returned by /api/titles."""
+    return {
+        'id': data.get('id'),
+        'media_type': media_type,
+        'title': data.get('title') or data.get('name'),
+        'overview': data.get('overview'),
+        'rating': data.get('vote_average') if data.get('vote_average') is not None else data.get('rating'),
+        'release_date': data.get('release_date') or data.get('first_air_date'),
+        'poster_path': data.get('poster_path'),
+        'trailer_url': data.get('trailer_url'),
+    }
+
+
+def content_hash(title, overview, rating, release_date, media_type, poster_path):
+    payload = json.dumps([title, overview, rating, release_date, media_type, poster_path], separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
 
 class MovieRepository:
     @staticmethod
@@ -23,16 +84,15 @@ class MovieRepository:
         if not api_key:
             print("TMDB_API_KEY is not set.")
             return []
-        url = f"{BASE_URL}/trending/all/week"
         params = {"api_key": api_key, "language": "en-US"}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            data = tmdb_client.get_json("/trending/all/week", params)
         except requests.exceptions.RequestException as error:
             print("Error while calling TMDb API:", error)
             return []
-        data = response.json()
         results = data.get("results", [])
+        MovieRepository.record_trending_snapshot("/trending/all/week", 1, results)
+        MovieRepository.persist_listing(results)
         movies = []
         for movie_dict in results:
             media_type = movie_dict.get('media_type') or ('tv' if movie_dict.get('first_air_date') else 'movie')
@@ -49,20 +109,40 @@ class MovieRepository:
         return movies
 
     @staticmethod
-    def fetch_movie_by_id(movie_id):
+    def _fetch_title(media_type, tmdb_id):
         api_key = MovieRepository._get_api_key()
         if not api_key:
             print("TMDB_API_KEY is not set.")
             return None
-        url = f"{BASE_URL}/movie/{movie_id}"
+        if media_type_index.is_miss(tmdb_id, media_type):
+            return None
         params = {"api_key": api_key, "language": "en-US"}
         try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
+            data = tmdb_client.get_json(f"/{media_type}/{tmdb_id}", params)
         except requests.exceptions.RequestException as err:
-            print(f"Error fetching movie {movie_id}:", err)
+            if err.response is not None and err.response.status_code == 404:
+                media_type_index.record_miss(tmdb_id, media_type)
+            print(f"Error fetching {'tv show' if media_type == 'tv' else 'movie'} {tmdb_id}:", err)
             return None
+        if data and data.get("id"):
+            media_type_index.record([(data["id"], media_type)])
+        return data
+
+    @staticmethod
+    def fetch_movie_by_id(movie_id):
+        return MovieRepository._fetch_title("movie", movie_id)
+
+    @staticmethod
+    def fetch_title_by_id(tmdb_id, media_type=None):
+        """TMDb details for an id whose media type may be unknown. Returns
+        (data, media_type), or (None, None). Without a media type the
+        resolution index picks the endpoint, so a known TV id costs no
+        /movie probe and recent 404s are not asked again."""
+        for candidate in [media_type] if media_type in ("movie", "tv") else media_type_index.candidate_types(tmdb_id):
+            data = MovieRepository._fetch_title(candidate, tmdb_id)
+            if data:
+                return data, candidate
+        return None, None
 
     @staticmethod
     def fetch_movie_trailer(movie_id):
@@ -70,33 +150,19 @@ class MovieRepository:
         if not api_key:
             print("TMDB_API_KEY is not set.")
             return None
-        url = f"{BASE_URL}/movie/{movie_id}/videos"
         params = {"api_key": api_key}
         try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
+            data = tmdb_client.get_json(f"/movie/{movie_id}/videos", params)
         except requests.exceptions.RequestException as err:
             print(f"Error fetching trailers for {movie_id}:", err)
             return None
-        videos = resp.json().get("results", [])
+        videos = data.get("results", [])
         trailer = next((v for v in videos if v.get("type") == "Trailer" and v.get("site") == "YouTube"), None)
         return trailer.get("key") if trailer else None
 
     @staticmethod
     def fetch_tv_by_id(tv_id):
-        api_key = MovieRepository._get_api_key()
-        if not api_key:
-            print("TMDB_API_KEY is not set.")
-            return None
-        url = f"{BASE_URL}/tv/{tv_id}"
-        params = {"api_key": api_key, "language": "en-US"}
-        try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
-        except requests.exceptions.RequestException as err:
-            print(f"Error fetching tv show {tv_id}:", err)
-            return None
+        return MovieRepository._fetch_title("tv", tv_id)
 
     @staticmethod
     def fetch_tv_trailer(tv_id):
@@ -104,15 +170,13 @@ class MovieRepository:
         if not api_key:
             print("TMDB_API_KEY is not set.")
             return None
-        url = f"{BASE_URL}/tv/{tv_id}/videos"
         params = {"api_key": api_key}
         try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
+            data = tmdb_client.get_json(f"/tv/{tv_id}/videos", params)
         except requests.exceptions.RequestException as err:
             print(f"Error fetching trailers for tv {tv_id}:", err)
             return None
-        videos = resp.json().get("results", [])
+        videos = data.get("results", [])
         trailer = next((v for v in videos if v.get("type") == "Trailer" and v.get("site") == "YouTube"), None)
         return trailer.get("key") if trailer else None
 
@@ -129,6 +193,7 @@ class MovieRepository:
             results = data.get("results", []) if data else []
             for r in results:
                 r.setdefault('media_type', 'movie')
+            MovieRepository.persist_listing(results)
             total_pages = data.get("total_pages", 1) if data else 1
             return results, total_pages
         else:
@@ -139,9 +204,22 @@ class MovieRepository:
         for r in results:
             if 'media_type' not in r:
                 r['media_type'] = 'tv' if r.get('first_air_date') else 'movie'
+        MovieRepository.record_trending_snapshot(endpoint, page, results)
+        MovieRepository.persist_listing(results)
         total_pages = data.get("total_pages", 1) if data else 1
         return results, total_pages
 
+    @staticmethod
+    def record_trending_snapshot(endpoint, page, results):
+        # history is best-effort: a failed snapshot must never break the page
+        list_name = TRENDING_LISTS.get(endpoint)
+        if not list_name or not results:
+            return
+        try:
+            get_trend_store().snapshot(list_name, page, results)
+        except Exception:
+            traceback.print_exc()
+
     @staticmethod
     def make_api_request(endpoint, params=None):
         params = params or {}
@@ -150,11 +228,8 @@ class MovieRepository:
             print("TMDB_API_KEY is not set.")
             return None
         params['api_key'] = api_key
-        url = f"{BASE_URL}{endpoint}"
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+            return tmdb_client.get_json(endpoint, params)
         except requests.exceptions.RequestException as err:
             print(f"API request error for {endpoint}:", err)
             return None
@@ -209,122 +284,179 @@ class MovieRepository:
             return None
 
     @staticmethod
-    def save_user_watchlist(user):
-        conn = None
+    def get_user_watchlist_version(user_id):
+        """Return the user's watchlist version (0 if never changed), or None
+        when the user does not exist. One indexed lookup."""
         try:
             conn = get_connection()
             cur = conn.cursor()
-            user_id = user.get('id')
-            if user_id is None:
-                if conn:
-                    conn.close()
-                print('save_user_watchlist: missing user id')
-                return False
-
-            print(f"save_user_watchlist: saving watchlist for user {user_id} items={len(user.get('watchlist', []))}")
+            cur.execute(
+                "SELECT u.UserID, COALESCE(v.Version, 0) AS Version FROM users u "
+                "LEFT JOIN WatchlistVersion v ON v.UserID = u.UserID WHERE u.UserID = ?",
+                (user_id,)
+            )
+            row = cur.fetchone()
+            conn.close()
+            return row['Version'] if row else None
+        except Exception:
+            return None
 
-            # Ensure user exists
-            cur.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (?, ?, ?)", (user_id, user.get('username'), user.get('email')))
+    @staticmethod
+    def get_watchlist_changes(user_id, since=0, limit=500):
+        """Watchlist changes after version `since`, oldest first, or None
+        when the user does not exist. `added` holds title records, `removed`
+        ids; `cursor` is the version to ask from next time, and `more` says
+        there were more than `limit` changes. A `since` ahead of the user's
+        version (the log was reset) is answered like a first sync from 0,
+        flagged `reset` so the client drops what it has."""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT COALESCE(v.Version, 0) AS Version FROM users u "
+                "LEFT JOIN WatchlistVersion v ON v.UserID = u.UserID WHERE u.UserID = ?",
+                (user_id,)
+            )
+            row = cur.fetchone()
+            if not row:
+                return None
+            version = row['Version']
+            reset = since > version
+            if reset:
+                since = 0
+            # capped at the version read above: a change made in between
+            # carries a later Seq and comes with the next call
+            cur.execute("""
+                SELECT c.Seq, c.MovieID, c.Removed, m.Title, m.PosterPath, m.Rating, m.ReleaseDate, cat.Name AS MediaType
+                FROM WatchlistChange c
+                LEFT JOIN Movie m ON c.Removed = 0 AND m.MovieID = c.MovieID
+                LEFT JOIN Category cat ON m.Category = cat.CategoryID
+                WHERE c.UserID = ? AND c.Seq > ? AND c.Seq <= ? AND (c.Removed = 0 OR ? > 0)
+                ORDER BY c.Seq
+                LIMIT ?
+            """, (user_id, since, version, since, limit + 1))
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        added, removed = [], []
+        for r in rows:
+            if r['Removed']:
+                removed.append(r['MovieID'])
+            else:
+                added.append({
+                    'id': r['MovieID'],
+                    'title': r['Title'],
+                    'poster_path': r['PosterPath'],
+                    'vote_average': r['Rating'],
+                    'release_date': r['ReleaseDate'],
+                    'media_type': r['MediaType'],
+                })
+        return {
+            'cursor': rows[-1]['Seq'] if more else version,
+            'added': added,
+            'removed': removed,
+            'more': more,
+            'reset': reset,
+        }
 
-            # Delete previous watchlist items for this user
-            cur.execute("DELETE FROM WatchlistItem WHERE UserID = ?", (user_id,))
+    @staticmethod
+    def get_watchlist_ids(user_id):
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT MovieID FROM WatchlistItem WHERE UserID = ?", (user_id,))
+            ids = frozenset(r['MovieID'] for r in cur.fetchall())
+            conn.close()
+            return ids
+        except Exception:
+            return frozenset()
 
+    @staticmethod
+    def save_user_watchlist(user, wait=True):
+        user_id = user.get('id')
+        if user_id is None:
+            print('save_user_watchlist: missing user id')
+            return False
+        try:
+            print(f"save_user_watchlist: saving watchlist for user {user_id} items={len(user.get('watchlist', []))}")
+            items = {}
             for item in user.get('watchlist', []):
                 try:
-                    tmdb_id = int(item.get('id')) if isinstance(item, dict) else int(item)
+                    items[int(item.get('id')) if isinstance(item, dict) else int(item)] = item
                 except Exception:
                     continue
 
-                # Ensure movie record exists in Movie table. If not, try to fetch from TMDb and save.
-                cur.execute("SELECT MovieID FROM Movie WHERE MovieID = ?", (tmdb_id,))
-                if not cur.fetchone():
+            # Titles missing from Movie are looked up before the write, so no
+            # TMDb call ever runs while the database write lock is held
+            known = MovieRepository.get_movies_by_tmdb_ids(items) if items else {}
+            movies = []
+            for tmdb_id, item in items.items():
+                if tmdb_id in known:
+                    continue
+                data = None
+                stored_type = item.get('media_type') if isinstance(item, dict) else None
+                try:
+                    data, media_type = MovieRepository.fetch_title_by_id(tmdb_id, stored_type)
+                except Exception:
                     data = None
-                    try:
-                        data = MovieRepository.fetch_movie_by_id(tmdb_id)
-                    except Exception:
-                        data = None
-                    if not data:
-                        try:
-                            data = MovieRepository.fetch_tv_by_id(tmdb_id)
-                        except Exception:
-                            data = None
-
-                    # helper to upsert using the current cursor to avoid separate DB connections
-                    def _upsert_with_cursor(cur, movie_data):
-                        try:
-                            tmdb = movie_data.get('id') or movie_data.get('movie_id')
-                            if not tmdb:
-                                return
-                            title = movie_data.get('title') or movie_data.get('name')
-                            overview = movie_data.get('overview')
-                            rating = movie_data.get('vote_average') or movie_data.get('rating')
-                            release_date = movie_data.get('release_date') or movie_data.get('first_air_date')
-                            poster = movie_data.get('poster_path')
-                            # Category handling
-                            media_type_local = movie_data.get('media_type') or ('tv' if movie_data.get('first_air_date') else 'movie')
-                            category_id_local = None
-                            if media_type_local:
-                                cur.execute("SELECT CategoryID FROM Category WHERE Name = ?", (media_type_local,))
-                                row = cur.fetchone()
-                                if row:
-                                    category_id_local = row['CategoryID']
-                                else:
-                                    cur.execute("INSERT INTO Category(Name) VALUES (?)", (media_type_local,))
-                                    category_id_local = cur.lastrowid
-                            cur.execute(
-                                "INSERT OR REPLACE INTO Movie(MovieID, Title, Overview, Rating, ReleaseDate, Category, PosterPath, TrailerURL) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                                (tmdb, title, overview, rating, release_date, category_id_local, poster, None)
-                            )
-                        except Exception:
-                            traceback.print_exc()
-
-                    if data:
-                        _upsert_with_cursor(cur, data)
-                    else:
-                        if isinstance(item, dict):
-                            fallback = {
-                                'id': tmdb_id,
-                                'title': item.get('title') or item.get('name'),
-                                'overview': item.get('overview') or '',
-                                'vote_average': item.get('vote_average') or item.get('rating'),
-                                'release_date': item.get('release_date') or item.get('first_air_date'),
-                                'poster_path': item.get('poster_path'),
-                                'media_type': item.get('media_type')
-                            }
-                            _upsert_with_cursor(cur, fallback)
-
-                # Insert watchlist item linking to Movie.MovieID
-                cur.execute("INSERT OR IGNORE INTO WatchlistItem(UserID, MovieID) VALUES (?, ?)", (user_id, tmdb_id))
-
-            conn.commit()
-            if conn:
-                conn.close()
-            return True
+                if data:
+                    movies.append(dict(data, media_type=data.get('media_type') or media_type))
+                elif isinstance(item, dict):
+                    movies.append({
+                        'id': tmdb_id,
+                        'title': item.get('title') or item.get('name'),
+                        'overview': item.get('overview') or '',
+                        'vote_average': item.get('vote_average') or item.get('rating'),
+                        'release_date': item.get('release_date') or item.get('first_air_date'),
+                        'poster_path': item.get('poster_path'),
+                        'media_type': item.get('media_type'),
+                        # not from TMDb: left due for the stale-metadata refresh
+                        'fetched_at': None,
+                    })
+
+            result = write(_write_watchlist, user, list(items), movies, wait=wait)
+            return True if wait else result
         except Exception:
             print('save_user_watchlist: exception')
             traceback.print_exc()
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
             return False
 
     @staticmethod
-    def save_movie_record(movie_data):
+    def add_watchlist_item(user, movie_data, wait=True):
+        """Add one title to a user's watchlist in a single write, without
+        asking TMDb. `movie_data` fills the Movie row only when there is none
+        yet; metadata that is not from TMDb should carry `fetched_at: None`
+        so the stale-metadata refresh picks the row up."""
+        if user.get('id') is None or not movie_data.get('id'):
+            print('add_watchlist_item: missing user or title id')
+            return False
+        try:
+            result = write(_add_watchlist_item, user, movie_data, wait=wait)
+            return True if wait else result
+        except Exception:
+            print('add_watchlist_item: exception')
+            traceback.print_exc()
+            return False
+
+    @staticmethod
+    def remove_watchlist_item(user_id, tmdb_id, wait=True):
+        """Take one title off a user's watchlist in a single write."""
+        try:
+            result = write(_remove_watchlist_item, user_id, int(tmdb_id), wait=wait)
+            return True if wait else result
+        except Exception:
+            print('remove_watchlist_item: exception')
+            traceback.print_exc()
+            return False
+
+    @staticmethod
+    def save_movie_record(movie_data, wait=True):
         """Insert or update a movie record in the Movie table using TMDb data or fallback metadata."""
+        if not (movie_data.get('id') or movie_data.get('movie_id')):
+            return
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            tmdb_id = movie_data.get('id') or movie_data.get('movie_id')
-            if not tmdb_id:
-                conn.close()
-                return
-            title = movie_data.get('title') or movie_data.get('name')
-            overview = movie_data.get('overview')
-            rating = movie_data.get('vote_average') or movie_data.get('rating')
-            release_date = movie_data.get('release_date') or movie_data.get('first_air_date')
-            poster = movie_data.get('poster_path')
             # trailer url: try to find youtube trailer key
             trailer_key = None
             try:
@@ -334,38 +466,93 @@ class MovieRepository:
                     trailer_key = f"https://www.youtube.com/watch?v={trailer.get('key')}" if trailer else None
             except Exception:
                 trailer_key = None
+            write(_upsert_movie, movie_data, trailer_key, wait=wait)
+        except Exception:
+            traceback.print_exc()
+            return
 
-            # Category: store media_type string in Category table and reference by id
-            media_type = movie_data.get('media_type') or ('tv' if movie_data.get('first_air_date') else 'movie')
-            category_id = None
-            try:
-                if media_type:
-                    cur.execute("SELECT CategoryID FROM Category WHERE Name = ?", (media_type,))
-                    row = cur.fetchone()
-                    if row:
-                        category_id = row['CategoryID']
-                    else:
-                        cur.execute("INSERT INTO Category(Name) VALUES (?)", (media_type,))
-                        category_id = cur.lastrowid
-            except Exception:
-                category_id = None
+    @staticmethod
+    def category_id(cur, name):
+        """CategoryID for a media type name, created on first use. Categories
+        are never renamed or removed, so ids are cached for the process, but
+        only once the write creating them has committed."""
+        category_id = _category_ids.get(name)
+        if category_id is None:
+            cur.execute("INSERT OR IGNORE INTO Category(Name) VALUES (?)", (name,))
+            cur.execute("SELECT CategoryID FROM Category WHERE Name = ?", (name,))
+            category_id = cur.fetchone()['CategoryID']
+            on_commit(lambda: _category_ids.setdefault(name, category_id))
+        return category_id
 
-            cur.execute(
-                "INSERT OR REPLACE INTO Movie(MovieID, Title, Overview, Rating, ReleaseDate, Category, PosterPath, TrailerURL) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                (tmdb_id, title, overview, rating, release_date, category_id, poster, trailer_key)
-            )
-            conn.commit()
-            conn.close()
+    @staticmethod
+    def persist_listing(results):
+        """Queue the movie/tv entries of a TMDb listing page (trending,
+        discover, search) for a batched write to Movie off the request path,
+        and note their media types in the resolution index."""
+        if not results:
+            return
+        records = []
+        for item in results:
+            media_type = item.get('media_type') or ('tv' if item.get('first_air_date') else 'movie')
+            if media_type in ('movie', 'tv') and item.get('id'):
+                records.append(title_record(item, media_type))
+        media_type_index.record([(r['id'], r['media_type']) for r in records])
+        if Config.CATALOG_WRITE_THROUGH:
+            get_catalog_writer().add(records)
+
+    @staticmethod
+    def save_movie_records(records):
+        """Write many compact title records (id, media_type, title, overview,
+        rating, release_date, poster_path) to Movie in a single transaction.
+        Existing rows are updated unless they hold the other media type under
+        the same id or their content is unchanged (then only FetchedAt moves);
+        a known trailer URL is kept."""
+        records = [r for r in records if r and r.get('id')]
+        if not records:
+            return 0
+        try:
+            return write(_upsert_title_records, records)
         except Exception:
             traceback.print_exc()
-            return
+            return 0
+
+    @staticmethod
+    def get_stale_titles(fetched_before, limit, priority_ids=()):
+        """Up to `limit` (id, media_type) pairs whose data was last fetched
+        before `fetched_before` (or never), most important first: titles on
+        someone's watchlist, then `priority_ids` (e.g. trending), then the
+        longest unrefreshed."""
+        priority_ids = list(priority_ids)
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            # a bare "0" would be read as a column position in ORDER BY
+            priority = f"m.MovieID IN ({','.join('?' * len(priority_ids))})" if priority_ids else "0 = 1"
+            cur.execute(f"""
+                SELECT m.MovieID, c.Name AS MediaType FROM Movie m LEFT JOIN Category c ON m.Category = c.CategoryID
+                WHERE m.FetchedAt IS NULL OR m.FetchedAt < ?
+                ORDER BY EXISTS(SELECT 1 FROM WatchlistItem w WHERE w.MovieID = m.MovieID) DESC,
+                         {priority} DESC, COALESCE(m.FetchedAt, 0), m.MovieID
+                LIMIT ?
+            """, [fetched_before] + priority_ids + [limit])
+            return [(r['MovieID'], r['MediaType']) for r in cur.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def mark_fetched(tmdb_ids, fetched_at=None):
+        """Record a refresh attempt without new data (e.g. the title is gone
+        from TMDb), so it waits a full staleness period before the next try."""
+        ids = list(tmdb_ids)
+        if ids:
+            write(_mark_fetched, ids, fetched_at or time.time())
 
     @staticmethod
     def get_movie_by_tmdb_id(tmdb_id):
         try:
             conn = get_connection()
             cur = conn.cursor()
-            cur.execute("SELECT m.MovieID, m.Title, m.Overview, m.Rating, m.ReleaseDate, m.Category, m.PosterPath, m.TrailerURL, c.Name as MediaType FROM Movie m LEFT JOIN Category c ON m.Category = c.CategoryID WHERE m.MovieID = ?", (tmdb_id,))
+            cur.execute("SELECT m.MovieID, m.Title, m.Overview, m.Rating, m.ReleaseDate, m.Category, m.PosterPath, m.TrailerURL, m.FetchedAt, c.Name as MediaType FROM Movie m LEFT JOIN Category c ON m.Category = c.CategoryID WHERE m.MovieID = ?", (tmdb_id,))
             r = cur.fetchone()
             conn.close()
             if not r:
@@ -378,11 +565,41 @@ class MovieRepository:
                 'release_date': r['ReleaseDate'],
                 'poster_path': r['PosterPath'],
                 'trailer_url': r['TrailerURL'],
-                'media_type': r['MediaType']
+                'media_type': r['MediaType'],
+                'fetched_at': r['FetchedAt']
             }
         except Exception:
             return None
 
+    @staticmethod
+    def get_movies_by_tmdb_ids(tmdb_ids):
+        """Look up many local Movie rows in one query; returns {id: record}."""
+        ids = list({int(i) for i in tmdb_ids})
+        if not ids:
+            return {}
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            placeholders = ",".join("?" * len(ids))
+            cur.execute(f"SELECT m.MovieID, m.Title, m.Overview, m.Rating, m.ReleaseDate, m.PosterPath, m.TrailerURL, c.Name as MediaType FROM Movie m LEFT JOIN Category c ON m.Category = c.CategoryID WHERE m.MovieID IN ({placeholders})", ids)
+            rows = cur.fetchall()
+            conn.close()
+        except Exception:
+            return {}
+        return {
+            r['MovieID']: {
+                'id': r['MovieID'],
+                'title': r['Title'],
+                'overview': r['Overview'],
+                'rating': r['Rating'],
+                'release_date': r['ReleaseDate'],
+                'poster_path': r['PosterPath'],
+                'trailer_url': r['TrailerURL'],
+                'media_type': r['MediaType']
+            }
+            for r in rows
+        }
+
     @staticmethod
     def hash_password(password):
         return generate_password_hash(password)
@@ -400,19 +617,103 @@ def get_movie_category(category=None, page=1):
 def get_user_by_id(user_id):
     return MovieRepository.get_user_by_id(user_id)
 
-def search_movies(query, page=1):
+def search_page(query, page=1):
+    """One page of /search/multi as TMDb returns it (results, total_pages,
+    total_results), or None when the request failed."""
     api_key = MovieRepository._get_api_key()
     if not api_key:
         print("TMDB_API_KEY is not set.")
-        return []
-    url = f"{BASE_URL}/search/multi"
+        return None
     params = {"api_key": api_key, "language": "en-US", "query": query, "page": page, "include_adult": False}
     try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        return resp.json().get("results", [])
+        data = tmdb_client.get_json("/search/multi", params)
     except requests.exceptions.RequestException as err:
         print("Error while searching TMDb:", err)
-        return []
+        return None
+    MovieRepository.persist_listing(data.get("results") or [])
+    return data
+
+def search_movies(query, page=1):
+    data = search_page(query, page)
+    return data.get("results", []) if data else []
 def save_user_watchlist(user):
-    return MovieRepository.save_user_watchlist(user)
\ No newline at end of file
+    return MovieRepository.save_user_watchlist(user)
+
+
+# Write ops: run on the single writer's cursor inside its batch transaction
+# (see data/db_writer.py), so they never open connections or commit.
+
+def _upsert_movie(cur, movie_data, trailer_url=None):
+    tmdb_id = movie_data.get('id') or movie_data.get('movie_id')
+    title = movie_data.get('title') or movie_data.get('name')
+    overview = movie_data.get('overview')
+    rating = movie_data.get('vote_average') or movie_data.get('rating')
+    release_date = movie_data.get('release_date') or movie_data.get('first_air_date')
+    poster = movie_data.get('poster_path')
+    # Category: store media_type string in Category table and reference by id
+    media_type = movie_data.get('media_type') or ('tv' if movie_data.get('first_air_date') else 'movie')
+    category_id = MovieRepository.category_id(cur, media_type)
+    # TMDb data unless the caller says otherwise (fallback metadata passes None)
+    fetched_at = movie_data.get('fetched_at', time.time())
+    digest = content_hash(title, overview, rating, release_date, media_type, poster)
+    cur.execute(
+        MOVIE_INSERT + MOVIE_UPSERT,
+        (tmdb_id, title, overview, rating, release_date, category_id, poster, trailer_url, digest, fetched_at)
+    )
+    if fetched_at is not None:
+        cur.execute(MOVIE_TOUCH, (fetched_at, tmdb_id, digest))
+
+
+def _upsert_title_records(cur, records, fetched_at=None):
+    fetched_at = fetched_at or time.time()
+    categories = {name: MovieRepository.category_id(cur, name) for name in {r.get('media_type') or 'movie' for r in records}}
+    rows = []
+    for r in records:
+        media_type = r.get('media_type') or 'movie'
+        digest = content_hash(r.get('title'), r.get('overview'), r.get('rating'), r.get('release_date'),
+                              media_type, r.get('poster_path'))
+        rows.append((r['id'], r.get('title'), r.get('overview'), r.get('rating'), r.get('release_date'),
+                     categories[media_type], r.get('poster_path'), r.get('trailer_url'), digest, fetched_at))
+    # rows holding the other media type under the same id are left alone
+    cur.executemany(
+        MOVIE_INSERT + MOVIE_UPSERT + " AND (Movie.Category IS NULL OR Movie.Category = excluded.Category)",
+        rows,
+    )
+    cur.executemany(MOVIE_TOUCH, [(fetched_at, row[0], row[8]) for row in rows])
+    return len(records)
+
+
+def _mark_fetched(cur, tmdb_ids, fetched_at):
+    cur.executemany("UPDATE Movie SET FetchedAt = ? WHERE MovieID = ?", [(fetched_at, i) for i in tmdb_ids])
+
+
+def _write_watchlist(cur, user, keep_ids, movies):
+    user_id = user.get('id')
+    # Ensure user exists
+    cur.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (?, ?, ?)", (user_id, user.get('username'), user.get('email')))
+    # Delete only the items that are no longer in the list; rows that
+    # stay keep their DateAdded and do not bump the watchlist version
+    if keep_ids:
+        placeholders = ",".join("?" * len(keep_ids))
+        cur.execute(f"DELETE FROM WatchlistItem WHERE UserID = ? AND MovieID NOT IN ({placeholders})", [user_id] + keep_ids)
+    else:
+        cur.execute("DELETE FROM WatchlistItem WHERE UserID = ?", (user_id,))
+    for movie_data in movies:
+        _upsert_movie(cur, movie_data)
+    # Insert watchlist items linking to Movie.MovieID
+    cur.executemany("INSERT OR IGNORE INTO WatchlistItem(UserID, MovieID) VALUES (?, ?)", [(user_id, tmdb_id) for tmdb_id in keep_ids])
+
+
+def _add_watchlist_item(cur, user, movie_data):
+    user_id = user.get('id')
+    tmdb_id = int(movie_data['id'])
+    cur.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (?, ?, ?)", (user_id, user.get('username'), user.get('email')))
+    # form metadata never overwrites a row we already have
+    cur.execute("SELECT 1 FROM Movie WHERE MovieID = ?", (tmdb_id,))
+    if cur.fetchone() is None:
+        _upsert_movie(cur, movie_data)
+    cur.execute("INSERT OR IGNORE INTO WatchlistItem(UserID, MovieID) VALUES (?, ?)", (user_id, tmdb_id))
+
+
+def _remove_watchlist_item(cur, user_id, tmdb_id):
+    cur.execute("DELETE FROM WatchlistItem WHERE UserID = ? AND MovieID = ?", (user_id, tmdb_id))
@@ -0,0 +1,139 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+
+# Client-side TMDb rate limiting. Each API key gets a token bucket; callers
+# take a token before every upstream request. Interactive (page) traffic is
+# always served before background traffic (prefetch, enrichment, refresh
+# jobs), and background callers may not dip into a reserve kept for pages.
+# A 429 with Retry-After pauses that key until the server says it is free.
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority = ContextVar("tmdb_priority", default=INTERACTIVE)
+
+
+class RateLimited(requests.exceptions.RequestException):
+    """No token became available in time (or TMDb kept answering 429)."""
+
+
+@contextmanager
+def background_priority():
+    """Run the block's TMDb calls as background traffic."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class _Bucket:
+    def __init__(self, key, rate, burst):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, floor):
+        """Seconds until this bucket holds more than `floor` tokens."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= floor + 1:
+            return 0.0
+        return (floor + 1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, keys, rate_per_second=40.0, burst=None, background_reserve=0.25):
+        self.rate = rate_per_second
+        burst = burst or max(1, int(rate_per_second))
+        self.buckets = [_Bucket(k, rate_per_second, burst) for k in (keys or [None])]
+        # never reserve the whole bucket, or background could not run at all
+        self.reserve = min(burst * background_reserve, burst - 1)
+        self._cond = threading.Condition()
+        self._waiting = [0, 0]  # waiters per priority
+
+    def acquire(self, priority=None, timeout=10.0):
+        """Take a token and return the API key it belongs to (None when the
+        caller's own key should be used). Raises RateLimited on timeout."""
+        priority = current_priority() if priority is None else priority
+        deadline = time.monotonic() + timeout
+        floor = self.reserve if priority == BACKGROUND else 0.0
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    for bucket in self.buckets:
+                        bucket.refill(now)
+                    # background traffic yields while any page request waits
+                    if priority == INTERACTIVE or not self._waiting[INTERACTIVE]:
+                        best = min(self.buckets, key=lambda b: b.wait_time(now, floor))
+                        wait = best.wait_time(now, floor)
+                        if wait == 0.0:
+                            best.tokens -= 1
+                            return best.key
+                    else:
+                        wait = 0.05
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise RateLimited("TMDb rate limit: no request slot available")
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def penalize(self, key, retry_after):
+        """Stop using `key` for `retry_after` seconds after a 429."""
+        with self._cond:
+            until = time.monotonic() + max(retry_after, 0.0)
+            for bucket in self.buckets:
+                if bucket.key == key:
+                    bucket.blocked_until = max(bucket.blocked_until, until)
+                    bucket.tokens = min(bucket.tokens, 0.0)
+            self._cond.notify_all()
+
+    def state(self):
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "keys": len(self.buckets),
+                "blocked_keys": sum(1 for b in self.buckets if b.blocked_until > now),
+                "waiting_interactive": self._waiting[INTERACTIVE],
+                "waiting_background": self._waiting[BACKGROUND],
+            }
+
+
+def parse_retry_after(value, default=1.0):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                from config import Config
+                _limiter = RateLimiter(Config.TMDB_API_KEYS, Config.TMDB_RATE_PER_SECOND)
+    return _limiter
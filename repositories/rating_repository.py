@@ -1,4 +1,5 @@
 from data.db import get_connection
+from data.db_writer import write
 
 def get_user_rating(user_id, tmdb_id, media_type):
     connection = get_connection()
@@ -18,41 +19,55 @@ def get_user_rating(user_id, tmdb_id, media_type):
     return None
 
 
-def upsert_rating(user_id, tmdb_id, media_type, rating_value):
-    connection = get_connection()
-    cursor = connection.cursor()
+def _upsert_rating(cursor, user_id, tmdb_id, media_type, rating_value):
     cursor.execute("""
-        UPDATE ratings
-        SET rating_value = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE user_id = ? AND tmdb_id = ? AND media_type = ?
-    """, (rating_value, user_id, tmdb_id, media_type))
+        INSERT INTO ratings(user_id, tmdb_id, media_type, rating_value)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, tmdb_id, media_type) DO UPDATE
+        SET rating_value = excluded.rating_value, updated_at = CURRENT_TIMESTAMP
+    """, (user_id, tmdb_id, media_type, rating_value))
 
-    if cursor.rowcount == 0:
-        cursor.execute("""
-            INSERT INTO ratings(user_id, tmdb_id, media_type, rating_value)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, tmdb_id, media_type, rating_value))
 
-    connection.commit()
-    connection.close()
+def upsert_rating(user_id, tmdb_id, media_type, rating_value, wait=True):
+    # goes through the single writer; wait=False returns before the commit
+    return write(_upsert_rating, user_id, tmdb_id, media_type, rating_value, wait=wait)
 
 
 def get_rating_summary(tmdb_id, media_type):
+    # one row from the trigger-maintained aggregate instead of AVG over ratings
     connection = get_connection()
     cursor = connection.cursor()
 
     cursor.execute("""
-        SELECT AVG(rating_value) AS avg_rating, COUNT(*) AS count
-        FROM ratings
+        SELECT Count, Total
+        FROM RatingAggregate
         WHERE tmdb_id = ? AND media_type = ?
     """, (tmdb_id, media_type))
 
     row = cursor.fetchone()
     connection.close()
 
-    if not row:
+    if not row or not row["Count"]:
         return 0.0, 0
+    return float(row["Total"]) / row["Count"], int(row["Count"])
 
-    avg_rating = float(row["avg_rating"]) if row["avg_rating"] is not None else 0.0
-    count = int(row["count"]) if row["count"] is not None else 0
-    return avg_rating, count
+
+def get_rating_totals(media_type, since_day=None):
+    """Per-title (tmdb_id, count, total) for one media type, over all time or
+    over ratings last updated on/after epoch day `since_day`."""
+    connection = get_connection()
+    cursor = connection.cursor()
+    if since_day is None:
+        cursor.execute("""
+            SELECT tmdb_id, Count, Total FROM RatingAggregate
+            WHERE media_type = ? AND Count > 0
+        """, (media_type,))
+    else:
+        cursor.execute("""
+            SELECT tmdb_id, SUM(Count) AS Count, SUM(Total) AS Total FROM RatingDaily
+            WHERE Day >= ? AND media_type = ?
+            GROUP BY tmdb_id HAVING SUM(Count) > 0
+        """, (since_day, media_type))
+    rows = cursor.fetchall()
+    connection.close()
+    return [(row["tmdb_id"], int(row["Count"]), float(row["Total"])) for row in rows]
@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+import time
+
+import requests
+from urllib.parse import urlencode
+
+import deadline
+from config import Config
+from data.cache import get_cache
+from instrumentation import Counter, observe_upstream, register
+from repositories.circuit_breaker import CircuitOpen, get_circuit_breaker
+from repositories.rate_limiter import INTERACTIVE, current_priority, get_rate_limiter, parse_retry_after
+
+# Single entry point for TMDb HTTP calls so timing (and anything else that has
+# to wrap every upstream request) lives in one place.
+
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# How long responses stay in the shared cache, by endpoint prefix
+CACHE_TTLS = (
+    ("/trending/", 600),
+    ("/search/", 600),
+    ("/discover/", 1800),
+    ("/movie/{id}/videos", 86400),
+    ("/tv/{id}/videos", 86400),
+    ("/movie/{id}", 6 * 3600),
+    ("/tv/{id}", 6 * 3600),
+)
+
+CACHE_LOOKUPS = register(Counter("movietrends_tmdb_cache_total", "TMDb response cache lookups.", ("endpoint", "result")))
+THROTTLED = register(Counter("movietrends_tmdb_throttled_total", "TMDb 429 responses, by endpoint and priority.", ("endpoint", "priority")))
+
+# One pooled session per worker thread: keeps TLS connections to TMDb alive
+# between requests without sharing a Session across threads.
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def endpoint_label(endpoint):
+    """/movie/550/videos -> /movie/{id}/videos, keeps metric labels bounded."""
+    return _ID_SEGMENT.sub("/{id}", endpoint)
+
+
+def get(endpoint, params=None):
+    """GET `endpoint` (e.g. "/movie/550") and return the response.
+
+    Raises requests.exceptions.RequestException on transport errors and
+    non-2xx responses, like requests.get(...).raise_for_status() would.
+    """
+    label = endpoint_label(endpoint)
+    limiter = get_rate_limiter()
+    priority = current_priority()
+    breaker = get_circuit_breaker()
+    wait = Config.TMDB_INTERACTIVE_WAIT if priority == INTERACTIVE else Config.TMDB_BACKGROUND_WAIT
+    for attempt in range(2):
+        if deadline.expired():
+            raise requests.exceptions.Timeout(f"request budget spent before {label}")
+        if not breaker.allow():
+            raise CircuitOpen(f"TMDb circuit open, not calling {label}")
+        try:
+            key = limiter.acquire(priority, timeout=deadline.timeout(wait))
+            http_timeout = deadline.timeout(Config.TMDB_TIMEOUT)
+            if http_timeout <= 0:
+                # the budget ran out while waiting for a token; requests rejects 0
+                raise requests.exceptions.Timeout(f"request budget spent before {label}")
+        except Exception:
+            # nothing went out, so there is no verdict to report
+            breaker.release_trial()
+            raise
+        request_params = dict(params or {}, api_key=key) if key else params
+        status = "error"
+        began = time.perf_counter()
+        try:
+            response = _session().get(f"{BASE_URL}{endpoint}", params=request_params, timeout=http_timeout)
+            status = response.status_code
+        except requests.exceptions.RequestException as err:
+            # a timeout the request budget cut short says nothing about TMDb
+            if isinstance(err, requests.exceptions.Timeout) and http_timeout < Config.TMDB_TIMEOUT:
+                breaker.release_trial()
+            else:
+                breaker.record_failure()
+            raise
+        finally:
+            observe_upstream(label, status, time.perf_counter() - began)
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            limiter.penalize(key, retry_after)
+            THROTTLED.inc(label, "interactive" if priority == INTERACTIVE else "background")
+            # retry once if another key is free or the pause is short
+            if attempt == 0 and (len(limiter.buckets) > 1 or retry_after <= Config.TMDB_MAX_RETRY_AFTER):
+                continue
+        response.raise_for_status()
+        return response
+
+
+def cache_ttl(label):
+    for prefix, ttl in CACHE_TTLS:
+        if label.startswith(prefix):
+            return ttl
+    return None
+
+
+def cache_key(endpoint, params=None):
+    # the api key is left out so every key rotation shares the same entries
+    query = urlencode(sorted((k, str(v)) for k, v in (params or {}).items() if k != "api_key"))
+    return f"tmdb:{BASE_URL}{endpoint}?{query}"
+
+
+def get_json(endpoint, params=None):
+    """Like get(endpoint, params).json(), served from the shared cache when the
+    endpoint is cacheable. Failed calls raise and are never cached."""
+    label = endpoint_label(endpoint)
+    ttl = cache_ttl(label)
+    if not Config.CACHE_ENABLED or ttl is None:
+        return get(endpoint, params).json()
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        return get(endpoint, params).json()
+
+    data = get_cache().get_or_set(cache_key(endpoint, params), fetch, ttl)
+    CACHE_LOOKUPS.inc(label, "miss" if fetched else "hit")
+    return data
@@ -1,7 +1,7 @@
 import sqlite3
 import os
 from models.user import User
-from data.db import DB_PATH
+from data.db import DB_PATH, get_connection
 
 # Fix: Use centralized SQLite DB (`data/database.db`) instead of per-file users.db
 class UserRepository:
@@ -12,19 +12,32 @@ class UserRepository:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
     def getByEmail(self, email):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('SELECT Email, PasswordHash FROM users WHERE Email = ?', (email,))
+        conn = get_connection(self.db_path)
+        try:
+            cursor = conn.execute('SELECT Email, PasswordHash, UserID FROM users WHERE Email = ?', (email,))
             row = cursor.fetchone()
             if row:
-                return User(row[0], row[1])
+                return User(row[0], row[1], row[2])
+        finally:
+            conn.close()
         return None
 
     def add(self, user):
-        with sqlite3.connect(self.db_path) as conn:
-            try:
-                conn.execute('INSERT INTO users (Email, PasswordHash) VALUES (?, ?)',
-                             (user.email, user.passwordHash))
-                conn.commit()
-                return True
-            except sqlite3.IntegrityError:
-                return False
\ No newline at end of file
+        conn = get_connection(self.db_path)
+        try:
+            conn.execute('INSERT INTO users (Email, PasswordHash) VALUES (?, ?)',
+                         (user.email, user.passwordHash))
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            return False
+        finally:
+            conn.close()
+
+    def updatePasswordHash(self, user_id, passwordHash):
+        conn = get_connection(self.db_path)
+        try:
+            conn.execute('UPDATE users SET PasswordHash = ? WHERE UserID = ?', (passwordHash, user_id))
+            conn.commit()
+        finally:
+            conn.close()
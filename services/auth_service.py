@@ -1,6 +1,6 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from repositories.user_repository import UserRepository
 from models.user import User
+from services import password_hasher
 
 class AuthService:
     def __init__(self):
@@ -9,11 +9,21 @@ class AuthService:
     def register(self, email, password):
         if self.userRepo.getByEmail(email):
             return False
-        passwordHash = generate_password_hash(password)
+        passwordHash = password_hasher.hash_password(password)
         return self.userRepo.add(User(email, passwordHash))
 
     def authenticate(self, email, password):
+        """Return the matching User (with its id) or None."""
         user = self.userRepo.getByEmail(email)
-        if not user:
-            return False
-        return check_password_hash(user.passwordHash, password)
\ No newline at end of file
+        if not user or not password_hasher.verify_password(user.passwordHash, password):
+            return None
+        # upgrade hashes made with older parameters while we have the password;
+        # best effort, a busy hash pool must not refuse a verified login
+        if password_hasher.needs_rehash(user.passwordHash):
+            try:
+                new_hash = password_hasher.hash_password(password)
+            except password_hasher.HasherBusy:
+                return user
+            user.passwordHash = new_hash
+            self.userRepo.updatePasswordHash(user.id, user.passwordHash)
+        return user
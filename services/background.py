@@ -0,0 +1,60 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from repositories.rate_limiter import background_priority
+
+# Shared executor for optional work that should not hold up a response
+# (prefetching, enrichment, refresh jobs). Tasks run as background TMDb
+# traffic, so they never compete with page requests for rate-limit tokens.
+# The queue is bounded: when it is full new tasks are dropped, not queued.
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(Config.BACKGROUND_MAX_PENDING)
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _lock:
+        # threads do not survive a fork, so a preloaded master's pool is dead
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.BACKGROUND_WORKERS, thread_name_prefix="background"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        with background_priority():
+            return fn(*args, **kwargs)
+    except Exception:
+        traceback.print_exc()
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) in the background. Returns a Future, or None
+    when the queue is full and the task was dropped."""
+    if not _slots.acquire(blocking=False):
+        return None
+    try:
+        future = _get_executor().submit(_run, fn, args, kwargs)
+    except RuntimeError:
+        _slots.release()
+        return None
+    # also fires for tasks cancelled by shutdown(), so slots are never lost
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def shutdown(wait=False):
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=wait, cancel_futures=not wait)
+        _executor = None
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from flask import request
+
+from config import Config
+from data.cache import get_cache
+from data.trend_store import get_trend_store
+from instrumentation import Counter, register
+from repositories.movie_repository import MovieRepository, title_record
+from services import background
+
+# Keeps the local Movie catalog fresh without re-fetching all of it. Every
+# CATALOG_REFRESH_INTERVAL one worker on the host (whichever claims the
+# shared-cache marker first) queues a background job that re-fetches up to
+# CATALOG_REFRESH_BATCH rows older than CATALOG_STALE_SECONDS, watchlisted
+# titles first, then titles trending in the last two days. Rows whose
+# content did not change only get their FetchedAt bumped (see
+# MovieRepository.save_movie_records).
+
+REFRESHED = register(Counter("movietrends_catalog_refresh_total", "Stale Movie rows re-fetched from TMDb, by outcome.", ("result",)))
+
+TRENDING_WINDOW = 2 * 86400
+_MARKER = "catalog-refresh"
+
+_lock = threading.Lock()
+# the first batch waits one interval, so a deploy does not start with one
+_next_check = time.monotonic() + Config.CATALOG_REFRESH_INTERVAL
+
+
+def trending_ids(since):
+    columns, start = get_trend_store().rows_since(since)
+    return set(columns.tmdb_id[start:])
+
+
+def refresh_stale(limit=None):
+    """Re-fetch one batch of stale titles. Returns the number of rows that
+    came back from TMDb (changed or not)."""
+    now = time.time()
+    stale = MovieRepository.get_stale_titles(
+        now - Config.CATALOG_STALE_SECONDS, limit or Config.CATALOG_REFRESH_BATCH, trending_ids(now - TRENDING_WINDOW)
+    )
+    records, missing = [], []
+    for tmdb_id, media_type in stale:
+        data = None
+        if media_type in (None, "movie", "tv"):
+            data, media_type = MovieRepository.fetch_title_by_id(tmdb_id, media_type)
+        if data and data.get("id"):
+            records.append(title_record(data, media_type))
+        else:
+            missing.append(tmdb_id)
+    MovieRepository.save_movie_records(records)
+    # not found (or failed): try again after another staleness period rather
+    # than keep them at the head of every batch
+    MovieRepository.mark_fetched(missing)
+    REFRESHED.inc("fetched", amount=len(records))
+    REFRESHED.inc("missing", amount=len(missing))
+    return len(records)
+
+
+def maybe_schedule():
+    """Queue a refresh batch if it is time and no other worker did. Cheap
+    enough to call on every request: one clock read until the interval is up."""
+    global _next_check
+    if not Config.CATALOG_REFRESH_ENABLED:
+        return False
+    now = time.monotonic()
+    with _lock:
+        if now < _next_check:
+            return False
+        _next_check = now + Config.CATALOG_REFRESH_INTERVAL
+    claimed = []
+
+    def claim():
+        claimed.append(True)
+        return time.time()
+
+    get_cache().get_or_set(_MARKER, claim, ttl=Config.CATALOG_REFRESH_INTERVAL)
+    return bool(claimed) and background.submit(refresh_stale) is not None
+
+
+def _before_request():
+    # liveness/readiness probes stay free of cache I/O and background work
+    if request.blueprint != "health_bp":
+        maybe_schedule()
+
+
+def init_app(app):
+    app.before_request(_before_request)
@@ -0,0 +1,56 @@
+import contextvars
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+# Process-wide thread pool for fanning one request out into several TMDb
+# calls (multi-page search, batch title details). Its size caps how many
+# such upstream calls a worker makes at once, whatever the number of
+# requests asking for them. Tasks run in a copy of the caller's context, so
+# they see its request (and request deadline) and its TMDb priority.
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor, _executor_pid
+    with _lock:
+        # threads do not survive a fork, so a preloaded master's pool is dead
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=Config.FANOUT_WORKERS, thread_name_prefix="fanout")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def map_concurrent(fn, items):
+    """[fn(item) for item in items], run on the fan-out pool. Results keep
+    the order of `items`."""
+    return list(imap_concurrent(fn, items))
+
+
+def imap_concurrent(fn, items):
+    """Like map_concurrent, but yields each result as soon as it and all the
+    ones before it are done, for callers that stream their output. At most
+    FANOUT_WORKERS items are in flight ahead of the consumer; whatever is
+    still queued when it stops (an error, a closed stream) is cancelled."""
+    items = list(items)
+    if len(items) <= 1:
+        yield from (fn(item) for item in items)
+        return
+    executor = get_executor()
+    pending = deque()
+    try:
+        for item in items:
+            if len(pending) >= Config.FANOUT_WORKERS:
+                yield pending.popleft().result()
+            pending.append(executor.submit(contextvars.copy_context().run, fn, item))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
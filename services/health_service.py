@@ -0,0 +1,80 @@
+import threading
+import time
+
+from config import Config
+from data.cache import get_cache
+from data.db import SCHEMA_VERSION, ping
+from repositories.circuit_breaker import OPEN, get_circuit_breaker
+from services import background
+
+# Readiness report for /readyz. The I/O checks (SQLite reachable and at the
+# expected schema version, shared cache contents) run at most every
+# READY_CHECK_INTERVAL seconds, in the background once a first report
+# exists, so the endpoint itself only reads memory. Only the database makes
+# an instance unready: a cold cache or an open TMDb circuit is reported as
+# degraded, since taking every instance out of rotation while TMDb is down
+# would not help anyone.
+
+_lock = threading.Lock()
+_report = None  # (checked_at, checks)
+_refreshing = False
+
+
+def _check():
+    checks = {}
+    try:
+        version = ping(Config.READY_DB_TIMEOUT)
+        checks["database"] = {"ok": version == SCHEMA_VERSION, "schema_version": version, "expected": SCHEMA_VERSION}
+    except Exception as e:
+        checks["database"] = {"ok": False, "error": str(e)}
+    try:
+        stats = get_cache().stats()
+        checks["cache"] = {"ok": stats["entries"] > 0, "entries": stats["entries"], "bytes": stats["bytes"]}
+    except Exception as e:
+        checks["cache"] = {"ok": False, "error": str(e)}
+    return checks
+
+
+def _refresh():
+    global _report, _refreshing
+    try:
+        checks = _check()
+        with _lock:
+            _report = (time.monotonic(), checks)
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def get_readiness():
+    """{'ready': bool, 'degraded': bool, 'checks': {...}} from the latest
+    background check plus the live circuit breaker state."""
+    global _refreshing
+    with _lock:
+        report = _report
+        stale = report is None or time.monotonic() - report[0] >= Config.READY_CHECK_INTERVAL
+        start = stale and not _refreshing
+        if start:
+            _refreshing = True
+    if start:
+        if report is None or background.submit(_refresh) is None:
+            _refresh()
+        with _lock:
+            report = _report
+    if report is None:
+        # the first check is still running for another request
+        report = (time.monotonic(), _check())
+    checks = dict(report[1])
+    state = get_circuit_breaker().state()
+    checks["tmdb"] = {"ok": state != OPEN, "circuit": state}
+    return {
+        "ready": checks["database"]["ok"],
+        "degraded": not all(check["ok"] for check in checks.values()),
+        "checks": checks,
+    }
+
+
+def reset():
+    global _report
+    with _lock:
+        _report = None
@@ -0,0 +1,95 @@
+import heapq
+import threading
+import time
+
+from config import Config
+from repositories.movie_repository import MovieRepository
+from repositories.rating_repository import get_rating_totals
+from services import background
+
+# Community leaderboard. Titles are ranked by a Bayesian average,
+#
+#     score = (C * m + total) / (C + count)
+#
+# where m is the mean rating across all titles of that media type (in the
+# window) and C is LEADERBOARD_MIN_VOTES: a title with few ratings is pulled
+# towards the overall mean until it has enough votes to stand on its own.
+# Inputs come from the trigger-maintained RatingAggregate/RatingDaily tables
+# (one row per title, or per title and day), and each ranking is kept in
+# memory and recomputed in the background every LEADERBOARD_REFRESH_SECONDS.
+
+WINDOWS = {"all": None, "week": 7, "month": 30, "year": 365}
+MAX_ENTRIES = 100
+
+_lock = threading.Lock()
+_rankings = {}  # (media_type, window) -> (computed_at, entries)
+_refreshing = set()
+
+
+def bayesian_score(count, total, mean, min_votes):
+    return (min_votes * mean + total) / (min_votes + count)
+
+
+def rank_titles(totals, min_votes, limit=MAX_ENTRIES):
+    """[(tmdb_id, count, total)] -> top `limit` entries by Bayesian score."""
+    votes = sum(count for _, count, _ in totals)
+    if not votes:
+        return []
+    mean = sum(total for _, _, total in totals) / votes
+    scored = (
+        (bayesian_score(count, total, mean, min_votes), count, tmdb_id, total)
+        for tmdb_id, count, total in totals
+    )
+    # ties: more votes first, then lower id for a stable order
+    top = heapq.nlargest(limit, scored, key=lambda s: (s[0], s[1], -s[2]))
+    return [
+        {"id": tmdb_id, "score": round(score, 3), "average": round(total / count, 2), "votes": count}
+        for score, count, tmdb_id, total in top
+    ]
+
+
+def _compute(media_type, window):
+    days = WINDOWS[window]
+    since_day = None if days is None else int(time.time() // 86400) - days + 1
+    entries = rank_titles(get_rating_totals(media_type, since_day), Config.LEADERBOARD_MIN_VOTES)
+    titles = MovieRepository.get_movies_by_tmdb_ids([e["id"] for e in entries])
+    for rank, entry in enumerate(entries, start=1):
+        title = titles.get(entry["id"]) or {}
+        entry.update(rank=rank, media_type=media_type, title=title.get("title"), poster_path=title.get("poster_path"))
+    return entries
+
+
+def _refresh(key):
+    try:
+        entries = _compute(*key)
+        with _lock:
+            _rankings[key] = (time.monotonic(), entries)
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def get_leaderboard(media_type="movie", window="all", limit=MAX_ENTRIES):
+    """Top entries for a media type and window. Once a ranking exists it is
+    always served from memory; a stale one is recomputed in the background."""
+    key = (media_type, window)
+    with _lock:
+        cached = _rankings.get(key)
+        fresh = cached is not None and time.monotonic() - cached[0] < Config.LEADERBOARD_REFRESH_SECONDS
+        start = not fresh and key not in _refreshing
+        if start:
+            _refreshing.add(key)
+    if start:
+        if cached is None or background.submit(_refresh, key) is None:
+            _refresh(key)
+        with _lock:
+            cached = _rankings.get(key)
+    if cached is None:
+        # the first ranking is still being computed by another request
+        return _compute(media_type, window)[:limit]
+    return cached[1][:limit]
+
+
+def invalidate():
+    with _lock:
+        _rankings.clear()
@@ -0,0 +1,106 @@
+import atexit
+import os
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+from config import Config
+
+# Password hashing is deliberately slow. Running it inline would pin a request
+# thread (and the GIL) for the whole hash, so it goes to a small process pool.
+# A semaphore bounds how many hashes may be queued; past that, callers get
+# HasherBusy right away instead of piling up behind a login burst.
+
+
+class HasherBusy(Exception):
+    """Too many password hashes are already queued."""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(Config.HASH_MAX_PENDING)
+_current_method = None
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # a pool inherited through fork (gunicorn --preload) is unusable
+        if _pool is None or _pool_pid != os.getpid():
+            # imported here: multiprocessing is only needed once someone logs in
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.HASH_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_pid = os.getpid()
+            # gunicorn's worker_exit shuts it down too; this covers every
+            # other way a process ends
+            atexit.register(shutdown, True)
+        return _pool
+
+
+def _run(fn, *args):
+    if Config.HASH_POOL_SIZE <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=Config.HASH_QUEUE_WAIT):
+        raise HasherBusy("password hashing queue is full")
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    return _run(_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _run(_verify, password_hash, password)
+
+
+def normalize_method(method):
+    """The method prefix werkzeug writes for `method`, with its defaults
+    filled in the way generate_password_hash does: "scrypt" ->
+    "scrypt:32768:8:1", "pbkdf2" -> "pbkdf2:sha256:<iterations>"."""
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+def current_method():
+    """Normalized method prefix for PASSWORD_HASH_METHOD."""
+    global _current_method
+    if _current_method is None:
+        _current_method = normalize_method(Config.PASSWORD_HASH_METHOD)
+    return _current_method
+
+
+def needs_rehash(password_hash):
+    return bool(password_hash) and password_hash.split("$", 1)[0] != current_method()
+
+
+def shutdown(wait=False):
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
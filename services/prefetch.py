@@ -0,0 +1,79 @@
+import threading
+
+from config import Config
+from data.cache import get_cache
+from instrumentation import Counter, register
+from repositories.movie_repository import MovieRepository
+from services import background
+
+# Infinite scroll asks for page n+1 only once the user reaches the bottom of
+# page n. After serving page n we fetch n+1 in the background so it is already
+# in the shared cache by then. A marker entry records which pages were
+# prefetched, so any worker can tell whether the next scroll was a hit.
+
+PREFETCHES = register(Counter("movietrends_prefetch_total", "Background next-page prefetches, by outcome.", ("category", "result")))
+LOOKUPS = register(Counter("movietrends_prefetch_lookups_total", "Scroll pages served, by whether they had been prefetched.", ("category", "result")))
+
+_CATEGORIES = ("Movie", "Series", "Cartoon")
+
+_lock = threading.Lock()
+_in_flight = {}  # category -> pages being prefetched in this process
+
+
+def category_label(category):
+    if category is None:
+        return "all"
+    return category if category in _CATEGORIES else "other"
+
+
+def _marker(category, page):
+    return f"prefetch:{category_label(category)}:{page}"
+
+
+def record_lookup(category, page):
+    """Count whether the page being served was prefetched earlier."""
+    if not Config.CACHE_ENABLED or page <= 1:
+        return
+    hit = get_cache().get(_marker(category, page)) is not None
+    LOOKUPS.inc(category_label(category), "hit" if hit else "miss")
+
+
+def _prefetch(category, page):
+    label = category_label(category)
+    try:
+        results, _ = MovieRepository.get_movie_category(category, page)
+        if results:
+            get_cache().set(_marker(category, page), True, ttl=Config.CACHE_DEFAULT_TTL)
+            PREFETCHES.inc(label, "fetched")
+        else:
+            PREFETCHES.inc(label, "failed")
+    finally:
+        with _lock:
+            _in_flight[label].discard(page)
+
+
+def schedule_next_page(category, page, total_pages):
+    """Queue a background fetch of page+1 of `category`. Returns True if a
+    fetch was queued."""
+    next_page = page + 1
+    if not (Config.PREFETCH_ENABLED and Config.CACHE_ENABLED):
+        return False
+    if not isinstance(total_pages, int) or next_page > total_pages or next_page > Config.PREFETCH_MAX_DEPTH:
+        return False
+    label = category_label(category)
+    if label == "other":
+        return False
+    with _lock:
+        pages = _in_flight.setdefault(label, set())
+        if next_page in pages:
+            return False
+        if len(pages) >= Config.PREFETCH_PER_CATEGORY:
+            PREFETCHES.inc(label, "skipped")
+            return False
+        pages.add(next_page)
+    if background.submit(_prefetch, category, next_page) is None:
+        with _lock:
+            _in_flight[label].discard(next_page)
+        PREFETCHES.inc(label, "dropped")
+        return False
+    return True
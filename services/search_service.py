@@ -0,0 +1,81 @@
+import contextvars
+
+from config import Config
+from repositories.movie_repository import search_page
+from services.fanout import get_executor
+
+# Multi-page search. The first K pages of /search/multi are requested at the
+# same time and merged as they come back: pages are released in page order
+# (so the ranking does not depend on which response arrived first), titles
+# already seen on an earlier page are dropped, and every result gets a rank
+# that stays the same however the pages were timed.
+
+PAGE_SIZE = 20
+
+
+def clamp_pages(pages):
+    try:
+        pages = int(pages)
+    except (TypeError, ValueError):
+        pages = Config.SEARCH_FANOUT_PAGES
+    return max(1, min(pages, Config.SEARCH_MAX_PAGES))
+
+
+def _normalize(item):
+    if 'media_type' not in item:
+        item['media_type'] = 'tv' if item.get('first_air_date') else 'movie'
+    return item
+
+
+def search_events(query, pages=None):
+    """Yield one event per page, in page order, as soon as it can be
+    released, then a final summary event:
+
+        {"page": 1, "results": [...]}
+        ...
+        {"done": true, "total_pages": 12, "total_results": 231, ...}
+    """
+    pages = clamp_pages(pages) if query else 0
+    executor = get_executor()
+    # each page runs in a copy of this context, like fanout.map_concurrent, so
+    # it keeps the request (and its deadline) and the TMDb priority
+    futures = {
+        page: executor.submit(contextvars.copy_context().run, search_page, query, page)
+        for page in range(1, pages + 1)
+    }
+    seen = set()
+    total_pages = total_results = 0
+    failed = 0
+    try:
+        for page in range(1, pages + 1):
+            data = futures[page].result()
+            if data is None:
+                failed += 1
+                continue
+            if page == 1 or not total_pages:
+                total_pages = data.get('total_pages') or 0
+                total_results = data.get('total_results') or 0
+            if page > total_pages:
+                break
+            fresh = []
+            for index, item in enumerate(data.get('results') or []):
+                item = _normalize(item)
+                key = (item.get('id'), item.get('media_type'))
+                if key in seen:
+                    continue
+                seen.add(key)
+                item['rank'] = (page - 1) * PAGE_SIZE + index + 1
+                fresh.append(item)
+            yield {'page': page, 'results': fresh}
+    finally:
+        for future in futures.values():
+            future.cancel()
+    fetched = min(pages, total_pages)
+    yield {
+        'done': True,
+        'total_pages': total_pages,
+        'total_results': total_results,
+        'pages_fetched': fetched,
+        'failed_pages': failed,
+        'next_page': fetched + 1 if fetched < total_pages else None,
+    }
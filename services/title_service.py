@@ -0,0 +1,61 @@
+from repositories.movie_repository import MovieRepository, title_record
+from services.fanout import map_concurrent
+
+# Batch title details for client-side views. Titles already stored in the
+# Movie table are answered from there; the rest go through the TMDb client
+# (which serves from the shared response cache when it can) in parallel, and
+# whatever had to be fetched is written back to Movie in one transaction.
+
+MEDIA_TYPES = ("movie", "tv")
+
+
+def parse_title_refs(ids, types):
+    """Turn ids=1,2,3&types=movie,tv,movie (or a single type for all, or no
+    types meaning movie) into a de-duplicated list of (id, media_type).
+    Raises ValueError on malformed input."""
+    id_list = [part.strip() for part in (ids or "").split(",") if part.strip()]
+    type_list = [part.strip().lower() for part in (types or "").split(",") if part.strip()]
+    if len(type_list) <= 1:
+        type_list = (type_list or ["movie"]) * len(id_list)
+    if len(type_list) != len(id_list):
+        raise ValueError("ids and types must have the same length")
+    refs = []
+    for raw_id, media_type in zip(id_list, type_list):
+        if media_type not in MEDIA_TYPES:
+            raise ValueError(f"unknown media type: {media_type}")
+        ref = (int(raw_id), media_type)
+        if ref not in refs:
+            refs.append(ref)
+    return refs
+
+
+def _fetch(ref):
+    tmdb_id, media_type = ref
+    if media_type == "tv":
+        data = MovieRepository.fetch_tv_by_id(tmdb_id)
+    else:
+        data = MovieRepository.fetch_movie_by_id(tmdb_id)
+    return title_record(data, media_type) if data and data.get('id') else None
+
+
+def get_titles(refs):
+    """Return (records in request order, refs that could not be found)."""
+    local = MovieRepository.get_movies_by_tmdb_ids([tmdb_id for tmdb_id, _ in refs])
+    found = {}
+    misses = []
+    for tmdb_id, media_type in refs:
+        row = local.get(tmdb_id)
+        if row and row.get('title') and (row.get('media_type') or 'movie') == media_type:
+            found[(tmdb_id, media_type)] = title_record(row, media_type)
+        else:
+            misses.append((tmdb_id, media_type))
+
+    fetched = [record for record in map_concurrent(_fetch, misses) if record]
+    # rows holding the other media type under the same id are left alone
+    MovieRepository.save_movie_records([r for r in fetched if r['id'] not in local or not local[r['id']].get('title')])
+    for record in fetched:
+        found[(record['id'], record['media_type'])] = record
+
+    records = [found[ref] for ref in refs if ref in found]
+    missing = [{'id': tmdb_id, 'media_type': media_type} for tmdb_id, media_type in refs if (tmdb_id, media_type) not in found]
+    return records, missing
@@ -0,0 +1,200 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from data.trend_store import get_trend_store, LISTS, MEDIA_TYPES, MEDIA_NAMES, PAGE_SIZE
+from repositories.movie_repository import MovieRepository
+
+DAY = 86400
+HOUR = 3600
+
+
+class _TrendIndex:
+    """Per-title row positions and top-20 days, extended incrementally as the
+    store grows so per-title queries never rescan the whole history.
+
+    Each title also keeps running sums of (t, rank, t*t, t*rank), with t in
+    days since its first snapshot, so the least-squares slope over any
+    trailing window is a difference of two prefix entries."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.columns = None
+        self._reset()
+
+    def _reset(self):
+        self.indexed = 0
+        self.title_rows = {}   # (list, media, id) -> array of row positions
+        self.title_sums = {}   # (list, media, id) -> (origin ts, prefix sums of t, r, tt, tr)
+        self.list_titles = {}  # list -> set of (media, id)
+        self.top_days = {}     # (list, media, id) -> {day: best rank}
+
+    def refresh(self, columns):
+        with self.lock:
+            if self.columns is not None and len(columns.ts) < self.indexed:
+                self._reset()
+            ts, lists, ids, media, ranks = columns.ts, columns.list, columns.tmdb_id, columns.media, columns.rank
+            for i in range(self.indexed, len(ts)):
+                key = (lists[i], media[i], ids[i])
+                rows = self.title_rows.get(key)
+                if rows is None:
+                    rows = self.title_rows[key] = array("l")
+                    self.title_sums[key] = (ts[i], array("d", [0.0]), array("d", [0.0]),
+                                            array("d", [0.0]), array("d", [0.0]))
+                    self.list_titles.setdefault(lists[i], set()).add((media[i], ids[i]))
+                rows.append(i)
+                origin, st, sr, stt, str_ = self.title_sums[key]
+                t = (ts[i] - origin) / DAY
+                r = ranks[i]
+                st.append(st[-1] + t)
+                sr.append(sr[-1] + r)
+                stt.append(stt[-1] + t * t)
+                str_.append(str_[-1] + t * r)
+                if ranks[i] <= PAGE_SIZE:
+                    days = self.top_days.setdefault(key, {})
+                    day = ts[i] // DAY
+                    if ranks[i] < days.get(day, PAGE_SIZE + 1):
+                        days[day] = ranks[i]
+            self.indexed = len(ts)
+            self.columns = columns
+            return self
+
+    def slope(self, key, start):
+        """Least-squares slope in ranks/day over the title's rows from
+        position `start` on; None for fewer than 2 points."""
+        _, st, sr, stt, str_ = self.title_sums[key]
+        n = len(st) - 1 - start
+        if n < 2:
+            return None
+        sum_t, sum_r = st[-1] - st[start], sr[-1] - sr[start]
+        var = (stt[-1] - stt[start]) - sum_t * sum_t / n
+        if var <= 1e-9:
+            return None
+        cov = (str_[-1] - str_[start]) - sum_t * sum_r / n
+        return cov / var
+
+
+_index = _TrendIndex()
+
+
+def _load_index():
+    return _index.refresh(get_trend_store().load())
+
+
+def _list_code(list_name):
+    if list_name not in LISTS:
+        raise ValueError(f"Unknown trending list: {list_name}")
+    return LISTS[list_name]
+
+
+def _slope(points):
+    """Least-squares slope of rank over time in ranks/day; None for < 2 points."""
+    n = len(points)
+    if n < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / n
+    mean_r = sum(r for _, r in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if var == 0:
+        return None
+    cov = sum((t - mean_t) * (r - mean_r) for t, r in points)
+    return cov / var * DAY
+
+
+def _velocity_record(media_code, tmdb_id, points):
+    slope = _slope(points)
+    if slope is None:
+        return None
+    return {
+        'id': tmdb_id,
+        'media_type': MEDIA_NAMES.get(media_code, 'movie'),
+        # ranks climb towards 1, so a falling rank is positive velocity
+        'velocity': round(-slope, 3),
+        'first_rank': points[0][1],
+        'last_rank': points[-1][1],
+        'snapshots': len(points),
+    }
+
+
+def rank_velocity(tmdb_id, media_type='movie', list_name='all_day', hours=24, now=None):
+    """Rank change per day for one title over the last `hours`, positive when climbing."""
+    code = _list_code(list_name)
+    media_code = MEDIA_TYPES.get(media_type, 0)
+    since = (now or time.time()) - hours * HOUR
+    index = _load_index()
+    cols = index.columns
+    rows = index.title_rows.get((code, media_code, int(tmdb_id)), array("l"))
+    start = bisect_left(rows, bisect_left(cols.ts, since))
+    points = [(cols.ts[i], cols.rank[i]) for i in rows[start:]]
+    record = _velocity_record(media_code, int(tmdb_id), points)
+    history = [{'ts': t, 'rank': r} for t, r in points]
+    return record, history
+
+
+def climbing_fastest(list_name='all_day', hours=24, limit=20, now=None):
+    """Titles with the highest rank velocity over the last `hours`."""
+    code = _list_code(list_name)
+    since = (now or time.time()) - hours * HOUR
+    index = _load_index()
+    ranks = index.columns.rank
+    first_row = bisect_left(index.columns.ts, since)
+    records = []
+    with index.lock:
+        for media_code, tmdb_id in index.list_titles.get(code, ()):
+            key = (code, media_code, tmdb_id)
+            rows = index.title_rows[key]
+            if rows[-1] < first_row:
+                continue
+            start = bisect_left(rows, first_row)
+            slope = index.slope(key, start)
+            if slope is None:
+                continue
+            records.append({
+                'id': tmdb_id,
+                'media_type': MEDIA_NAMES.get(media_code, 'movie'),
+                # ranks climb towards 1, so a falling rank is positive velocity
+                'velocity': round(-slope, 3),
+                'first_rank': ranks[rows[start]],
+                'last_rank': ranks[rows[-1]],
+                'snapshots': len(rows) - start,
+            })
+    records.sort(key=lambda r: (-r['velocity'], r['last_rank']))
+    return _with_titles(records[:limit])
+
+
+def days_in_top(list_name='all_day', top=PAGE_SIZE, days=365, limit=20, now=None):
+    """Titles ranked by the number of distinct days spent in the top `top`."""
+    code = _list_code(list_name)
+    top = max(1, min(int(top), PAGE_SIZE))
+    first_day = int((now or time.time()) // DAY) - days + 1
+    index = _load_index()
+    with index.lock:
+        counts = []
+        for (list_code, media_code, tmdb_id), best in index.top_days.items():
+            if list_code != code:
+                continue
+            n = sum(1 for day, rank in best.items() if day >= first_day and rank <= top)
+            if n:
+                counts.append({'id': tmdb_id, 'media_type': MEDIA_NAMES.get(media_code, 'movie'), 'days': n})
+    counts.sort(key=lambda r: -r['days'])
+    return _with_titles(counts[:limit])
+
+
+def title_days_in_top(tmdb_id, media_type='movie', list_name='all_day', top=PAGE_SIZE, days=365, now=None):
+    code = _list_code(list_name)
+    top = max(1, min(int(top), PAGE_SIZE))
+    first_day = int((now or time.time()) // DAY) - days + 1
+    index = _load_index()
+    best = index.top_days.get((code, MEDIA_TYPES.get(media_type, 0), int(tmdb_id)), {})
+    return sum(1 for day, rank in list(best.items()) if day >= first_day and rank <= top)
+
+
+def _with_titles(records):
+    # annotate with locally known titles in a single lookup
+    known = MovieRepository.get_movies_by_tmdb_ids([r['id'] for r in records])
+    for r in records:
+        local = known.get(r['id'])
+        r['title'] = local.get('title') if local else None
+        r['poster_path'] = local.get('poster_path') if local else None
+    return records
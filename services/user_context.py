@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+from flask import g, session
+
+from repositories.movie_repository import MovieRepository
+
+# Most pages only need "who is this" and "which ids are on their watchlist".
+# The UserContext carries exactly that, is built once per request (memoized
+# on flask.g) and reuses a process-wide cache of watchlist id sets that is
+# validated against WatchlistVersion, which triggers bump on every change.
+
+MAX_CACHED_USERS = 10000
+
+
+class UserContext:
+    def __init__(self, user_id, watchlist_ids, version):
+        self.id = user_id
+        self.watchlist_ids = watchlist_ids
+        self.version = version
+
+    def in_watchlist(self, tmdb_id):
+        try:
+            return int(tmdb_id) in self.watchlist_ids
+        except (TypeError, ValueError):
+            return False
+
+
+_lock = threading.Lock()
+_watchlist_ids = OrderedDict()  # user_id -> (version, frozenset of ids)
+
+
+def _cached_ids(user_id, version):
+    with _lock:
+        entry = _watchlist_ids.get(user_id)
+        if entry and entry[0] == version:
+            _watchlist_ids.move_to_end(user_id)
+            return entry[1]
+    ids = MovieRepository.get_watchlist_ids(user_id)
+    with _lock:
+        _watchlist_ids[user_id] = (version, ids)
+        _watchlist_ids.move_to_end(user_id)
+        while len(_watchlist_ids) > MAX_CACHED_USERS:
+            _watchlist_ids.popitem(last=False)
+    return ids
+
+
+def load_user_context(user_id):
+    version = MovieRepository.get_user_watchlist_version(user_id)
+    if version is None:
+        return None
+    return UserContext(user_id, _cached_ids(user_id, version), version)
+
+
+def get_user_context():
+    """UserContext for the session user (guest id 1 by default), or None if
+    that user does not exist. Computed at most once per request."""
+    if "_user_context" not in g:
+        try:
+            g._user_context = load_user_context(session.get('user_id', 1))
+        except Exception:
+            g._user_context = None
+    return g._user_context
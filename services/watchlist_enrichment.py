@@ -0,0 +1,96 @@
+import threading
+
+from config import Config
+from data.cache import get_cache
+from instrumentation import Counter, register
+from repositories import media_type_index
+from repositories.movie_repository import MovieRepository
+from services import background
+
+# /add_to_watchlist stores a title from the submitted form (or the Movie row
+# we already have) and returns; the TMDb details follow from here. Jobs are
+# deduplicated per title, in this worker by an in-flight set and across
+# workers by a short-lived shared-cache marker, and a failed fetch is retried
+# WATCHLIST_ENRICH_RETRIES times with doubling delays. A title that never
+# gets enriched (queue full, TMDb down for longer) keeps FetchedAt NULL, and
+# the catalog refresh re-fetches watchlisted rows before anything else.
+
+ENRICHED = register(Counter("movietrends_watchlist_enrich_total", "Background TMDb fetches for watchlist additions, by outcome.", ("result",)))
+
+CLAIM_TTL = 60
+
+_lock = threading.Lock()
+_pending = set()  # (tmdb_id, media_type) queued or running in this worker
+
+
+def _claim(tmdb_id):
+    claimed = []
+
+    def claim():
+        claimed.append(True)
+        return True
+
+    get_cache().get_or_set(f"watchlist-enrich:{tmdb_id}", claim, ttl=CLAIM_TTL)
+    return bool(claimed)
+
+
+def enqueue(tmdb_id, media_type=None, attempt=0):
+    """Queue a TMDb fetch for a title on someone's watchlist. Returns the
+    Future, or None when the title is already being fetched or the
+    background queue is full."""
+    key = (int(tmdb_id), media_type if media_type in ("movie", "tv") else None)
+    with _lock:
+        if key in _pending:
+            ENRICHED.inc("deduplicated")
+            return None
+        _pending.add(key)
+    # retries were claimed by their first attempt
+    if attempt == 0 and not _claim(key[0]):
+        _done(key)
+        ENRICHED.inc("deduplicated")
+        return None
+    future = background.submit(enrich, *key, attempt=attempt)
+    if future is None:
+        _done(key)
+        ENRICHED.inc("dropped")
+    return future
+
+
+def _done(key):
+    with _lock:
+        _pending.discard(key)
+
+
+def _gone(tmdb_id, media_type):
+    # every endpoint it could live at answered 404 recently
+    if media_type:
+        return media_type_index.is_miss(tmdb_id, media_type)
+    return not media_type_index.candidate_types(tmdb_id)
+
+
+def retry_later(tmdb_id, media_type, attempt):
+    delay = Config.WATCHLIST_ENRICH_BACKOFF * 2 ** (attempt - 1)
+    timer = threading.Timer(delay, enqueue, (tmdb_id, media_type), {"attempt": attempt})
+    timer.daemon = True
+    timer.start()
+
+
+def enrich(tmdb_id, media_type=None, attempt=0):
+    """Fetch one title from TMDb and store it in Movie. Returns True when
+    the row was updated."""
+    try:
+        data, found_type = MovieRepository.fetch_title_by_id(tmdb_id, media_type)
+    finally:
+        _done((tmdb_id, media_type))
+    if data and data.get("id"):
+        MovieRepository.save_movie_record(dict(data, media_type=found_type))
+        ENRICHED.inc("fetched")
+        return True
+    if _gone(tmdb_id, media_type):
+        ENRICHED.inc("not_found")
+    elif attempt < Config.WATCHLIST_ENRICH_RETRIES:
+        ENRICHED.inc("retried")
+        retry_later(tmdb_id, media_type, attempt + 1)
+    else:
+        ENRICHED.inc("failed")
+    return False
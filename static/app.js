@@ -0,0 +1,61 @@
+// Handle add/remove watchlist via AJAX and show a transient notification
+// Fix: intercept watchlist forms via AJAX so UI updates only on backend success
+document.addEventListener('submit', async function(e) {
+    const form = e.target.closest('form.watchlist-action');
+    if (!form) return;
+    e.preventDefault();
+
+    const action = form.dataset.action;
+    const url = form.action;
+    const formData = new FormData(form);
+
+    try {
+        const resp = await fetch(url, { method: 'POST', body: formData });
+        const data = await resp.json();
+        if (data && data.success) {
+            showFlash(data.message || 'Saved');
+            // toggle form action and button state
+            const btn = form.querySelector('.watchlist-btn');
+            if (action === 'add') {
+                // switch to remove
+                form.dataset.action = 'remove';
+                form.action = '/remove_from_watchlist';
+                if (btn) {
+                    btn.textContent = 'Remove from Watchlist';
+                    btn.classList.remove('btn-primary');
+                    btn.classList.add('btn-danger');
+                }
+            } else if (action === 'remove') {
+                // switch to add
+                form.dataset.action = 'add';
+                form.action = '/add_to_watchlist';
+                if (btn) {
+                    btn.textContent = 'Add to Watchlist';
+                    btn.classList.remove('btn-danger');
+                    btn.classList.add('btn-primary');
+                }
+                // if on watchlist page, remove the card from DOM
+                const card = form.closest('.movie-item');
+                if (card && window.location.pathname === '/watchlist') {
+                    card.remove();
+                }
+            }
+        } else {
+            showFlash((data && data.error) || 'Action failed', 'danger');
+        }
+    } catch (err) {
+        showFlash('Network error', 'danger');
+    }
+});
+
+function showFlash(message, level='success'){
+    const container = document.getElementById('flash-container');
+    const id = 'flash-' + Date.now();
+    const wrapper = document.createElement('div');
+    wrapper.innerHTML = `<div id="${id}" class="alert alert-${level} alert-dismissible fade show" role="alert">${message}<button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button></div>`;
+    container.appendChild(wrapper);
+    setTimeout(()=>{
+        const el = document.getElementById(id);
+        if (el) { var bs = bootstrap.Alert.getOrCreateInstance(el); bs.close(); }
+    }, 3000);
+}
@@ -0,0 +1,54 @@
+import os
+
+from flask import Response, current_app, stream_with_context
+from jinja2 import FileSystemBytecodeCache
+
+from config import Config
+from instrumentation import timed
+
+# Template compilation and streamed rendering.
+#
+# Compiled templates are kept in a FileSystemBytecodeCache directory, so a
+# worker (or a restarted container) loads bytecode instead of parsing and
+# compiling every template again; Jinja writes each entry to a temp file and
+# renames it, which makes the directory safe to share between processes.
+# With preload_app the master also loads every template before forking, so
+# workers start with them already in the environment's in-memory cache.
+
+
+def init_app(app):
+    cache_dir = Config.TEMPLATE_CACHE_DIR
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # must be set before app.jinja_env is first touched
+            app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(cache_dir)}
+        except OSError as e:
+            print("Template bytecode cache disabled:", e)
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as e:
+            print(f"Could not precompile template {name}:", e)
+
+
+def stream_page(template_name, **context):
+    """Like render_template, but sends the page as it renders: the head and
+    navbar go out before the listing's data-dependent part is produced.
+    Output is flushed every TEMPLATE_STREAM_BUFFER template chunks rather than
+    per chunk. The first chunk is rendered before returning, so errors in it
+    still become a normal error response; "render" in Server-Timing covers
+    only that chunk, since the headers are sent before the rest renders."""
+    app = current_app._get_current_object()
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+    stream = template.stream(context)
+    stream.enable_buffering(Config.TEMPLATE_STREAM_BUFFER)
+    with timed("render"):
+        first = next(stream, "")
+
+    def generate():
+        yield first
+        yield from stream
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
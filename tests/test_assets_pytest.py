@@ -0,0 +1,58 @@
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import assets
+from app import create_app
+from config import Config
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'ASSET_BUILD_DIR', str(tmp_path))
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_build_names_files_by_content(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'js').mkdir(parents=True)
+    (static / 'js' / 'site.js').write_text('console.log(1);\n' * 50)
+    out = tmp_path / 'dist'
+
+    first = assets.build(str(static), str(out))
+    assert first['js/site.js'].startswith('js/site.') and first['js/site.js'].endswith('.js')
+    assert gzip.decompress((out / (first['js/site.js'] + '.gz')).read_bytes()) == (static / 'js' / 'site.js').read_bytes()
+    assert assets.build(str(static), str(out)) == first
+
+    (static / 'js' / 'site.js').write_text('console.log(2);\n')
+    assert assets.build(str(static), str(out))['js/site.js'] != first['js/site.js']
+
+
+def test_pages_link_hashed_assets_with_immutable_caching(client):
+    page = client.get('/watchlist').get_data(as_text=True)
+    manifest = client.application.extensions['assets']
+    assert f"/assets/{manifest['style.css']}" in page
+    assert f"/assets/{manifest['app.js']}" in page
+    assert '<script>' not in page
+
+    plain = client.get(f"/assets/{manifest['app.js']}", headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert plain.headers['Cache-Control'] == assets.CACHE_CONTROL
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.mimetype in ('text/javascript', 'application/javascript')
+
+    packed = client.get(f"/assets/{manifest['app.js']}", headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert packed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(packed.data) == plain.data
+
+
+def test_unknown_assets_are_not_served(client):
+    assert client.get('/assets/manifest.json').status_code == 404
+    assert client.get('/assets/style.css').status_code == 404
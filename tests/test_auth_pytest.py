@@ -0,0 +1,78 @@
+import os
+import sys
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection
+from data.query_tracer import query_budget
+from services import password_hasher
+
+EMAIL = 'pytest_auth@example.com'
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+    conn = get_connection()
+    conn.execute('DELETE FROM users WHERE Email = ?', (EMAIL,))
+    conn.commit()
+    conn.close()
+
+
+def test_register_then_login_sets_user_id(client):
+    resp = client.post('/register', data={'email': EMAIL, 'password': 'secret-pw'})
+    assert resp.status_code in (302, 303)
+    with query_budget(3, max_repeats=1):
+        resp = client.post('/login', data={'email': EMAIL, 'password': 'secret-pw'})
+    assert resp.status_code in (302, 303)
+    with client.session_transaction() as sess:
+        assert isinstance(sess.get('user_id'), int)
+        assert sess.get('user') == EMAIL
+
+    resp = client.post('/login', data={'email': EMAIL, 'password': 'wrong'})
+    assert b'Invalid email or password' in resp.data
+
+
+def test_login_upgrades_outdated_hash(client):
+    old_hash = generate_password_hash('secret-pw', method='pbkdf2:sha256:1000')
+    conn = get_connection()
+    conn.execute('INSERT INTO users (Email, PasswordHash) VALUES (?, ?)', (EMAIL, old_hash))
+    conn.commit()
+
+    resp = client.post('/login', data={'email': EMAIL, 'password': 'secret-pw'})
+    assert resp.status_code in (302, 303)
+    new_hash = conn.execute('SELECT PasswordHash FROM users WHERE Email = ?', (EMAIL,)).fetchone()[0]
+    conn.close()
+    assert new_hash != old_hash
+    assert not password_hasher.needs_rehash(new_hash)
+    assert password_hasher.verify_password(new_hash, 'secret-pw')
+
+
+def test_login_succeeds_when_the_rehash_finds_the_pool_busy(client, monkeypatch):
+    old_hash = generate_password_hash('secret-pw', method='pbkdf2:sha256:1000')
+    conn = get_connection()
+    conn.execute('INSERT INTO users (Email, PasswordHash) VALUES (?, ?)', (EMAIL, old_hash))
+    conn.commit()
+
+    def busy(password):
+        raise password_hasher.HasherBusy('password hashing queue is full')
+
+    monkeypatch.setattr(password_hasher, 'hash_password', busy)
+    resp = client.post('/login', data={'email': EMAIL, 'password': 'secret-pw'})
+    assert resp.status_code in (302, 303)
+    # the old hash stays until a later login can upgrade it
+    assert conn.execute('SELECT PasswordHash FROM users WHERE Email = ?', (EMAIL,)).fetchone()[0] == old_hash
+    conn.close()
+
+
+def test_current_method_matches_werkzeug_without_hashing(monkeypatch):
+    monkeypatch.setattr(password_hasher, '_run', lambda *a: pytest.fail('hash run to find the method'))
+    for method in ('scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000'):
+        expected = generate_password_hash('x', method=method).split('$', 1)[0]
+        assert password_hasher.normalize_method(method) == expected
+    assert not password_hasher.needs_rehash(generate_password_hash('x', method=password_hasher.Config.PASSWORD_HASH_METHOD))
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.tmdb_stub import StubConfig, start_stub, fixture_name
+from benchmarks.run_bench import percentile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_fixture_names_collapse_ids():
+    assert fixture_name('/3/movie/550/videos') == 'movie_id_videos.json'
+    assert fixture_name('/trending/all/day') == 'trending_all_day.json'
+
+
+def test_stub_replays_fixtures_and_injects_errors():
+    server, url = start_stub(StubConfig(seed=1))
+    try:
+        resp = requests.get(url + '/movie/42', params={'api_key': 'x'}, timeout=5)
+        assert resp.status_code == 200 and resp.json()['id'] == 42
+        page2 = requests.get(url + '/trending/all/day', params={'page': 2}, timeout=5).json()
+        assert page2['page'] == 2
+        assert requests.get(url + '/no/such/endpoint', timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+
+    server, url = start_stub(StubConfig(error_rate=1.0))
+    try:
+        assert requests.get(url + '/movie/42', timeout=5).status_code == 500
+    finally:
+        server.shutdown()
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_benchmarked_app_serves_the_seeded_database(tmp_path):
+    # a fresh interpreter, imported in the same order as main()
+    script = f"""
+import os, sys, requests
+sys.path.insert(0, {ROOT!r})
+from benchmarks.run_bench import start_app
+from benchmarks.seed_db import seed_database
+workdir = {str(tmp_path)!r}
+seed_database(os.path.join(workdir, 'bench.db'), users=3, ratings_per_user=1, watchlist_per_user=7, movies=50)
+server, url = start_app('http://127.0.0.1:9', workdir)
+import data.db
+print(data.db.DB_PATH)
+print(len(requests.get(url + '/api/watchlist/changes', timeout=10).json()['added']))
+server.shutdown()
+"""
+    out = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    db_path, added = out.stdout.split()[-2:]
+    assert db_path == str(tmp_path / 'bench.db')
+    # the guest user's seeded watchlist, not the repository database's
+    assert int(added) == 7
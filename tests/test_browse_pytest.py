@@ -0,0 +1,109 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection
+from data.query_tracer import query_budget
+from repositories import browse_repository, movie_repository
+from repositories.movie_repository import MovieRepository
+
+KIND = 'pytest_browse'
+ROWS = [
+    {'id': 888888901, 'title': 'Alpha', 'release_date': '1999-05-01', 'rating': 8.2},
+    {'id': 888888902, 'title': 'Beta', 'release_date': '2005-01-20', 'rating': 6.4},
+    {'id': 888888903, 'title': 'Gamma', 'release_date': '2005-12-31', 'rating': 7.9},
+    {'id': 888888904, 'title': 'Delta', 'release_date': None, 'rating': 5.0},
+]
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    MovieRepository.save_movie_records([dict(r, media_type=KIND) for r in ROWS])
+    with app.test_client() as client:
+        yield client
+    conn = get_connection()
+    category_id = conn.execute('SELECT CategoryID FROM Category WHERE Name = ?', (KIND,)).fetchone()[0]
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * len(ROWS))})", [r['id'] for r in ROWS])
+    conn.execute('DELETE FROM MovieFacet WHERE Category = ?', (category_id,))
+    conn.execute('DELETE FROM Category WHERE CategoryID = ?', (category_id,))
+    conn.commit()
+    conn.close()
+    movie_repository._category_ids.pop(KIND, None)
+
+
+def test_browse_filters_sorts_and_paginates(client):
+    data = client.get(f'/api/browse?media_type={KIND}&year_from=2000&year_to=2005&sort=rating&order=desc').get_json()
+    assert [t['title'] for t in data['titles']] == ['Gamma', 'Beta']
+    assert data['total_results'] == 2 and data['has_more'] is False
+
+    data = client.get(f'/api/browse?media_type={KIND}&rating_min=6&sort=release_date&order=asc').get_json()
+    assert [t['title'] for t in data['titles']] == ['Alpha', 'Beta', 'Gamma']
+
+    # undated titles sort last either way
+    data = client.get(f'/api/browse?media_type={KIND}&sort=release_date&order=desc').get_json()
+    assert data['titles'][-1]['title'] == 'Delta'
+    assert client.get('/api/browse?year_from=abc').status_code == 400
+
+
+def test_facet_counts_follow_writes(client):
+    facets = client.get(f'/api/browse?media_type={KIND}').get_json()['facets']
+    assert facets['media_type'][KIND] == 4
+    assert facets['year'] == {'1999': 1, '2005': 2}
+    assert facets['rating'] == {'5': 1, '6': 1, '7': 1, '8': 1}
+
+    # an update moves a title between buckets, a delete removes it
+    MovieRepository.save_movie_records([dict(ROWS[1], media_type=KIND, release_date='2010-03-03', rating=9.1)])
+    conn = get_connection()
+    conn.execute('DELETE FROM Movie WHERE MovieID = ?', (ROWS[0]['id'],))
+    conn.commit()
+    conn.close()
+    with query_budget(5):
+        facets = client.get(f'/api/browse?media_type={KIND}').get_json()['facets']
+    assert facets['media_type'][KIND] == 3
+    assert facets['year'] == {'2005': 1, '2010': 1}
+    assert facets['rating'] == {'5': 1, '7': 1, '9': 1}
+
+
+def test_pages_continue_into_undated_titles(client):
+    seen = []
+    for page in (1, 2, 3, 4):
+        titles, total = browse_repository.browse_titles(KIND, sort='release_date', order='asc', page=page, page_size=1)
+        seen += [t['title'] for t in titles]
+        assert total == 4
+    assert seen == ['Alpha', 'Beta', 'Gamma', 'Delta']
+    assert browse_repository.browse_titles(KIND, page=5, page_size=1)[0] == []
+
+
+def test_sorted_pages_walk_an_index_and_totals_come_from_facets(client):
+    conn = get_connection()
+    category_id = conn.execute('SELECT CategoryID FROM Category WHERE Name = ?', (KIND,)).fetchone()[0]
+    for column in ('m.ReleaseDay', 'm.Rating'):
+        plan = ' '.join(row[3] for row in conn.execute(
+            f'EXPLAIN QUERY PLAN SELECT m.MovieID FROM Movie m WHERE m.Category = ? AND {column} IS NOT NULL '
+            f'ORDER BY {column} DESC, m.MovieID DESC LIMIT 20', (category_id,)))
+        assert 'TEMP B-TREE' not in plan
+    conn.close()
+
+    statements = []
+    real_connect = browse_repository.get_connection
+
+    def traced():
+        connection = real_connect()
+        connection.set_trace_callback(statements.append)
+        return connection
+
+    browse_repository.get_connection = traced
+    try:
+        assert browse_repository.browse_titles(KIND, year_from=2005, year_to=2005)[1] == 2
+        assert browse_repository.browse_titles(KIND, rating_min=7)[1] == 2
+        assert browse_repository.browse_titles(KIND)[1] == 4
+    finally:
+        browse_repository.get_connection = real_connect
+    assert not [s for s in statements if 'COUNT(*)' in s]
+    # bounds that do not line up with the facet buckets are counted directly
+    assert browse_repository.browse_titles(KIND, rating_min=7.9)[1] == 2
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.cache import SharedCache
+from repositories.tmdb_client import cache_key
+
+
+def test_set_get_and_ttl(tmp_path):
+    cache = SharedCache(str(tmp_path / 'c.sqlite3'))
+    cache.set('a', {'x': 1}, ttl=60)
+    assert cache.get('a') == {'x': 1}
+    cache.set('b', [1, 2], ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get('b') is None
+    # a second handle (another worker) sees the same entries
+    assert SharedCache(str(tmp_path / 'c.sqlite3')).get('a') == {'x': 1}
+
+
+def test_zero_ttl_is_not_the_default(tmp_path):
+    cache = SharedCache(str(tmp_path / 'c.sqlite3'), default_ttl=600)
+    cache.set('now', 1, ttl=0)
+    assert cache.get('now') is None
+    assert cache.get_or_set('produced', lambda: 2, ttl=0) == 2
+    assert cache.get('produced') is None
+    cache.set('default', 3)
+    assert cache.get('default') == 3
+
+
+def test_size_bound_evicts_soonest_expiring(tmp_path):
+    cache = SharedCache(str(tmp_path / 'c.sqlite3'), max_bytes=3000)
+    for i in range(10):
+        cache.set(f'k{i}', 'v' * 500, ttl=100 + i)
+    assert cache.stats()['bytes'] <= 3000
+    assert cache.get('k9') is not None
+    assert cache.get('k0') is None
+
+
+def test_get_or_set_fetches_once_across_threads(tmp_path):
+    cache = SharedCache(str(tmp_path / 'c.sqlite3'))
+    calls = []
+
+    def producer():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'payload': True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set('k', producer, 60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{'payload': True}] * 8
+    assert cache.get_or_set('none', lambda: None) is None
+    assert cache.get('none') is None
+
+
+def test_cache_key_ignores_api_key():
+    assert cache_key('/movie/1', {'api_key': 'a', 'language': 'en-US'}) == cache_key('/movie/1', {'language': 'en-US', 'api_key': 'b'})
+
+
+def test_snapshot_restores_unexpired_entries_into_cold_cache(tmp_path):
+    cache = SharedCache(str(tmp_path / 'c.sqlite3'))
+    cache.set('keep', {'x': 1}, ttl=60)
+    cache.set('stale', {'x': 2}, ttl=0.05)
+    time.sleep(0.1)
+    snapshot = str(tmp_path / 'snap.sqlite3')
+    assert cache.save_snapshot(snapshot) == 1
+
+    # a fresh host: empty cache file
+    cold = SharedCache(str(tmp_path / 'cold.sqlite3'))
+    assert cold.restore_snapshot(snapshot) == 1
+    assert cold.get('keep') == {'x': 1}
+    assert cold.get('stale') is None
+    assert cold.stats()['bytes'] > 0
+    # later workers find the cache warm and leave it alone
+    assert SharedCache(str(tmp_path / 'cold.sqlite3')).restore_snapshot(snapshot) == 0
+    assert cold.restore_snapshot(str(tmp_path / 'missing.sqlite3')) == 0
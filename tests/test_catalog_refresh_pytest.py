@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.cache import get_cache
+from data.db import get_connection, init_db
+from data.db_writer import write
+from repositories import movie_repository
+from repositories.movie_repository import MovieRepository
+from services import background, catalog_refresh
+
+IDS = [777777701, 777777702, 777777703, 777777704]
+USER = 900077
+
+
+def _record(tmdb_id, title='Fresh', **extra):
+    return dict({'id': tmdb_id, 'media_type': 'movie', 'title': title, 'overview': 'o',
+                 'rating': 7.5, 'release_date': '2021-02-03', 'poster_path': '/p.jpg'}, **extra)
+
+
+def _row(tmdb_id):
+    conn = get_connection()
+    row = conn.execute('SELECT Title, FetchedAt, ContentHash FROM Movie WHERE MovieID = ?', (tmdb_id,)).fetchone()
+    conn.close()
+    return row
+
+
+@pytest.fixture
+def movies():
+    init_db()
+    conn = get_connection()
+    conn.execute('CREATE TABLE IF NOT EXISTS pytest_title_updates (MovieID INTEGER)')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS pytest_title_updates AFTER UPDATE OF Title ON Movie
+        WHEN NEW.MovieID IN ({','.join(map(str, IDS))})
+        BEGIN INSERT INTO pytest_title_updates VALUES (NEW.MovieID); END
+    """)
+    conn.commit()
+    conn.close()
+    yield
+    conn = get_connection()
+    conn.execute('DROP TRIGGER IF EXISTS pytest_title_updates')
+    conn.execute('DROP TABLE IF EXISTS pytest_title_updates')
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * len(IDS))})", IDS)
+    conn.execute('DELETE FROM WatchlistItem WHERE UserID = ?', (USER,))
+    conn.commit()
+    conn.close()
+
+
+def _title_updates():
+    conn = get_connection()
+    count = conn.execute('SELECT COUNT(*) FROM pytest_title_updates').fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_unchanged_rows_are_not_rewritten(movies):
+    write(movie_repository._upsert_title_records, [_record(IDS[0])], 1000.0)
+    first = _row(IDS[0])
+    assert first['FetchedAt'] == 1000.0 and first['ContentHash']
+
+    write(movie_repository._upsert_title_records, [_record(IDS[0])], 2000.0)
+    assert _title_updates() == 0
+    assert _row(IDS[0])['FetchedAt'] == 2000.0
+
+    write(movie_repository._upsert_title_records, [_record(IDS[0], title='Renamed')], 3000.0)
+    assert _title_updates() == 1
+    row = _row(IDS[0])
+    assert row['Title'] == 'Renamed' and row['ContentHash'] != first['ContentHash']
+
+
+def test_fallback_metadata_is_left_unfetched(movies):
+    write(movie_repository._upsert_movie, _record(IDS[1], fetched_at=None))
+    assert _row(IDS[1])['FetchedAt'] is None
+    MovieRepository.save_movie_record(_record(IDS[1]))
+    assert _row(IDS[1])['FetchedAt'] is not None
+
+
+def test_stale_titles_come_watchlisted_then_priority_then_oldest(movies):
+    write(movie_repository._upsert_title_records, [_record(i) for i in IDS], 100.0)
+    MovieRepository.mark_fetched([IDS[3]], time.time())   # fresh: not due
+    MovieRepository.mark_fetched([IDS[0]], 50.0)          # oldest
+    conn = get_connection()
+    conn.execute('INSERT INTO WatchlistItem(UserID, MovieID) VALUES (?, ?)', (USER, IDS[2]))
+    conn.commit()
+    conn.close()
+
+    stale = MovieRepository.get_stale_titles(time.time() - 3600, 100000, priority_ids=[IDS[1]])
+    ours = [tmdb_id for tmdb_id, _ in stale if tmdb_id in IDS]
+    assert ours[:1] == [IDS[2]]
+    assert ours.index(IDS[1]) < ours.index(IDS[0])
+    assert IDS[3] not in ours
+
+
+def test_stale_titles_without_priority_ids(movies):
+    write(movie_repository._upsert_title_records, [_record(IDS[0])], 100.0)
+    stale = MovieRepository.get_stale_titles(time.time() - 3600, 100000, priority_ids=set())
+    assert IDS[0] in [tmdb_id for tmdb_id, _ in stale]
+
+
+def test_refresh_updates_found_titles_and_defers_missing(movies, monkeypatch):
+    write(movie_repository._upsert_title_records, [_record(IDS[0]), _record(IDS[1])], 100.0)
+    monkeypatch.setattr(MovieRepository, 'get_stale_titles',
+                        staticmethod(lambda *a, **k: [(IDS[0], 'movie'), (IDS[1], 'movie')]))
+    monkeypatch.setattr(MovieRepository, 'fetch_title_by_id',
+                        staticmethod(lambda i, t=None: ({'id': i, 'title': 'Refreshed', 'vote_average': 8.0}, 'movie')
+                                     if i == IDS[0] else (None, None)))
+    monkeypatch.setattr(catalog_refresh, 'trending_ids', lambda since: set())
+
+    assert catalog_refresh.refresh_stale() == 1
+    assert _row(IDS[0])['Title'] == 'Refreshed' and _row(IDS[0])['FetchedAt'] > 100.0
+    assert _row(IDS[1])['Title'] == 'Fresh' and _row(IDS[1])['FetchedAt'] > 100.0
+
+
+def test_one_refresh_per_interval_across_workers(monkeypatch):
+    queued = []
+    monkeypatch.setattr(background, 'submit', lambda fn, *a: queued.append(fn) or object())
+    get_cache().delete(catalog_refresh._MARKER)
+    try:
+        monkeypatch.setattr(catalog_refresh, '_next_check', 0)
+        assert catalog_refresh.maybe_schedule()
+        assert not catalog_refresh.maybe_schedule()      # this process waits an interval
+        monkeypatch.setattr(catalog_refresh, '_next_check', 0)
+        assert not catalog_refresh.maybe_schedule()      # the shared marker is still set
+        assert queued == [catalog_refresh.refresh_stale]
+    finally:
+        get_cache().delete(catalog_refresh._MARKER)
+
+
+def test_health_probes_do_not_schedule_refreshes(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(catalog_refresh, 'maybe_schedule', lambda: scheduled.append(True))
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        assert client.get('/healthz').status_code == 200
+        client.get('/readyz')
+        assert scheduled == []
+        client.get('/api/watchlist/changes')
+    assert scheduled == [True]
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.db import get_connection, init_db
+from repositories import tmdb_client
+from repositories.catalog_writer import get_catalog_writer
+from repositories import movie_repository
+from repositories.movie_repository import MovieRepository
+
+IDS = list(range(888889001, 888889021))
+
+
+@pytest.fixture
+def fake_listing(monkeypatch):
+    init_db()
+    monkeypatch.setenv('TMDB_API_KEY', 'test')
+
+    def get_json(endpoint, params=None):
+        results = [{'id': i, 'title': f'Listed {i}', 'release_date': '2021-04-0%d' % (i % 9 + 1), 'vote_average': 7.0}
+                   for i in IDS]
+        results.append({'id': 5, 'media_type': 'person', 'name': 'Not a title'})
+        return {'page': 1, 'total_pages': 3, 'results': results}
+
+    monkeypatch.setattr(tmdb_client, 'get_json', get_json)
+    yield
+    conn = get_connection()
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * len(IDS))})", IDS)
+    conn.commit()
+    conn.close()
+
+
+def test_listing_pages_are_written_to_movie_in_one_batch(fake_listing, monkeypatch):
+    writer = get_catalog_writer()
+    writer.flush()  # start from an empty buffer
+    batches = []
+    save = MovieRepository.save_movie_records
+    monkeypatch.setattr(MovieRepository, 'save_movie_records', staticmethod(lambda records: batches.append(records) or save(records)))
+    results, total_pages = MovieRepository.get_movie_category('Cartoon', 1)
+    assert len(results) == len(IDS) + 1 and total_pages == 3
+
+    writer.flush()
+    assert writer.pending() == 0
+    assert len(batches) == 1 and len(batches[0]) == len(IDS)
+    stored = MovieRepository.get_movies_by_tmdb_ids(IDS)
+    assert sorted(stored) == IDS
+    assert stored[IDS[0]]['title'] == f'Listed {IDS[0]}'
+    assert stored[IDS[0]]['media_type'] == 'movie'
+
+    # the same page seen twice is coalesced into one write
+    MovieRepository.get_movie_category('Cartoon', 1)
+    MovieRepository.get_movie_category('Cartoon', 1)
+    assert writer.pending() <= len(IDS)
+    writer.flush()
+    assert len(batches) == 2 and len(batches[1]) == len(IDS)
+    # the category id now comes from memory, not a SELECT per write
+    assert 'movie' in movie_repository._category_ids
+
+
+def test_listing_does_not_retype_existing_titles(fake_listing):
+    MovieRepository.save_movie_records([{'id': IDS[0], 'media_type': 'tv', 'title': 'A Show'}])
+    MovieRepository.get_movie_category('Cartoon', 1)
+    get_catalog_writer().flush()
+    row = MovieRepository.get_movies_by_tmdb_ids([IDS[0]])[IDS[0]]
+    assert row['media_type'] == 'tv' and row['title'] == 'A Show'
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.db import get_connection, init_db
+from data.db_writer import BATCH_SIZE, DbWriter
+from repositories import movie_repository
+from repositories.movie_repository import MovieRepository
+
+
+def _rate(cur, user_id, tmdb_id, value):
+    cur.execute(
+        "INSERT INTO ratings(user_id, tmdb_id, media_type, rating_value) VALUES (?, ?, 'movie', ?) "
+        "ON CONFLICT(user_id, tmdb_id, media_type) DO UPDATE SET rating_value = excluded.rating_value",
+        (user_id, tmdb_id, value),
+    )
+    return value
+
+
+def _broken(cur):
+    cur.execute("INSERT INTO ratings(user_id, tmdb_id, media_type, rating_value) VALUES (1, 1, 'movie', 1)")
+    cur.execute("INSERT INTO no_such_table VALUES (1)")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    init_db(path)
+    return path
+
+
+def _count(path):
+    conn = get_connection(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM ratings').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_concurrent_writes_are_group_committed(db_path):
+    writer = DbWriter(db_path, max_batch=64, max_delay=0.01)
+    transactions_before = BATCH_SIZE._series.get((), [0])[-1]
+
+    def write_many(offset):
+        for i in range(20):
+            assert writer.run(_rate, offset, i, 4.0) == 4.0
+
+    threads = [threading.Thread(target=write_many, args=(t,)) for t in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _count(db_path) == 200
+    # 200 writes from 10 threads shared far fewer transactions
+    assert BATCH_SIZE._series[()][-1] - transactions_before < 200
+
+
+def test_failed_op_is_rolled_back_alone(db_path):
+    writer = DbWriter(db_path, max_batch=8, max_delay=0.05)
+    ok = writer.submit(_rate, 7, 1, 3.5)
+    bad = writer.submit(_broken)
+    ok2 = writer.submit(_rate, 7, 2, 2.5)
+    assert ok.result(5) == 3.5 and ok2.result(5) == 2.5
+    with pytest.raises(sqlite3.OperationalError):
+        bad.result(5)
+    assert _count(db_path) == 2  # the broken op's first insert was undone
+
+
+def test_fire_and_forget_returns_a_future(db_path):
+    writer = DbWriter(db_path)
+    future = writer.run(_rate, 9, 9, 5.0, wait=False)
+    assert future.result(5) == 5.0
+    assert _count(db_path) == 1
+
+
+def test_drain_waits_for_queued_writes(db_path):
+    writer = DbWriter(db_path, max_batch=4)
+    for i in range(10):
+        writer.run(_rate, 3, i, 1.0, wait=False)
+    writer.drain()
+    assert _count(db_path) == 10
+
+
+def test_category_id_is_cached_only_after_commit(db_path):
+    writer = DbWriter(db_path)
+
+    def create_and_fail(cur, name):
+        MovieRepository.category_id(cur, name)
+        raise ValueError(name)
+
+    with pytest.raises(ValueError):
+        writer.run(create_and_fail, 'rolled-back-kind')
+    # the Category insert was undone, so its id must not be remembered
+    assert 'rolled-back-kind' not in movie_repository._category_ids
+
+    category_id = writer.run(MovieRepository.category_id, 'committed-kind')
+    assert movie_repository._category_ids.pop('committed-kind') == category_id
+
+
+def test_timed_out_write_is_cancelled_before_it_runs(db_path):
+    writer = DbWriter(db_path, max_batch=1)
+    release = threading.Event()
+    writer.run(lambda cur: release.wait(5), wait=False)
+    with pytest.raises(TimeoutError):
+        writer.run(_rate, 4, 1, 2.0, timeout=0.05)
+    release.set()
+    writer.drain()
+    # the caller was told it failed, and it was never written
+    assert _count(db_path) == 0
+
+
+def test_started_write_is_waited_for_past_the_timeout(db_path):
+    writer = DbWriter(db_path)
+
+    def slow_rate(cur):
+        time.sleep(0.2)
+        return _rate(cur, 4, 2, 3.0)
+
+    assert writer.run(slow_rate, timeout=0.05) == 3.0
+    assert _count(db_path) == 1
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+
+import pytest
+import requests
+from flask import g
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import deadline
+from app import create_app
+from controllers import movie_controller
+from models.movie import Movie
+from repositories import tmdb_client
+from services.fanout import map_concurrent
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.testing = True
+    return app
+
+
+def test_no_budget_outside_requests():
+    assert deadline.remaining() is None
+    assert deadline.timeout(7.5) == 7.5
+    assert not deadline.expired()
+
+
+def test_budget_caps_timeouts_and_skips_optional_sections(app):
+    calls = []
+
+    @deadline.budget(0.05)
+    def view():
+        assert 0 < deadline.timeout(10) <= 0.05
+        assert deadline.optional(calls.append, 'early') is None
+        time.sleep(0.06)
+        assert deadline.expired() and deadline.timeout(10) == 0
+        return deadline.optional(calls.append, 'late', default='dropped')
+
+    with app.test_request_context('/'):
+        assert view() == 'dropped'
+    assert calls == ['early']
+
+
+def test_fanout_threads_see_the_request_deadline(app):
+    with app.test_request_context('/'):
+        deadline.budget(5)(lambda: None)()
+        left = map_concurrent(lambda _: deadline.remaining(), [1, 2, 3])
+    assert all(value is not None and 0 < value <= 5 for value in left)
+
+
+def test_tmdb_calls_fail_fast_once_budget_is_spent(app, monkeypatch):
+    monkeypatch.setattr(tmdb_client, '_session', lambda: pytest.fail('no HTTP call expected'))
+    with app.test_request_context('/'):
+        g._deadline = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            tmdb_client.get('/movie/550')
+
+
+def test_budget_spent_waiting_for_a_token_raises_timeout(app, monkeypatch):
+    limiter = tmdb_client.get_rate_limiter()
+
+    def slow_acquire(*args, **kwargs):
+        g._deadline = time.monotonic()
+        return None
+
+    monkeypatch.setattr(limiter, 'acquire', slow_acquire)
+    monkeypatch.setattr(tmdb_client, '_session', lambda: pytest.fail('no HTTP call expected'))
+    with app.test_request_context('/'):
+        g._deadline = time.monotonic() + 5
+        with pytest.raises(requests.exceptions.Timeout):
+            tmdb_client.get('/movie/550')
+
+
+def test_detail_page_renders_without_sections_past_the_budget(app, monkeypatch):
+    skipped = []
+
+    def slow_trailer(movie_id):
+        g._deadline = time.monotonic()  # the trailer used up the whole budget
+        return None
+
+    monkeypatch.setattr(movie_controller, 'get_movie_details',
+                        lambda movie_id: Movie(movie_id=movie_id, title='Budgeted', overview='', poster_path=None,
+                                               rating=7.0, release_date='2020-01-01', media_type='movie'))
+    monkeypatch.setattr(movie_controller, 'get_movie_trailer', slow_trailer)
+    monkeypatch.setattr(movie_controller, 'get_rating_summary', lambda *a: skipped.append('summary'))
+    monkeypatch.setattr(movie_controller, 'get_user_rating', lambda *a: skipped.append('rating'))
+
+    with app.test_client() as client:
+        response = client.get('/movie/424242')
+    assert response.status_code == 200
+    assert 'Budgeted' in response.get_data(as_text=True)
+    assert skipped == []
@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+import requests
+from flask import g
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from repositories import circuit_breaker, tmdb_client
+from repositories.circuit_breaker import CircuitBreaker, CircuitOpen
+from services import health_service
+
+
+@pytest.fixture
+def client():
+    health_service.reset()
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+    health_service.reset()
+
+
+def test_healthz_does_no_io(client, monkeypatch):
+    monkeypatch.setattr(tmdb_client, 'get', lambda *a, **k: pytest.fail('TMDb called'))
+    monkeypatch.setattr(sqlite3, 'connect', lambda *a, **k: pytest.fail('database opened'))
+    response = client.get('/healthz')
+    assert response.status_code == 200 and response.get_data(as_text=True) == 'ok\n'
+
+
+def test_readyz_reports_checks_from_cached_state(client, monkeypatch):
+    data = client.get('/readyz').get_json()
+    assert data['ready'] is True
+    assert data['checks']['database'] == {'ok': True, 'schema_version': data['checks']['database']['expected'],
+                                         'expected': data['checks']['database']['expected']}
+    assert data['checks']['tmdb']['circuit'] == 'closed'
+
+    # the next probes within the interval do not touch the database
+    monkeypatch.setattr(health_service, 'ping', lambda timeout: pytest.fail('database checked again'))
+    began = time.perf_counter()
+    for _ in range(20):
+        assert client.get('/readyz').status_code == 200
+    assert (time.perf_counter() - began) / 20 < 0.01
+
+
+def test_readyz_fails_only_for_the_database(client, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    monkeypatch.setattr(circuit_breaker, '_breaker', breaker)
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()['degraded'] is True
+    assert response.get_json()['checks']['tmdb'] == {'ok': False, 'circuit': 'open'}
+
+    def broken(timeout):
+        raise sqlite3.OperationalError('unable to open database file')
+
+    monkeypatch.setattr(health_service, 'ping', broken)
+    health_service.reset()
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['checks']['database']['ok'] is False
+
+
+def test_concurrent_first_probes_all_get_a_report(client, monkeypatch):
+    def slow_check():
+        time.sleep(0.1)
+        return {'database': {'ok': True}, 'cache': {'ok': True}}
+
+    monkeypatch.setattr(health_service, '_check', slow_check)
+    results, errors = [], []
+
+    def probe():
+        try:
+            results.append(health_service.get_readiness()['ready'])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=probe) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and results == [True, True, True]
+
+
+def test_circuit_opens_after_consecutive_failures_and_retries_once():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state() == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state() == 'half_open'
+    assert breaker.allow()          # the trial call
+    assert not breaker.allow()      # everyone else waits for it
+    breaker.record_failure()
+    assert breaker.state() == 'open'
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state() == 'closed' and breaker.allow()
+
+
+def test_open_circuit_short_circuits_tmdb_calls(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    monkeypatch.setattr(circuit_breaker, '_breaker', breaker)
+    monkeypatch.setattr(tmdb_client, '_session', lambda: pytest.fail('no HTTP call expected'))
+    with pytest.raises(CircuitOpen):
+        tmdb_client.get('/movie/550')
+
+
+def test_budget_cut_timeouts_do_not_count_as_tmdb_failures(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    monkeypatch.setattr(circuit_breaker, '_breaker', breaker)
+
+    class TimingOut:
+        def get(self, *args, **kwargs):
+            raise requests.exceptions.ReadTimeout('slow')
+
+    monkeypatch.setattr(tmdb_client, '_session', lambda: TimingOut())
+    with create_app().app_context():
+        g._deadline = time.monotonic() + 0.5
+        with pytest.raises(requests.exceptions.Timeout):
+            tmdb_client.get('/movie/550/videos')
+    assert breaker.state() == 'closed'
+
+    # without a budget the full timeout ran out: that is TMDb's doing
+    with pytest.raises(requests.exceptions.Timeout):
+        tmdb_client.get('/movie/550/videos')
+    assert breaker.state() == 'open'
+
+
+def test_trial_without_a_verdict_is_released(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    monkeypatch.setattr(circuit_breaker, '_breaker', breaker)
+    time.sleep(0.06)
+
+    class TimingOut:
+        def get(self, *args, **kwargs):
+            raise requests.exceptions.ReadTimeout('slow')
+
+    monkeypatch.setattr(tmdb_client, '_session', lambda: TimingOut())
+    with create_app().app_context():
+        # the budget cut the trial short: the next caller gets to try
+        g._deadline = time.monotonic() + 0.5
+        with pytest.raises(requests.exceptions.Timeout):
+            tmdb_client.get('/movie/550/videos')
+        assert breaker.state() == 'half_open' and breaker.allow()
+        breaker.release_trial()
+
+        # the budget ran out before the call went out at all
+        monkeypatch.setattr(tmdb_client.deadline, 'timeout', lambda default: 0)
+        with pytest.raises(requests.exceptions.Timeout):
+            tmdb_client.get('/movie/550/videos')
+        assert breaker.allow()
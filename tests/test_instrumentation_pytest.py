@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+from flask import g
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_server_timing_header_breaks_down_request(client):
+    resp = client.get('/watchlist')
+    assert resp.status_code == 200
+    timing = resp.headers.get('Server-Timing')
+    assert timing and 'total;dur=' in timing
+    assert 'db;dur=' in timing
+    assert 'render;dur=' in timing
+
+
+def test_metrics_endpoint_exposes_route_histograms(client):
+    client.get('/watchlist')
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert '# TYPE movietrends_request_seconds histogram' in body
+    assert 'movietrends_request_seconds_count{route="/watchlist",method="GET",status="200"}' in body
+    assert 'movietrends_request_phase_seconds_bucket{route="/watchlist",phase="db",le="+Inf"}' in body
+
+
+def test_db_timing_covers_connect_and_row_fetches():
+    with create_app().test_request_context():
+        conn = get_connection()
+        assert g._timings['db'][1] == 1  # the connect
+        cur = conn.execute('SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3')
+        cur.fetchone()
+        cur.fetchmany(1)
+        assert [row[0] for row in cur] == [3]
+        conn.close()
+        # execute, fetchone, fetchmany, and two steps of the iterator
+        assert g._timings['db'][1] == 6
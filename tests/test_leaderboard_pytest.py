@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection, init_db
+from repositories.rating_repository import get_rating_summary, get_rating_totals, upsert_rating
+from services import leaderboard_service
+from services.leaderboard_service import rank_titles
+
+KIND = 'pytest_leaderboard'
+
+
+@pytest.fixture
+def ratings():
+    init_db()
+    leaderboard_service.invalidate()
+    yield
+    conn = get_connection()
+    conn.execute('DELETE FROM ratings WHERE media_type = ?', (KIND,))
+    conn.execute('DELETE FROM RatingAggregate WHERE media_type = ?', (KIND,))
+    conn.execute('DELETE FROM RatingDaily WHERE media_type = ?', (KIND,))
+    conn.commit()
+    conn.close()
+    leaderboard_service.invalidate()
+
+
+def test_rank_titles_pulls_few_votes_towards_the_mean():
+    totals = [
+        (1, 1, 10.0),     # a single perfect score
+        (2, 50, 450.0),   # 9.0 average over many votes
+        (3, 20, 100.0),   # 5.0 average
+    ]
+    entries = rank_titles(totals, min_votes=5)
+    assert [e['id'] for e in entries] == [2, 1, 3]
+    assert entries[0]['votes'] == 50 and entries[0]['average'] == 9.0
+    assert rank_titles(totals, min_votes=5, limit=1)[0]['id'] == 2
+    assert rank_titles([], min_votes=5) == []
+
+
+def test_aggregates_follow_rating_writes(ratings):
+    upsert_rating(900001, 42, KIND, 8.0)
+    upsert_rating(900002, 42, KIND, 6.0)
+    assert get_rating_summary(42, KIND) == (7.0, 2)
+
+    upsert_rating(900002, 42, KIND, 10.0)
+    assert get_rating_summary(42, KIND) == (9.0, 2)
+    assert get_rating_totals(KIND) == [(42, 2, 18.0)]
+
+    conn = get_connection()
+    conn.execute('DELETE FROM ratings WHERE user_id = ? AND media_type = ?', (900001, KIND))
+    conn.commit()
+    conn.close()
+    assert get_rating_summary(42, KIND) == (10.0, 1)
+
+
+def test_windows_only_count_recent_ratings(ratings):
+    upsert_rating(900001, 7, KIND, 9.0)
+    upsert_rating(900001, 8, KIND, 4.0)
+    conn = get_connection()
+    # an old rating for title 8 that only the all-time ranking should see
+    conn.execute("""
+        INSERT INTO ratings(user_id, tmdb_id, media_type, rating_value, created_at, updated_at)
+        VALUES (900002, 8, ?, 10.0, '2001-01-01 00:00:00', '2001-01-01 00:00:00')
+    """, (KIND,))
+    conn.commit()
+    conn.close()
+
+    week = {entry['id']: entry['votes'] for entry in leaderboard_service.get_leaderboard(KIND, 'week')}
+    all_time = {entry['id']: entry['votes'] for entry in leaderboard_service.get_leaderboard(KIND, 'all')}
+    assert week == {7: 1, 8: 1}
+    assert all_time == {7: 1, 8: 2}
+
+
+def test_leaderboard_endpoint(ratings):
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        response = client.get('/api/leaderboard?media_type=tv&window=month&limit=5')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['media_type'] == 'tv' and data['window'] == 'month'
+        assert len(data['entries']) <= 5
+        assert [e['rank'] for e in data['entries']] == list(range(1, len(data['entries']) + 1))
+
+        assert client.get('/api/leaderboard?window=decade').status_code == 400
+        assert client.get('/api/leaderboard?media_type=person').status_code == 400
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.cache import get_cache
+from data.db import get_connection, init_db
+from data.db_writer import get_db_writer
+from repositories.catalog_writer import get_catalog_writer
+from repositories import media_type_index, tmdb_client
+from repositories.movie_repository import MovieRepository
+
+TV_ID = 666666601
+GONE_ID = 666666602
+LISTED_ID = 666666603
+IDS = (TV_ID, GONE_ID, LISTED_ID)
+
+
+def _not_found(endpoint):
+    response = requests.Response()
+    response.status_code = 404
+    return requests.exceptions.HTTPError(f"404 for {endpoint}", response=response)
+
+
+@pytest.fixture
+def tmdb(monkeypatch):
+    init_db()
+    calls = []
+
+    def get_json(endpoint, params=None):
+        calls.append(endpoint)
+        if endpoint == f"/tv/{TV_ID}":
+            return {'id': TV_ID, 'name': 'Only On TV', 'first_air_date': '2020-01-01'}
+        raise _not_found(endpoint)
+
+    monkeypatch.setattr(MovieRepository, '_get_api_key', staticmethod(lambda: 'test-key'))
+    monkeypatch.setattr(tmdb_client, 'get_json', get_json)
+    media_type_index._memo.clear()
+    yield calls
+    get_catalog_writer().flush()
+    get_db_writer().drain()
+    conn = get_connection()
+    conn.execute(f"DELETE FROM TitleMediaType WHERE tmdb_id IN ({','.join('?' * len(IDS))})", IDS)
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * len(IDS))})", IDS)
+    conn.commit()
+    conn.close()
+    for tmdb_id in IDS:
+        for media_type in media_type_index.MEDIA_TYPES:
+            get_cache().delete(media_type_index._miss_key(tmdb_id, media_type))
+    media_type_index._memo.clear()
+
+
+def test_known_tv_ids_skip_the_movie_probe(tmdb):
+    data, media_type = MovieRepository.fetch_title_by_id(TV_ID)
+    assert media_type == 'tv' and data['name'] == 'Only On TV'
+    assert tmdb == [f"/movie/{TV_ID}", f"/tv/{TV_ID}"]
+
+    # another worker: nothing in memory, the stored index answers
+    get_db_writer().drain()
+    media_type_index._memo.clear()
+    del tmdb[:]
+    assert MovieRepository.fetch_title_by_id(TV_ID)[1] == 'tv'
+    assert tmdb == [f"/tv/{TV_ID}"]
+
+
+def test_unknown_ids_are_negatively_cached(tmdb):
+    assert MovieRepository.fetch_title_by_id(GONE_ID) == (None, None)
+    assert len(tmdb) == 2
+    assert MovieRepository.fetch_title_by_id(GONE_ID) == (None, None)
+    assert MovieRepository.fetch_movie_by_id(GONE_ID) is None
+    assert len(tmdb) == 2
+
+
+def test_listing_pages_fill_the_index(tmdb):
+    MovieRepository.persist_listing([{'id': LISTED_ID, 'name': 'Listed', 'media_type': 'tv'}])
+    get_db_writer().drain()
+    media_type_index._memo.clear()
+    assert media_type_index.known_types(LISTED_ID) == ['tv']
+    assert media_type_index.candidate_types(LISTED_ID) == ['tv']
@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from config import Config
+from data.cache import SharedCache
+from repositories.movie_repository import MovieRepository
+from repositories.rate_limiter import BACKGROUND, current_priority
+from services import prefetch
+
+
+@pytest.fixture
+def fake_tmdb(monkeypatch, tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(prefetch, 'get_cache', lambda: cache)
+    monkeypatch.setattr(Config, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(Config, 'PREFETCH_ENABLED', True)
+    calls = []
+    done = threading.Event()
+
+    def get_movie_category(category=None, page=1):
+        calls.append((category, page, current_priority()))
+        if current_priority() == BACKGROUND:
+            done.set()
+        return [{'id': page, 'title': f'p{page}', 'media_type': 'movie'}], 5
+
+    monkeypatch.setattr(MovieRepository, 'get_movie_category', staticmethod(get_movie_category))
+    return calls, done
+
+
+def test_api_movies_prefetches_next_page_in_background(fake_tmdb):
+    calls, done = fake_tmdb
+    client = create_app().test_client()
+    resp = client.get('/api/movies?category=Movie&page=2')
+    assert resp.get_json()['has_more'] is True
+    assert done.wait(5)
+    assert ('Movie', 3, BACKGROUND) in calls
+    deadline = time.time() + 5
+    while prefetch._in_flight.get('Movie') and time.time() < deadline:
+        time.sleep(0.01)
+
+    before = prefetch.LOOKUPS.value('Movie', 'hit')
+    client.get('/api/movies?category=Movie&page=3')
+    assert prefetch.LOOKUPS.value('Movie', 'hit') == before + 1
+
+
+def test_prefetch_respects_depth_and_last_page(fake_tmdb, monkeypatch):
+    monkeypatch.setattr(Config, 'PREFETCH_MAX_DEPTH', 3)
+    assert prefetch.schedule_next_page('Series', 3, 10) is False
+    assert prefetch.schedule_next_page('Series', 5, 5) is False
+    assert prefetch.schedule_next_page('Whatever', 1, 10) is False
+
+
+def test_prefetch_per_category_limit(fake_tmdb, monkeypatch):
+    monkeypatch.setattr(Config, 'PREFETCH_PER_CATEGORY', 1)
+    release = threading.Event()
+    monkeypatch.setattr(prefetch, '_prefetch', lambda c, p: release.wait(5) or prefetch._in_flight['Cartoon'].discard(p))
+    assert prefetch.schedule_next_page('Cartoon', 1, 10) is True
+    assert prefetch.schedule_next_page('Cartoon', 2, 10) is False
+    release.set()
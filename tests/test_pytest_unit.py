@@ -100,3 +100,57 @@ def test_movies_page_loads_sorted(client):
     resp = client.get('/movies?sort=rating&order=desc')
     assert resp.status_code == 200
     assert resp.data and len(resp.data) > 0
+
+
+def test_user_context_watchlist_ids_follow_version(client):
+    from data.query_tracer import query_budget
+    from services.user_context import load_user_context
+
+    test_user_id = 7002
+    movie_id = 777777779
+
+    conn = get_connection()
+    ensure_user(conn, test_user_id, email='unit_ctx@example.com')
+
+    ctx = load_user_context(test_user_id)
+    assert ctx is not None and not ctx.in_watchlist(movie_id)
+    # warm cache: one query (user + version) per request
+    with query_budget(1):
+        load_user_context(test_user_id)
+
+    resp = client.post('/add_to_watchlist', data={
+        'user_id': str(test_user_id),
+        'movie_id': str(movie_id),
+        'media_type': 'movie',
+        'title': 'Ctx Movie',
+        'poster_path': '/c.jpg',
+        'vote_average': '6.0',
+        'release_date': '2022-01-01'
+    })
+    assert resp.status_code == 200
+    ctx2 = load_user_context(test_user_id)
+    assert ctx2.version > ctx.version
+    assert ctx2.in_watchlist(movie_id)
+
+    client.post('/remove_from_watchlist', data={'user_id': str(test_user_id), 'movie_id': str(movie_id)})
+    assert not load_user_context(test_user_id).in_watchlist(movie_id)
+
+    cur = conn.cursor()
+    cur.execute('DELETE FROM Movie WHERE MovieID=?', (movie_id,))
+    cur.execute('DELETE FROM WatchlistVersion WHERE UserID=?', (test_user_id,))
+    cur.execute('DELETE FROM users WHERE UserID=?', (test_user_id,))
+    conn.commit()
+    conn.close()
+
+
+def test_init_db_skips_ddl_when_schema_is_current(tmp_path):
+    from data.db import SCHEMA_VERSION, init_db, schema_version
+    from data.query_tracer import query_budget
+
+    path = str(tmp_path / 'fresh.db')
+    assert init_db(path) is True
+    conn = get_connection(path)
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
+    with query_budget(1):
+        assert init_db(path) is False
@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection
+from data.query_tracer import query_budget, statement_shape
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_statement_shape_strips_literals():
+    assert statement_shape("SELECT * FROM Movie WHERE MovieID = 12 AND Title = 'It''s'") == \
+        "SELECT * FROM Movie WHERE MovieID = ? AND Title = ?"
+    assert statement_shape("SELECT 1 FROM Movie WHERE MovieID IN (1, 2,3)") == "SELECT ? FROM Movie WHERE MovieID IN (?)"
+
+
+def test_watchlist_page_query_budget(client):
+    with query_budget(3, max_repeats=1):
+        assert client.get('/watchlist').status_code == 200
+
+
+def test_budget_flags_repeated_statements():
+    with pytest.raises(AssertionError, match="3x SELECT MovieID"):
+        with query_budget(10, max_repeats=2):
+            conn = get_connection()
+            for movie_id in (1, 2, 3):
+                conn.execute("SELECT MovieID FROM Movie WHERE MovieID = ?", (movie_id,)).fetchall()
+            conn.close()
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from repositories.rate_limiter import BACKGROUND, INTERACTIVE, RateLimited, RateLimiter
+
+
+def test_bucket_limits_rate():
+    limiter = RateLimiter(['k'], rate_per_second=50, burst=5)
+    began = time.monotonic()
+    for _ in range(15):
+        limiter.acquire(INTERACTIVE)
+    # 5 from the burst, 10 more at 50/s
+    assert time.monotonic() - began >= 0.15
+
+
+def test_background_keeps_out_of_interactive_reserve():
+    limiter = RateLimiter(['k'], rate_per_second=1, burst=4, background_reserve=0.5)
+    limiter.acquire(BACKGROUND, timeout=0.1)
+    limiter.acquire(BACKGROUND, timeout=0.1)
+    with pytest.raises(RateLimited):
+        limiter.acquire(BACKGROUND, timeout=0.1)
+    # pages can still use the reserved tokens
+    limiter.acquire(INTERACTIVE, timeout=0.1)
+    limiter.acquire(INTERACTIVE, timeout=0.1)
+
+
+def test_interactive_goes_first():
+    limiter = RateLimiter(['k'], rate_per_second=20, burst=1)
+    limiter.acquire(INTERACTIVE)
+    order = []
+
+    def take(priority, name):
+        limiter.acquire(priority, timeout=5)
+        order.append(name)
+
+    bg = threading.Thread(target=take, args=(BACKGROUND, 'background'))
+    bg.start()
+    time.sleep(0.01)
+    fg = threading.Thread(target=take, args=(INTERACTIVE, 'interactive'))
+    fg.start()
+    bg.join()
+    fg.join()
+    assert order[0] == 'interactive'
+
+
+def test_retry_after_rotates_to_free_key():
+    limiter = RateLimiter(['a', 'b'], rate_per_second=100, burst=10)
+    limiter.penalize('a', 30)
+    assert {limiter.acquire(INTERACTIVE) for _ in range(5)} == {'b'}
+    assert limiter.state()['blocked_keys'] == 1
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+import controllers.movie_controller as movie_controller
+from repositories.rate_limiter import BACKGROUND, background_priority, current_priority
+from services import search_service
+
+DELAY = 0.2
+
+
+def fake_search_page(query, page=1):
+    # page 1 is the slowest; page 2 repeats a page-1 title; 3 pages exist
+    time.sleep(DELAY if page == 1 else DELAY / 4)
+    if page > 3:
+        return {'page': page, 'results': [], 'total_pages': 3, 'total_results': 45}
+    results = [{'id': page * 100 + i, 'media_type': 'movie', 'title': f'{query} {page}.{i}'} for i in range(3)]
+    if page == 2:
+        results.insert(0, {'id': 100, 'media_type': 'movie', 'title': 'dup'})
+        results.append({'id': 100, 'first_air_date': '2020-01-01', 'name': 'same id, tv'})
+    return {'page': page, 'results': results, 'total_pages': 3, 'total_results': 45}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(search_service, 'search_page', fake_search_page)
+    monkeypatch.setattr(movie_controller, 'search_page', fake_search_page)
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_stream_fetches_pages_concurrently_and_dedupes(client):
+    began = time.perf_counter()
+    resp = client.get('/api/search?q=star&stream=1&pages=5')
+    events = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    elapsed = time.perf_counter() - began
+    assert resp.mimetype == 'application/x-ndjson'
+    assert elapsed < DELAY * 2  # not DELAY + 2 * DELAY / 4 + ... in sequence
+
+    pages = [e for e in events if 'page' in e]
+    assert [e['page'] for e in pages] == [1, 2, 3]
+    ids = [(r['id'], r['media_type']) for e in pages for r in e['results']]
+    assert len(ids) == len(set(ids))
+    assert (100, 'tv') in ids  # same id, other media type is kept
+    ranks = [r['rank'] for e in pages for r in e['results']]
+    assert ranks == sorted(ranks)
+
+    summary = events[-1]
+    assert summary['done'] is True
+    assert summary['total_pages'] == 3
+    assert summary['pages_fetched'] == 3
+    assert summary['next_page'] is None
+
+
+def test_stream_reports_next_page_and_handles_empty_query(client):
+    events = [json.loads(l) for l in client.get('/api/search?q=star&stream=1&pages=2').get_data(as_text=True).splitlines()]
+    assert events[-1]['next_page'] == 3
+    events = [json.loads(l) for l in client.get('/api/search?q=&stream=1').get_data(as_text=True).splitlines()]
+    assert events == [{'done': True, 'total_pages': 0, 'total_results': 0, 'pages_fetched': 0, 'failed_pages': 0, 'next_page': None}]
+
+
+def test_api_search_reports_has_more(client):
+    data = client.get('/api/search?q=star&page=2').get_json()
+    assert data['total_pages'] == 3 and data['has_more'] is True
+    data = client.get('/api/search?q=star&page=3').get_json()
+    assert data['has_more'] is False
+
+
+def test_pages_run_with_the_callers_priority(monkeypatch):
+    seen = []
+
+    def recording_search_page(query, page=1):
+        seen.append(current_priority())
+        return {'page': page, 'results': [], 'total_pages': 3, 'total_results': 0}
+
+    monkeypatch.setattr(search_service, 'search_page', recording_search_page)
+    with background_priority():
+        list(search_service.search_events('q', pages=3))
+    assert seen == [BACKGROUND] * 3
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from config import Config
+from services.fanout import imap_concurrent
+
+
+def test_templates_are_precompiled_into_shared_bytecode_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE_DIR', str(tmp_path))
+    app = create_app()
+    cached = [name for name in os.listdir(tmp_path) if name.endswith('.cache')]
+    assert len(cached) == len(app.jinja_env.list_templates(extensions=['html']))
+
+    # a second app (another worker, or the next boot) loads instead of compiling
+    mtimes = {name: os.path.getmtime(tmp_path / name) for name in cached}
+    create_app()
+    assert {name: os.path.getmtime(tmp_path / name) for name in cached} == mtimes
+
+
+def test_watchlist_page_is_streamed():
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        response = client.get('/watchlist')
+        assert response.status_code == 200
+        assert response.is_streamed
+        body = response.get_data(as_text=True)
+        assert body.startswith('<!doctype html>')
+        assert 'Your Watchlist' in body and body.rstrip().endswith('</html>')
+
+
+def test_imap_concurrent_yields_in_order():
+    def slow_first(n):
+        time.sleep(0.05 if n == 0 else 0)
+        return n * 10
+
+    assert list(imap_concurrent(slow_first, range(5))) == [0, 10, 20, 30, 40]
+    assert list(imap_concurrent(slow_first, [3])) == [30]
+
+
+def test_imap_concurrent_runs_a_bounded_window(monkeypatch):
+    monkeypatch.setattr(Config, 'FANOUT_WORKERS', 2)
+    started = []
+
+    def record(n):
+        started.append(n)
+        return n
+
+    results = imap_concurrent(record, range(50))
+    assert next(results) == 0
+    # a consumer that stops early leaves nothing queued behind it
+    results.close()
+    time.sleep(0.05)
+    assert sorted(started) == [0, 1]
+    assert list(imap_concurrent(record, range(50))) == list(range(50))
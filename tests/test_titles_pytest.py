@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection
+from repositories.movie_repository import MovieRepository
+
+LOCAL_ID = 888888801
+MISS_IDS = [888888802, 888888803, 888888804]
+DELAY = 0.1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch(media_type):
+        def fetch(tmdb_id):
+            with lock:
+                calls.append((tmdb_id, media_type))
+            time.sleep(DELAY)
+            if tmdb_id == MISS_IDS[-1]:
+                return None  # unknown to TMDb
+            key = 'name' if media_type == 'tv' else 'title'
+            return {'id': tmdb_id, key: f'Fetched {tmdb_id}', 'vote_average': 7.5, 'poster_path': '/f.jpg'}
+        return staticmethod(fetch)
+
+    monkeypatch.setattr(MovieRepository, 'fetch_movie_by_id', fake_fetch('movie'))
+    monkeypatch.setattr(MovieRepository, 'fetch_tv_by_id', fake_fetch('tv'))
+    MovieRepository.save_movie_records([{'id': LOCAL_ID, 'media_type': 'movie', 'title': 'Local Title', 'rating': 6.0}])
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        client.calls = calls
+        yield client
+    conn = get_connection()
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * 4)})", [LOCAL_ID] + MISS_IDS)
+    conn.commit()
+    conn.close()
+
+
+def test_batch_titles_serves_local_rows_and_fetches_misses_in_parallel(client):
+    ids = ','.join(str(i) for i in [LOCAL_ID] + MISS_IDS)
+    began = time.perf_counter()
+    data = client.get(f'/api/titles?ids={ids}&types=movie,movie,tv,movie').get_json()
+    elapsed = time.perf_counter() - began
+
+    assert [t['id'] for t in data['titles']] == [LOCAL_ID, MISS_IDS[0], MISS_IDS[1]]
+    assert data['titles'][0]['title'] == 'Local Title'
+    assert data['titles'][2]['media_type'] == 'tv' and data['titles'][2]['title'] == f'Fetched {MISS_IDS[1]}'
+    assert data['missing'] == [{'id': MISS_IDS[2], 'media_type': 'movie'}]
+    assert sorted(client.calls) == sorted([(MISS_IDS[0], 'movie'), (MISS_IDS[1], 'tv'), (MISS_IDS[2], 'movie')])
+    assert elapsed < DELAY * 2.5
+
+    # fetched titles were written back, so the next call needs no upstream fetch
+    client.calls.clear()
+    data = client.get(f'/api/titles?ids={MISS_IDS[0]},{MISS_IDS[1]}&types=movie,tv').get_json()
+    assert client.calls == []
+    assert [t['title'] for t in data['titles']] == [f'Fetched {MISS_IDS[0]}', f'Fetched {MISS_IDS[1]}']
+
+
+def test_batch_titles_validates_input(client):
+    assert client.get('/api/titles?ids=1,2&types=movie,tv,tv').status_code == 400
+    assert client.get('/api/titles?ids=1&types=book').status_code == 400
+    assert client.get('/api/titles?ids=abc').status_code == 400
+    too_many = ','.join(str(i) for i in range(1, 200))
+    assert client.get(f'/api/titles?ids={too_many}').status_code == 400
+    assert client.get('/api/titles').get_json() == {'titles': [], 'missing': []}
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import data.trend_store as trend_store
+import services.trend_service as trend_service
+from data.trend_store import TrendStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = TrendStore(str(tmp_path / 'trends'), min_interval=3600)
+    monkeypatch.setattr(trend_store, '_store', s)
+    monkeypatch.setattr(trend_service, '_index', trend_service._TrendIndex())
+    return s
+
+
+def _page(order):
+    return [{'id': tmdb_id, 'media_type': 'movie', 'popularity': 10.0, 'vote_average': 7.0} for tmdb_id in order]
+
+
+def test_snapshot_is_throttled_per_list_and_page(store):
+    assert store.snapshot('all_day', 1, _page([1, 2, 3]), ts=1000)
+    assert not store.snapshot('all_day', 1, _page([1, 2, 3]), ts=2000)
+    assert store.snapshot('all_day', 2, _page([4]), ts=2000)
+    cols = store.load()
+    assert list(cols.tmdb_id) == [1, 2, 3, 4]
+    assert list(cols.rank) == [1, 2, 3, 21]
+
+
+def test_climbing_and_days_in_top(store):
+    start = 19675 * 86400
+    # title 3 climbs from rank 3 to rank 1 while title 1 falls
+    store.snapshot('all_day', 1, _page([1, 2, 3]), ts=start)
+    store.snapshot('all_day', 1, _page([2, 1, 3]), ts=start + 3600)
+    store.snapshot('all_day', 1, _page([3, 2, 1]), ts=start + 2 * 3600)
+    now = start + 2 * 3600
+    climbing = trend_service.climbing_fastest('all_day', hours=24, limit=3, now=now)
+    assert climbing[0]['id'] == 3 and climbing[0]['velocity'] > 0
+    assert climbing[-1]['id'] == 1 and climbing[-1]['velocity'] < 0
+
+    velocity, history = trend_service.rank_velocity(3, 'movie', 'all_day', hours=24, now=now)
+    assert [h['rank'] for h in history] == [3, 3, 1]
+    assert velocity['velocity'] > 0
+
+    top = trend_service.days_in_top('all_day', top=2, days=30, now=now)
+    assert {r['id']: r['days'] for r in top} == {1: 1, 2: 1, 3: 1}
+
+
+def test_year_of_hourly_snapshots_queries_fast(store):
+    start = 19675 * 86400
+    hours = 24 * 365
+    for h in range(hours):
+        order = [(h + k) % 40 + 1 for k in range(20)]
+        store.snapshot('all_day', 1, _page(order), ts=start + h * 3600)
+    now = start + hours * 3600
+    trend_service.days_in_top('all_day', now=now)  # builds the index once
+
+    began = time.perf_counter()
+    climbing = trend_service.climbing_fastest('all_day', hours=24 * 365, limit=40, now=now)
+    trend_service.rank_velocity(5, 'movie', 'all_day', hours=24 * 30, now=now)
+    trend_service.days_in_top('all_day', days=365, now=now)
+    assert time.perf_counter() - began < 0.05
+
+    # the prefix-sum slopes agree with a direct fit over the same rows
+    for record in climbing[:3]:
+        expected, history = trend_service.rank_velocity(record['id'], 'movie', 'all_day', hours=24 * 365, now=now)
+        assert record['velocity'] == pytest.approx(expected['velocity'], abs=1e-3)
+        assert record['snapshots'] == len(history)
@@ -0,0 +1,129 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from data.db import get_connection, init_db
+from repositories.movie_repository import MovieRepository
+
+USER = 900050
+IDS = [777777051, 777777052, 777777053]
+
+
+def _cleanup():
+    conn = get_connection()
+    conn.execute('DELETE FROM WatchlistItem WHERE UserID = ?', (USER,))
+    conn.execute('DELETE FROM WatchlistChange WHERE UserID = ?', (USER,))
+    conn.execute('DELETE FROM WatchlistVersion WHERE UserID = ?', (USER,))
+    conn.execute(f"DELETE FROM Movie WHERE MovieID IN ({','.join('?' * len(IDS))})", IDS)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def client():
+    init_db()
+    conn = get_connection()
+    conn.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (?, ?, ?)", (USER, 'sync_user', 'sync@example.com'))
+    conn.commit()
+    conn.close()
+    _cleanup()
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = USER
+        yield client
+    _cleanup()
+
+
+def _add(tmdb_id):
+    assert MovieRepository.add_watchlist_item({'id': USER}, {
+        'id': tmdb_id, 'title': f'Title {tmdb_id}', 'media_type': 'movie', 'fetched_at': None,
+    })
+
+
+def _remove(tmdb_id):
+    conn = get_connection()
+    conn.execute('DELETE FROM WatchlistItem WHERE UserID = ? AND MovieID = ?', (USER, tmdb_id))
+    conn.commit()
+    conn.close()
+
+
+def test_changes_since_cursor(client):
+    first = client.get('/api/watchlist/changes').get_json()
+    assert first['added'] == [] and first['removed'] == [] and first['reset'] is False
+
+    _add(IDS[0])
+    _add(IDS[1])
+    data = client.get(f"/api/watchlist/changes?since={first['cursor']}").get_json()
+    assert [item['id'] for item in data['added']] == IDS[:2]
+    assert data['added'][0]['title'] == f'Title {IDS[0]}' and data['added'][0]['media_type'] == 'movie'
+    assert data['removed'] == [] and data['cursor'] > first['cursor']
+
+    _remove(IDS[0])
+    _add(IDS[2])
+    delta = client.get(f"/api/watchlist/changes?since={data['cursor']}").get_json()
+    assert [item['id'] for item in delta['added']] == [IDS[2]]
+    assert delta['removed'] == [IDS[0]]
+
+    # nothing new: same cursor, empty delta
+    idle = client.get(f"/api/watchlist/changes?since={delta['cursor']}").get_json()
+    assert idle['cursor'] == delta['cursor'] and idle['added'] == [] and idle['removed'] == []
+
+    # a first sync gets the current list without tombstones
+    full = client.get('/api/watchlist/changes').get_json()
+    assert sorted(item['id'] for item in full['added']) == IDS[1:] and full['removed'] == []
+
+
+def test_each_title_appears_once_with_its_latest_state(client):
+    cursor = client.get('/api/watchlist/changes').get_json()['cursor']
+    _add(IDS[0])
+    _remove(IDS[0])
+    _add(IDS[0])
+    data = client.get(f'/api/watchlist/changes?since={cursor}').get_json()
+    assert [item['id'] for item in data['added']] == [IDS[0]] and data['removed'] == []
+
+
+def test_limit_pages_through_changes(client):
+    cursor = client.get('/api/watchlist/changes').get_json()['cursor']
+    for tmdb_id in IDS:
+        _add(tmdb_id)
+    seen = []
+    while True:
+        page = client.get(f'/api/watchlist/changes?since={cursor}&limit=2').get_json()
+        seen += [item['id'] for item in page['added']]
+        cursor = page['cursor']
+        if not page['more']:
+            break
+    assert seen == IDS
+
+
+def test_cursor_ahead_of_the_log_resets(client):
+    _add(IDS[0])
+    data = client.get('/api/watchlist/changes?since=999999').get_json()
+    assert data['reset'] is True and [item['id'] for item in data['added']] == [IDS[0]]
+    assert client.get('/api/watchlist/changes?since=abc').status_code == 400
+
+
+def test_existing_items_are_backfilled(tmp_path):
+    path = str(tmp_path / 'sync.db')
+    init_db(path)
+    conn = get_connection(path)
+    # a file from before the change log: items without log rows
+    conn.execute('DROP TRIGGER watchlist_version_insert')
+    conn.executemany('INSERT INTO WatchlistItem(UserID, MovieID) VALUES (1, ?)', [(i,) for i in IDS])
+    conn.execute('DELETE FROM WatchlistChange')
+    conn.execute('PRAGMA user_version = 6')
+    conn.commit()
+    conn.close()
+
+    assert init_db(path) is True
+    conn = get_connection(path)
+    rows = conn.execute('SELECT Seq, MovieID FROM WatchlistChange WHERE UserID = 1 ORDER BY Seq').fetchall()
+    version = conn.execute('SELECT Version FROM WatchlistVersion WHERE UserID = 1').fetchone()['Version']
+    conn.close()
+    assert [r['MovieID'] for r in rows] == IDS
+    assert len({r['Seq'] for r in rows}) == len(IDS) and version == rows[-1]['Seq']
@@ -0,0 +1,121 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import create_app
+from controllers import movie_controller
+from data.cache import get_cache
+from data.db import get_connection, init_db
+from repositories.movie_repository import MovieRepository
+from services import watchlist_enrichment
+
+USER = 900049
+TITLE = 777777049
+
+
+def _cleanup():
+    conn = get_connection()
+    conn.execute('DELETE FROM WatchlistItem WHERE UserID = ?', (USER,))
+    conn.execute('DELETE FROM WatchlistVersion WHERE UserID = ?', (USER,))
+    conn.execute('DELETE FROM Movie WHERE MovieID = ?', (TITLE,))
+    conn.commit()
+    conn.close()
+    get_cache().delete(f'watchlist-enrich:{TITLE}')
+
+
+@pytest.fixture
+def user():
+    init_db()
+    conn = get_connection()
+    conn.execute("INSERT OR IGNORE INTO users(UserID, Username, Email) VALUES (?, ?, ?)", (USER, 'enrich_user', 'enrich@example.com'))
+    conn.commit()
+    conn.close()
+    _cleanup()
+    yield USER
+    _cleanup()
+
+
+def _row():
+    conn = get_connection()
+    row = conn.execute('SELECT Title, FetchedAt FROM Movie WHERE MovieID = ?', (TITLE,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_add_writes_locally_and_queues_enrichment(user, monkeypatch):
+    def no_tmdb(*args, **kwargs):
+        raise AssertionError('TMDb called while adding to the watchlist')
+
+    queued = []
+    monkeypatch.setattr(MovieRepository, 'fetch_title_by_id', no_tmdb)
+    monkeypatch.setattr(movie_controller, 'get_user_by_id', lambda *a: pytest.fail('whole watchlist loaded'))
+    monkeypatch.setattr(MovieRepository, 'save_user_watchlist', lambda *a, **k: pytest.fail('whole watchlist rewritten'))
+    monkeypatch.setattr(watchlist_enrichment, 'enqueue', lambda *args, **kwargs: queued.append(args))
+
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        response = client.post('/add_to_watchlist', data={
+            'user_id': str(USER), 'movie_id': str(TITLE), 'media_type': 'movie',
+            'title': 'Form Title', 'poster_path': '/f.jpg', 'vote_average': '6.5', 'release_date': '2020-05-05',
+        })
+        assert response.status_code == 200
+        assert response.get_json()['item']['title'] == 'Form Title'
+        # adding it again is answered from the stored row, with no new job
+        again = client.post('/add_to_watchlist', data={'user_id': str(USER), 'movie_id': str(TITLE), 'media_type': 'movie'})
+        assert again.status_code == 200 and again.get_json()['item']['title'] == 'Form Title'
+
+    assert queued == [(TITLE, 'movie')]
+    assert TITLE in MovieRepository.get_watchlist_ids(USER)
+    row = _row()
+    assert row['Title'] == 'Form Title' and row['FetchedAt'] is None
+
+    with app.test_client() as client:
+        response = client.post('/remove_from_watchlist', data={'user_id': str(USER), 'movie_id': str(TITLE)})
+        assert response.status_code == 200
+    assert TITLE not in MovieRepository.get_watchlist_ids(USER)
+    # the title itself stays in the catalog
+    assert _row()['Title'] == 'Form Title'
+
+
+def test_enrich_stores_tmdb_details(user, monkeypatch):
+    MovieRepository.add_watchlist_item({'id': USER}, {'id': TITLE, 'title': 'Form Title', 'media_type': 'movie', 'fetched_at': None})
+    monkeypatch.setattr(MovieRepository, 'fetch_title_by_id',
+                        lambda tmdb_id, media_type=None: ({'id': tmdb_id, 'title': 'TMDb Title', 'vote_average': 8.1}, 'movie'))
+    assert watchlist_enrichment.enrich(TITLE, 'movie') is True
+    row = _row()
+    assert row['Title'] == 'TMDb Title' and row['FetchedAt'] is not None
+
+
+def test_enqueue_is_deduplicated(user, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(watchlist_enrichment.background, 'submit', lambda fn, *args, **kwargs: submitted.append(args) or object())
+    assert watchlist_enrichment.enqueue(TITLE, 'movie') is not None
+    # still in flight in this worker
+    assert watchlist_enrichment.enqueue(TITLE, 'movie') is None
+    watchlist_enrichment._done((TITLE, 'movie'))
+    # another worker's claim is still live in the shared cache
+    assert watchlist_enrichment.enqueue(TITLE, 'movie') is None
+    # retries skip the claim
+    assert watchlist_enrichment.enqueue(TITLE, 'movie', attempt=1) is not None
+    watchlist_enrichment._done((TITLE, 'movie'))
+    assert submitted == [(TITLE, 'movie'), (TITLE, 'movie')]
+
+
+def test_failed_fetch_is_retried_until_the_limit(user, monkeypatch):
+    retries = []
+    monkeypatch.setattr(MovieRepository, 'fetch_title_by_id', lambda tmdb_id, media_type=None: (None, None))
+    monkeypatch.setattr(watchlist_enrichment, 'retry_later', lambda *args: retries.append(args))
+    monkeypatch.setattr(watchlist_enrichment.Config, 'WATCHLIST_ENRICH_RETRIES', 2)
+
+    assert watchlist_enrichment.enrich(TITLE, 'movie') is False
+    assert watchlist_enrichment.enrich(TITLE, 'movie', attempt=1) is False
+    assert watchlist_enrichment.enrich(TITLE, 'movie', attempt=2) is False
+    assert retries == [(TITLE, 'movie', 1), (TITLE, 'movie', 2)]
+
+    # a title TMDb answered 404 for is not retried
+    monkeypatch.setattr(watchlist_enrichment.media_type_index, 'is_miss', lambda tmdb_id, media_type: True)
+    assert watchlist_enrichment.enrich(TITLE, 'movie') is False
+    assert len(retries) == 2